@@ -0,0 +1,48 @@
+"""Added campagne archived flag
+
+Revision ID: 1e7c07066452
+Revises: 448540eb2a5f
+Create Date: 2026-10-19 14:59:05.562971
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision: str = "1e7c07066452"
+down_revision: Union[str, None] = "448540eb2a5f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Tables whose ids must never be reused, so that archived rows can be restored
+AUTOINCREMENT_TABLES = ("activite", "etudiant", "candidature")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "campagne",
+        sa.Column("archived", sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+    # Autogenerate doesn't detect AUTOINCREMENT, which requires rebuilding the
+    # tables
+    for table in AUTOINCREMENT_TABLES:
+        with op.batch_alter_table(
+            table, recreate="always", table_kwargs={"sqlite_autoincrement": True}
+        ):
+            pass
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in AUTOINCREMENT_TABLES:
+        with op.batch_alter_table(
+            table, recreate="always", table_kwargs={"sqlite_autoincrement": False}
+        ):
+            pass
+    op.drop_column("campagne", "archived")
@@ -0,0 +1,48 @@
+"""Rebuild the campagne statistics table from the source tables.
+
+Run whenever the statistics are suspected to have drifted::
+
+    python -m scripts.rebuild_stats
+
+This gives every campagne a new data version, which invalidates the caches of
+the clients.  ``--missing`` only computes the campagnes without statistics,
+such as after the migration creating the table, and runs on every start.
+"""
+
+import argparse
+import asyncio
+
+import structlog
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.config import settings
+from src.services.stats import CampagneStatsService
+
+logger = structlog.get_logger("gca-uqo")
+
+
+async def rebuild(*, missing_only: bool = False) -> None:
+    engine = create_async_engine(settings.SQLALCHEMY_ASYNC_DATABASE_URI)
+    try:
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            await CampagneStatsService(session=session, logger=logger).rebuild(
+                missing_only=missing_only
+            )
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--missing",
+        action="store_true",
+        help="only compute the campagnes without statistics",
+    )
+    args = parser.parse_args()
+    asyncio.run(rebuild(missing_only=args.missing))
+
+
+if __name__ == "__main__":
+    main()
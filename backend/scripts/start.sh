@@ -6,5 +6,10 @@ mkdir -p "$(dirname "$SQLLITE_FILE_NAME")"
 echo "Running Alembic migrations..."
 alembic upgrade head
 
+# Only the missing ones: a full rebuild moves every data version forward,
+# which would throw away the caches of the clients on every restart
+echo "Computing missing campagne statistics..."
+python -m scripts.rebuild_stats --missing
+
 echo "Starting FastAPI app..."
 uvicorn src.main:app --host 0.0.0.0 --port 8000 --proxy-headers --forwarded-allow-ips="*"
\ No newline at end of file
@@ -0,0 +1,117 @@
+"""Cold storage for closed campagnes.
+
+The archive is a second SQLite file attached to every connection as the
+``archive`` schema.  It holds the same tables as the main database, and the
+rows of an archived campagne live there instead of in the hot tables, so the
+indexes and pages that every open campagne searches stay small.
+
+The archive tables are created on startup rather than by the Alembic
+migrations, from the current models, and the columns added to the models since
+are added to them.
+"""
+
+from typing import Any
+from urllib.parse import quote
+
+from sqlalchemy import Connection, MetaData, Table, event, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.schema import CreateColumn
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.schemas import Campagne  # also registers the tables in SQLModel.metadata
+
+__all__ = [
+    "ARCHIVE_SCHEMA",
+    "ARCHIVED_TABLES",
+    "FROM_ARCHIVE",
+    "archive_metadata",
+    "archive_tables",
+    "attach",
+    "create_archive_tables",
+    "is_archived",
+    "main_tables",
+]
+
+ARCHIVE_SCHEMA = "archive"
+
+ARCHIVED_TABLES = (
+    "cours",
+    "seance",
+    "activite",
+    "etudiant",
+    "candidature",
+    "activitecandidature",
+)
+"""Tables whose rows move to the archive, parents first."""
+
+FROM_ARCHIVE: dict[str, Any] = {"schema_translate_map": {None: ARCHIVE_SCHEMA}}
+"""Execution options that point the ORM queries at the archive tables."""
+
+archive_metadata = MetaData()
+for _table in SQLModel.metadata.sorted_tables:
+    _table.to_metadata(archive_metadata, schema=ARCHIVE_SCHEMA)
+
+
+async def is_archived(session: AsyncSession, trimestre: int) -> bool:
+    """Whether the rows of the campagne of ``trimestre`` are in the archive.
+
+    Reads of the campagne then add `FROM_ARCHIVE` to their execution options.
+    """
+    archived = (
+        await session.exec(
+            select(Campagne.archived).where(Campagne.trimestre == trimestre)
+        )
+    ).first()
+    return bool(archived)
+
+
+def main_tables() -> dict[str, Table]:
+    return {name: SQLModel.metadata.tables[name] for name in ARCHIVED_TABLES}
+
+
+def archive_tables() -> dict[str, Table]:
+    return {
+        name: archive_metadata.tables[f"{ARCHIVE_SCHEMA}.{name}"]
+        for name in ARCHIVED_TABLES
+    }
+
+
+def attach(engine: AsyncEngine, path: str, *, read_only: bool = False) -> None:
+    """Attach the archive file to every connection opened by ``engine``.
+
+    Read-only connections open it with ``mode=ro``, which requires the file to
+    exist: the writer creates it first, see `create_archive_tables`.
+    """
+    database = f"file:{quote(path)}?mode=ro" if read_only else path
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _on_connect(dbapi_connection: Any, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (database,))
+        finally:
+            cursor.close()
+
+
+async def create_archive_tables(engine: AsyncEngine) -> None:
+    """Create the archive tables that don't exist yet, and their new columns."""
+    async with engine.begin() as conn:
+        await conn.run_sync(archive_metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+
+
+def _add_missing_columns(conn: Connection) -> None:
+    for table in archive_tables().values():
+        existing = {
+            row.name
+            for row in conn.execute(
+                text(f"PRAGMA {ARCHIVE_SCHEMA}.table_info({table.name})")
+            )
+        }
+        for column in table.columns:
+            if column.name not in existing:
+                ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                conn.execute(
+                    text(f"ALTER TABLE {ARCHIVE_SCHEMA}.{table.name} ADD COLUMN {ddl}")
+                )
@@ -1,5 +1,6 @@
 import asyncio
-from cachetools import TTLCache
+from collections import defaultdict
+from cachetools import LRUCache, TTLCache
 from collections.abc import Callable, Awaitable
 from typing import Dict, Generic, TypeVar, Optional
 
@@ -141,3 +142,81 @@ class AsyncCache(Generic[T]):
             for key in list(self._locks.keys()):
                 if not self._locks[key].locked():
                     del self._locks[key]
+
+
+class ResponseCache:
+    """Rendered response bodies of the campagnes.
+
+    Entries are grouped by trimestre and tagged with the data version (the
+    ETag) they were rendered from.  A body is only served for the version it
+    was rendered from, and every write to a campagne drops its entries through
+    `invalidate`, so a stale body is never returned even if a reader stores
+    one while a write is being committed.  Each trimestre may hold several
+    variants of its bodies, such as different sparse fieldsets.
+    """
+
+    def __init__(self, max_trimestres: int = 16, max_variants: int = 32):
+        """Initialize the cache.
+
+        Parameters
+        ----------
+        max_trimestres : int
+            Maximum number of trimestres kept, the least recently used are
+            dropped first.
+        max_variants : int
+            Maximum number of variants kept per trimestre, the least recently
+            used are dropped first.  Variants come from the query string, so
+            this bounds what clients can make the cache hold.
+        """
+        self._max_variants = max_variants
+        self._entries: LRUCache[int, tuple[str, LRUCache[str, bytes]]] = LRUCache(
+            maxsize=max_trimestres
+        )
+        self._locks: defaultdict[int, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+    async def get_or_render(
+        self,
+        trimestre: int,
+        etag: str,
+        variant: str,
+        render: Callable[[], Awaitable[bytes]],
+    ) -> bytes:
+        """Get a body from the cache or render it if it isn't there.
+
+        Only one request renders the bodies of a trimestre at a time, the
+        others wait for it and reuse what it rendered.
+
+        Parameters
+        ----------
+        trimestre : int
+            The trimestre of the campagne.
+        etag : str
+            The data version the body must be rendered from.
+        variant : str
+            Identifies the body among those of the trimestre.
+        render : Callable
+            An async function rendering the body if it's not in the cache.
+
+        Returns
+        -------
+        bytes
+            The cached or newly rendered body.
+        """
+        async with self._locks[trimestre]:
+            entry = self._entries.get(trimestre)
+            if entry is not None and entry[0] == etag and variant in entry[1]:
+                return entry[1][variant]
+
+            body = await render()
+            if entry is None or entry[0] != etag:
+                entry = (etag, LRUCache(maxsize=self._max_variants))
+            entry[1][variant] = body
+            self._entries[trimestre] = entry
+            return body
+
+    def invalidate(self, trimestre: int) -> None:
+        """Drop the bodies of ``trimestre``, called by every write to it."""
+        self._entries.pop(trimestre, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
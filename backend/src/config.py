@@ -52,10 +52,61 @@ class Settings(BaseSettings):
     def SQLALCHEMY_DATABASE_URI(self) -> str:
         return f"sqlite:///{self.SQLLITE_FILE_NAME}"
 
+    @computed_field
+    @property
+    def SQLALCHEMY_ASYNC_DATABASE_URI(self) -> str:
+        return f"sqlite+aiosqlite:///{self.SQLLITE_FILE_NAME}"
+
+    @computed_field
+    @property
+    def SQLALCHEMY_ASYNC_READONLY_DATABASE_URI(self) -> str:
+        return f"sqlite+aiosqlite:///file:{self.SQLLITE_FILE_NAME}?mode=ro&uri=true"
+
+    # Cold storage for the rows of archived campagnes
+    SQLITE_ARCHIVE_FILE_NAME: str = "../data/database/archive.db"
+
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    # Negative values are in KiB, positive ones in pages
+    SQLITE_CACHE_SIZE: int = -64_000
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_TEMP_STORE: Literal["DEFAULT", "FILE", "MEMORY"] = "MEMORY"
+    # Milliseconds
+    SQLITE_BUSY_TIMEOUT: int = 5_000
+    # Read-only connections serving GET requests, next to the single writer
+    SQLITE_READER_POOL_SIZE: int = 5
+    # Seconds a request waits for a pooled connection before a 503.  Write
+    # requests hold the single writer connection from start to finish
+    SQLITE_POOL_TIMEOUT: float = 30
+    # Seconds between PRAGMA optimize / WAL checkpoint runs, 0 disables them
+    SQLITE_OPTIMIZE_INTERVAL: int = 60 * 60
+
     FIRST_SUPERUSER: EmailStr = "test@example.com"
     FIRST_SUPERUSER_PASSWORD: str = "password123"
 
+    # "local" keeps the files in STORAGE_DIRECTORY, "s3" in S3_BUCKET
+    STORAGE_BACKEND: Literal["local", "s3"] = "local"
     STORAGE_DIRECTORY: str = "../data/files/resumes"
+    # List the stored files at startup instead of looking each one up on disk
+    STORAGE_INDEX: bool = True
+    # Internal nginx location serving STORAGE_DIRECTORY, downloads are then
+    # sent by nginx instead of the backend. Only set it when the backend can't
+    # be reached without going through nginx, other clients get empty files
+    STORAGE_ACCEL_REDIRECT: str | None = None
+    # Bytes
+    MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024
+
+    # Credentials are read by boto3, from AWS_ACCESS_KEY_ID and
+    # AWS_SECRET_ACCESS_KEY among others
+    S3_BUCKET: str = "resumes"
+    # For S3-compatible stores such as MinIO, AWS when unset
+    S3_ENDPOINT_URL: str | None = None
+    S3_REGION: str | None = None
+    # Prepended to the names of the files to get their object keys
+    S3_PREFIX: str = ""
+    # Seconds a presigned download URL stays valid.  Resume downloads redirect
+    # there, so the bucket's CORS rules must allow GET from the frontend
+    S3_URL_EXPIRY: int = 5 * 60
 
     @classmethod
     def __call__(cls):
@@ -6,11 +6,11 @@ from src.dependencies.context import Context
 from src.schemas import Campagne
 
 
-def get_current_campagne(
+async def get_current_campagne(
     *, trimestre: Annotated[int, Path()], context: Context
 ) -> Campagne:
     campagne_service = context.factory.create_campagne_service()
-    campagne = campagne_service.get_campagne(trimestre)
+    campagne = await campagne_service.get_campagne(trimestre)
 
     if campagne is None:
         raise HTTPException(
@@ -21,4 +21,47 @@ def get_current_campagne(
     return campagne
 
 
+async def ensure_campagne_exists(
+    *, trimestre: Annotated[int, Path()], context: Context
+) -> None:
+    campagne_service = context.factory.create_campagne_service()
+
+    if not await campagne_service.campagne_exists(trimestre):
+        raise HTTPException(
+            status_code=404,
+            detail=f"Campagne introuvable pour le trimestre {trimestre}",
+        )
+
+
+async def ensure_campagne_writable(
+    *, trimestre: Annotated[int, Path()], context: Context
+) -> None:
+    campagne_service = context.factory.create_campagne_service()
+    archived = await campagne_service.campagne_archived(trimestre)
+
+    if archived is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Campagne introuvable pour le trimestre {trimestre}",
+        )
+    if archived:
+        raise HTTPException(
+            status_code=409,
+            detail=f"La campagne du trimestre {trimestre} est archivée",
+        )
+
+
 CurrentCampagne = Annotated[Campagne, Depends(get_current_campagne)]
+
+
+async def get_writable_campagne(*, campagne: CurrentCampagne) -> Campagne:
+    if campagne.archived:
+        raise HTTPException(
+            status_code=409,
+            detail=f"La campagne du trimestre {campagne.trimestre} est archivée",
+        )
+
+    return campagne
+
+
+WritableCampagne = Annotated[Campagne, Depends(get_writable_campagne)]
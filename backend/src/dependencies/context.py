@@ -1,14 +1,17 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from dataclasses import dataclass
 from typing import Annotated, Any
 
 from fastapi import Depends, HTTPException, Request
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from structlog import BoundLogger
 
 from src.factory import Factory, ProcessContext
 from src.config import Settings
 from src.dependencies.session import db_session_dependency
 from src.dependencies.logger import logger_dependency
+from src.instrumentation import track_queries
 
 
 @dataclass(slots=True)
@@ -24,7 +27,7 @@ class RequestContext:
     request: Request
     """The incoming request."""
 
-    session: Session
+    session: AsyncSession
     """The database session."""
 
     logger: BoundLogger
@@ -33,6 +36,25 @@ class RequestContext:
     factory: Factory
     """The component factory."""
 
+    @asynccontextmanager
+    async def streaming_factory(self) -> AsyncIterator[Factory]:
+        """Open a component factory for the body of a streamed response.
+
+        The request session is already closed when the body is sent, so the
+        factory gets its own read-only session.  The request has logged its
+        statements by then too, so the statements of the body are logged on
+        their own once it's sent, with ``streamed=True``.
+        """
+        with track_queries() as stats:
+            try:
+                async with db_session_dependency.session(read_only=True) as session:
+                    yield self.factory.with_session(session)
+            finally:
+                if stats.count:
+                    self.logger.info(
+                        "Database statements", streamed=True, **stats.log_fields()
+                    )
+
 
 class ContextDependency:
     """Provide a per-request context as a FastAPI dependency.
@@ -51,7 +73,7 @@ class ContextDependency:
         self,
         *,
         request: Request,
-        session: Annotated[Session, Depends(db_session_dependency)],
+        session: Annotated[AsyncSession, Depends(db_session_dependency)],
         logger: Annotated[BoundLogger, Depends(logger_dependency)],
     ) -> RequestContext:
         if not self._settings or not self._process_context:
@@ -2,6 +2,7 @@ from fastapi import Depends, Path, HTTPException
 
 from typing import Annotated
 
+from src.dependencies.campagne import ensure_campagne_writable
 from src.dependencies.context import Context
 from src.schemas import Cours
 
@@ -25,3 +26,26 @@ async def get_current_course(
 
 
 CurrentCourse = Annotated[Cours, Depends(get_current_course)]
+
+
+async def get_writable_course(
+    *,
+    writable: Annotated[None, Depends(ensure_campagne_writable)],
+    trimestre: Annotated[int, Path()],
+    sigle: Annotated[str, Path()],
+    context: Context,
+) -> Cours:
+    # Archived campagnes are refused first, writes only reach the main tables
+    cours_service = context.factory.create_cours_service(trimestre)
+    cours = await cours_service.get_course(sigle, archived=False)
+
+    if cours is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Cours {sigle} introuvable pour le trimestre {trimestre}",
+        )
+
+    return cours
+
+
+WritableCourse = Annotated[Cours, Depends(get_writable_course)]
@@ -5,7 +5,7 @@ from src.dependencies.context import Context
 from src.schemas import Etudiant
 
 
-def _find_etudiant_or_raise(
+async def _find_etudiant_or_raise(
     *,
     trimestre: int,
     context: Context,
@@ -19,11 +19,11 @@ def _find_etudiant_or_raise(
         assert code_permanent and email, (
             "Code permanent and email cannot be None if no etudiant_id is provided"
         )
-        etudiant = etudiant_service.get_etudiant(
+        etudiant = await etudiant_service.get_etudiant(
             code_permanent=code_permanent, email=email
         )
     else:
-        etudiant = etudiant_service.get_etudiant_by_id(etudiant_id)
+        etudiant = await etudiant_service.get_etudiant_by_id(etudiant_id)
 
     if expect_existing and etudiant is None:
         raise HTTPException(
@@ -39,7 +39,7 @@ def _find_etudiant_or_raise(
     return etudiant
 
 
-def get_existing_etudiant(
+async def get_existing_etudiant(
     *,
     trimestre: Annotated[int, Path()],
     context: Context,
@@ -47,7 +47,7 @@ def get_existing_etudiant(
     code_permanent: Annotated[str | None, Form()] = None,
     email: Annotated[str | None, Form()] = None,
 ) -> Etudiant | None:
-    return _find_etudiant_or_raise(
+    return await _find_etudiant_or_raise(
         etudiant_id=etudiant_id,
         trimestre=trimestre,
         code_permanent=code_permanent,
@@ -57,7 +57,7 @@ def get_existing_etudiant(
     )
 
 
-def ensure_etudiant_does_not_exist(
+async def ensure_etudiant_does_not_exist(
     *,
     trimestre: Annotated[int, Path()],
     context: Context,
@@ -65,7 +65,7 @@ def ensure_etudiant_does_not_exist(
     email: Annotated[str | None, Form()] = None,
     etudiant_id: Annotated[int | None, Path()] = None,
 ) -> None:
-    _find_etudiant_or_raise(
+    await _find_etudiant_or_raise(
         etudiant_id=etudiant_id,
         trimestre=trimestre,
         code_permanent=code_permanent,
@@ -5,11 +5,14 @@ incorporate information from the request in its bound context.
 """
 
 import uuid
+from collections.abc import AsyncGenerator
 
 import structlog
 from fastapi import Request
 from structlog.stdlib import BoundLogger
 
+from src.instrumentation import current_query_stats
+
 _logger_name: str | None = None
 """Name of the configured global logger.
 
@@ -37,6 +40,9 @@ class LoggerDependency:
     * The IP address of the client
     * The ``User-Agent`` header of the request, if any.
 
+    Once the request has been handled, the statements it issued are logged
+    with the same bound context.
+
     The last three pieces of information will be added using naming consistent
     with the expectations of Google Log Explorer so that the request
     information will be liftedn into the appropriate JSON fields for complex
@@ -46,7 +52,7 @@ class LoggerDependency:
     def __init__(self) -> None:
         self.logger: BoundLogger | None = None
 
-    async def __call__(self, request: Request) -> BoundLogger:
+    async def __call__(self, request: Request) -> AsyncGenerator[BoundLogger, None]:
         """Return a logger bound with request information.
 
         Returns
@@ -72,10 +78,16 @@ class LoggerDependency:
         if user_agent:
             request_data["userAgent"] = user_agent
 
-        return self.logger.new(
+        logger = self.logger.new(
             httpRequest=request_data,
             request_id=str(uuid.uuid4()),
         )
+        try:
+            yield logger
+        finally:
+            stats = current_query_stats()
+            if stats is not None and stats.count:
+                logger.info("Database statements", **stats.log_fields())
 
 
 logger_dependency = LoggerDependency()
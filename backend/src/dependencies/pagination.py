@@ -0,0 +1,38 @@
+from dataclasses import dataclass
+from typing import Annotated, Any
+
+from fastapi import Depends, Query, Response
+
+from src.services.pagination import Page
+
+MAX_LIMIT = 500
+"""Largest page that can be requested."""
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+"""Response header holding the ``after`` value of the next page."""
+
+
+@dataclass(slots=True)
+class PaginationParams:
+    limit: int | None
+    """Page size, every item when unset."""
+
+    after: int | None
+    """Cursor returned with the previous page."""
+
+
+async def get_pagination(
+    *,
+    limit: Annotated[int | None, Query(ge=1, le=MAX_LIMIT)] = None,
+    after: Annotated[int | None, Query()] = None,
+) -> PaginationParams:
+    return PaginationParams(limit=limit, after=after)
+
+
+def set_next_cursor(response: Response, page: Page[Any]) -> None:
+    """Advertise the cursor of the next page, if there is one."""
+    if page.next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = str(page.next_cursor)
+
+
+Pagination = Annotated[PaginationParams, Depends(get_pagination)]
@@ -0,0 +1,54 @@
+from collections.abc import Callable
+from typing import Annotated
+
+from fastapi import Depends, HTTPException, Query
+from sqlmodel import SQLModel
+
+from src.models.responses import CampagneFullResponse, EtudiantFullResponse
+from src.services.projection import Projection
+
+
+def _split(value: str | None) -> list[str] | None:
+    if value is None:
+        return None
+    return [path.strip() for path in value.split(",") if path.strip()]
+
+
+def projection_dependency(
+    model: type[SQLModel],
+) -> Callable[..., Projection | None]:
+    """Build the dependency parsing the sparse fieldsets of ``model``."""
+
+    def get_projection(
+        fields: Annotated[
+            str | None,
+            Query(
+                description="Comma-separated dotted paths of the attributes to return"
+            ),
+        ] = None,
+        include: Annotated[
+            str | None,
+            Query(
+                description="Comma-separated dotted paths of the relationships to return"
+            ),
+        ] = None,
+    ) -> Projection | None:
+        if fields is None and include is None:
+            return None
+
+        try:
+            return Projection.parse(
+                model, fields=_split(fields), include=_split(include)
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    return get_projection
+
+
+CampagneProjection = Annotated[
+    Projection | None, Depends(projection_dependency(CampagneFullResponse))
+]
+EtudiantProjection = Annotated[
+    Projection | None, Depends(projection_dependency(EtudiantFullResponse))
+]
@@ -1,26 +1,80 @@
-from collections.abc import Generator
+import asyncio
+from collections.abc import AsyncGenerator, AsyncIterator
+from contextlib import asynccontextmanager
 from typing import Any
 
-from sqlalchemy import Engine
-from sqlmodel import Session, create_engine
+import structlog
+from fastapi import Request
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.archive import attach, create_archive_tables
+from src.instrumentation import instrument
+from src.responses import APIResponse
+from src.sqlite import SQLiteProfile, effective_pragmas, optimize
+
+
+READ_ONLY_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+"""HTTP methods served by the read-only engine."""
+
+POOL_BUSY_RETRY_AFTER = 5
+"""Seconds clients are told to wait when no connection freed up in time."""
 
 
 class DatabaseSessionDependency:
-    """Database session dependency"""
-    
+    """Database session dependency.
+
+    Each request gets its own `AsyncSession`.  Requests with a read-only method
+    are bound to the reader engine, a pool of ``mode=ro`` connections that
+    never wait on the writer under WAL.  Every other request shares the writer
+    engine, which holds a single connection so that writes queue up in the
+    pool rather than contend for the database lock.
+
+    A session holds the writer connection from its first statement until it
+    commits, so services commit before any file or network I/O, such as
+    saving a resume or fetching the UQO schedules of a sync, and only make
+    their changes afterwards.  Other writes wait for the connection in the
+    pool for at most ``pool_timeout`` seconds, then get a ``503 Service
+    Unavailable`` with a ``Retry-After`` header from `pool_timeout_handler`.
+
+    Sessions do not expire their objects on commit so that the response models
+    can be built from the loaded instances without triggering implicit (and
+    forbidden) I/O outside of the event loop.
+    """
+
     def __init__(self) -> None:
-        self._engine: Engine | None = None
+        self._engine: AsyncEngine | None = None
+        self._reader: AsyncEngine | None = None
+        self._maintenance_task: asyncio.Task | None = None
+
+    async def __call__(self, request: Request) -> AsyncGenerator[AsyncSession, None]:
+        async with self.session(
+            read_only=request.method in READ_ONLY_METHODS
+        ) as session:
+            yield session
+
+    @asynccontextmanager
+    async def session(self, *, read_only: bool = False) -> AsyncIterator[AsyncSession]:
+        """Open a session outside of the dependency.
 
-    def __call__(self) -> Generator[Session, None, None]:
+        FastAPI closes the request session before sending a streamed response
+        body, which must read from its own session instead.
+        """
         if not self._engine:
             raise RuntimeError("db_session_dependency not initialized")
-        with Session(self._engine) as session:
+        engine = self._reader if self._reader and read_only else self._engine
+        async with AsyncSession(engine, expire_on_commit=False) as session:
             yield session
 
     async def aclose(self) -> None:
-        """SHut down the database engine."""
+        """Shut down the database engines."""
+        await self._stop_maintenance()
+        if self._reader:
+            await self._reader.dispose()
+            self._reader = None
         if self._engine:
-            self._engine.dispose()
+            await self._engine.dispose()
             self._engine = None
 
     async def initialize(
@@ -28,15 +82,105 @@ class DatabaseSessionDependency:
         url: str,
         password: str | None = None,
         *,
+        read_only_url: str | None = None,
+        reader_pool_size: int = 5,
+        archive_path: str | None = None,
         connect_args: dict[str, Any] | None = None,
+        profile: SQLiteProfile | None = None,
+        optimize_interval: int = 0,
+        pool_timeout: float = 30,
     ):
-        if self._engine:
-            self._engine.dispose()
-        kwargs: dict[str, Any] = {}
+        """Create the engines.
+
+        Parameters
+        ----------
+        url
+            Async database URL.
+        read_only_url
+            Async URL of the same database opened with ``mode=ro``.  Without
+            it, every request uses the writer engine.
+        reader_pool_size
+            Number of pooled read-only connections.
+        archive_path
+            SQLite file attached as the ``archive`` schema, created with its
+            tables if needed.
+        connect_args
+            Extra arguments for the DBAPI ``connect`` call.
+        profile
+            SQLite pragmas applied to every new connection.
+        optimize_interval
+            Seconds between ``PRAGMA optimize`` and WAL checkpoint runs.  0
+            disables the periodic maintenance.
+        pool_timeout
+            Seconds to wait for a pooled connection before giving up.
+        """
+        await self.aclose()
+        kwargs: dict[str, Any] = {"pool_timeout": pool_timeout}
         if connect_args:
             kwargs["connect_args"] = connect_args
-        self._engine = create_engine(url, **kwargs)
+        self._engine = create_async_engine(url, pool_size=1, max_overflow=0, **kwargs)
+        instrument(self._engine)
+        if profile:
+            profile.install(self._engine)
+        if archive_path:
+            attach(self._engine, archive_path)
+            await create_archive_tables(self._engine)
+
+        if read_only_url:
+            # Read-only connections can neither create the database file nor
+            # switch it to WAL, so the writer opens it first.
+            async with self._engine.connect():
+                pass
+            self._reader = create_async_engine(
+                read_only_url, pool_size=reader_pool_size, **kwargs
+            )
+            instrument(self._reader)
+            if profile:
+                profile.install(self._reader, read_only=True)
+            if archive_path:
+                attach(self._reader, archive_path, read_only=True)
+
+        if optimize_interval > 0:
+            self._maintenance_task = asyncio.create_task(
+                self._maintenance(self._engine, optimize_interval)
+            )
+
+    async def pragmas(self) -> dict[str, Any]:
+        """Return the pragmas in effect on the engine's connections."""
+        if not self._engine:
+            raise RuntimeError("db_session_dependency not initialized")
+        return await effective_pragmas(self._engine)
+
+    async def _maintenance(self, engine: AsyncEngine, interval: int) -> None:
+        logger = structlog.get_logger("gca-uqo")
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await optimize(engine)
+            except Exception:
+                logger.exception("SQLite maintenance failed")
+
+    async def _stop_maintenance(self) -> None:
+        if self._maintenance_task:
+            self._maintenance_task.cancel()
+            try:
+                await self._maintenance_task
+            except asyncio.CancelledError:
+                pass
+            self._maintenance_task = None
+
+
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError) -> APIResponse:
+    """Answer ``503`` when no database connection freed up in time."""
+    structlog.get_logger("gca-uqo").warning(
+        "Database connection pool busy", method=request.method, path=request.url.path
+    )
+    return APIResponse(
+        {"detail": "La base de données est occupée, réessayez plus tard."},
+        status_code=503,
+        headers={"Retry-After": str(POOL_BUSY_RETRY_AFTER)},
+    )
 
 
 db_session_dependency = DatabaseSessionDependency()
-"""The dependency that will return the sync session proxy."""
+"""The dependency that will return the async session."""
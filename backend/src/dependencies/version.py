@@ -0,0 +1,62 @@
+from typing import Annotated
+
+from fastapi import Depends, Header, HTTPException, Path, Request, Response
+
+from src.dependencies.context import Context
+from src.responses import MSGPACK_MEDIA_TYPE, accepts_ndjson, negotiated_media_type
+
+
+def _etag_matches(etag: str, if_none_match: str) -> bool:
+    """Weak comparison of ``etag`` with the tags of an ``If-None-Match`` header."""
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+async def get_data_version(
+    *,
+    trimestre: Annotated[int, Path()],
+    if_none_match: Annotated[str | None, Header()] = None,
+    request: Request,
+    context: Context,
+) -> str | None:
+    """Return the ETag of the current data version of the campagne.
+
+    Answers ``304 Not Modified`` right away if the client already has it, so
+    routes must declare this dependency before the ones loading data.  Each
+    encoding of the responses gets its own tag.
+
+    NDJSON streams aren't tagged, nor checked: their rows are read once the
+    response has started, by another session, so the tag could be older than
+    the body.
+    """
+    if accepts_ndjson(request):
+        return None
+
+    stats_service = context.factory.create_campagne_stats_service()
+    version = await stats_service.get_version(trimestre)
+    if version is None:
+        return None
+
+    tag = f"{trimestre}.{version}"
+    if negotiated_media_type() == MSGPACK_MEDIA_TYPE:
+        tag += ".msgpack"
+    etag = f'"{tag}"'
+    if if_none_match is not None and _etag_matches(etag, if_none_match):
+        raise HTTPException(status_code=304, headers=etag_headers(etag))
+
+    return etag
+
+
+def etag_headers(etag: str) -> dict[str, str]:
+    # no-cache makes browsers revalidate every time instead of guessing a
+    # freshness lifetime
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def set_etag(response: Response, etag: str | None) -> None:
+    """Tag the response with the data version it was built from."""
+    if etag is not None:
+        response.headers.update(etag_headers(etag))
+
+
+DataVersion = Annotated[str | None, Depends(get_data_version)]
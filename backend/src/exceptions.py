@@ -12,6 +12,18 @@ class CampagneTooAhead(Exception):
     """Campagne created too ahead of time"""
 
 
+class CampagneArchivedError(Exception):
+    """The campagne is archived and can't be modified"""
+
+
+class CampagneNotArchivedError(Exception):
+    """The campagne is not archived"""
+
+
+class CampagneNotClosedError(Exception):
+    """Only closed campagnes can be archived"""
+
+
 class ActiviteNotFoundError(Exception):
     """Activite not found"""
 
@@ -32,6 +44,18 @@ class FileSaveError(StorageError):
     """Raised when saving a file fails."""
 
 
+class FileTooLargeError(FileSaveError):
+    """Raised when a file is larger than the storage accepts."""
+
+    def __init__(self, max_size: int) -> None:
+        super().__init__(f"Le fichier dépasse la taille maximale de {max_size} octets")
+        self.max_size = max_size
+
+
+class InvalidFileTypeError(FileSaveError):
+    """Raised when the content of a file doesn't match its extension."""
+
+
 class FileDeleteError(StorageError):
     """Raised when deleting a file fails."""
 
@@ -2,8 +2,8 @@ from typing import Self, Any
 from dataclasses import dataclass
 
 from httpx import AsyncClient
-from sqlalchemy import Engine
-from sqlmodel import Session
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel.ext.asyncio.session import AsyncSession
 import structlog
 from structlog import BoundLogger
 
@@ -12,18 +12,49 @@ from src.config import Settings
 from src.models.uqo import UQOCours, UQOProgramme
 from src.services.uqo import UQOCoursService, UQOProgrammeService, UQOHoraireService
 from src.services import (
+    ArchiveService,
     CampagneService,
     EtudiantService,
     CandidatureService,
     CoursService,
     GroupeService,
+    CampagneStatsService,
 )
 from src.file import StorageProvider, LocalStorageProvider
-from src.cache import AsyncCache
+from src.cache import AsyncCache, ResponseCache
 
 from src.dependencies.http_client import http_client_dependency
 
 
+def storage_provider_from_settings(settings: Settings) -> StorageProvider:
+    """Create the storage provider selected by ``STORAGE_BACKEND``."""
+    if settings.STORAGE_BACKEND == "s3":
+        # boto3 is optional, only needed by this backend
+        import boto3
+
+        from src.s3 import S3StorageProvider
+
+        client = boto3.client(
+            "s3",
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region_name=settings.S3_REGION,
+        )
+        return S3StorageProvider(
+            client,
+            settings.S3_BUCKET,
+            prefix=settings.S3_PREFIX,
+            max_file_size=settings.MAX_UPLOAD_SIZE,
+            url_expiry=settings.S3_URL_EXPIRY,
+        )
+
+    return LocalStorageProvider(
+        settings.STORAGE_DIRECTORY,
+        max_file_size=settings.MAX_UPLOAD_SIZE,
+        index=settings.STORAGE_INDEX,
+        accel_redirect=settings.STORAGE_ACCEL_REDIRECT,
+    )
+
+
 @dataclass(frozen=True, slots=True)
 class ProcessContext:
     """Per-process application context.
@@ -39,6 +70,7 @@ class ProcessContext:
     uqo_cours_cache: AsyncCache[list[UQOCours]]
     uqo_programme_cache: AsyncCache[list[UQOProgramme]]
     uqo_horaire_cache: AsyncCache[list[dict[str, Any]]]
+    campagne_response_cache: ResponseCache
     storage_provider: StorageProvider
     http_client: AsyncClient
 
@@ -49,7 +81,8 @@ class ProcessContext:
             uqo_cours_cache=AsyncCache(18000),
             uqo_programme_cache=AsyncCache(18000),
             uqo_horaire_cache=AsyncCache(18000),
-            storage_provider=LocalStorageProvider(settings.STORAGE_DIRECTORY),
+            campagne_response_cache=ResponseCache(),
+            storage_provider=storage_provider_from_settings(settings),
             http_client=await http_client_dependency(),
         )
 
@@ -61,6 +94,7 @@ class ProcessContext:
         """
         await self.uqo_cours_cache.clear()
         await self.uqo_programme_cache.clear()
+        self.campagne_response_cache.clear()
 
 
 class Factory:
@@ -78,19 +112,23 @@ class Factory:
     """
 
     @classmethod
-    async def create(cls, settings: Settings, engine: Engine) -> Self:
+    async def create(cls, settings: Settings, engine: AsyncEngine) -> Self:
         logger = structlog.get_logger("gca-uqo")
-        session = Session(engine)
+        session = AsyncSession(engine, expire_on_commit=False)
         context = await ProcessContext.from_settings(settings)
         return cls(context, session, logger)
 
     def __init__(
-        self, context: ProcessContext, session: Session, logger: BoundLogger
+        self, context: ProcessContext, session: AsyncSession, logger: BoundLogger
     ) -> None:
         self.session = session
         self._context = context
         self._logger = logger
 
+    def with_session(self, session: AsyncSession) -> "Factory":
+        """Build a factory sharing this one's context, bound to ``session``."""
+        return Factory(self._context, session, self._logger)
+
     async def aclose(self) -> None:
         """Shut down the factory.
 
@@ -100,7 +138,7 @@ class Factory:
         try:
             await self._context.aclose()
         finally:
-            self.session.close()
+            await self.session.close()
 
     def create_uqo_course_service(self) -> UQOCoursService:
         return UQOCoursService(
@@ -121,12 +159,36 @@ class Factory:
             trimestre,
             horaire_cache=self._context.uqo_horaire_cache,
             session=self.session,
+            stats=self.create_campagne_stats_service(),
             http_client=self._context.http_client,
             logger=self._logger,
         )
 
     def create_campagne_service(self) -> CampagneService:
-        return CampagneService(session=self.session, logger=self._logger)
+        return CampagneService(
+            session=self.session,
+            stats=self.create_campagne_stats_service(),
+            logger=self._logger,
+        )
+
+    def create_archive_service(self) -> ArchiveService:
+        return ArchiveService(
+            session=self.session,
+            stats=self.create_campagne_stats_service(),
+            logger=self._logger,
+        )
+
+    def create_campagne_stats_service(self) -> CampagneStatsService:
+        return CampagneStatsService(
+            session=self.session,
+            response_cache=self._context.campagne_response_cache,
+            logger=self._logger,
+        )
+
+    @property
+    def campagne_response_cache(self) -> ResponseCache:
+        """The rendered responses of the campagnes, shared by all requests."""
+        return self._context.campagne_response_cache
 
     def create_etudiant_service(self, trimestre: int) -> EtudiantService:
         return EtudiantService(trimestre, session=self.session, logger=self._logger)
@@ -136,11 +198,22 @@ class Factory:
             trimestre,
             session=self.session,
             storage=self._context.storage_provider,
+            stats=self.create_campagne_stats_service(),
             logger=self._logger,
         )
 
     def create_cours_service(self, trimestre: int) -> CoursService:
-        return CoursService(trimestre, session=self.session, logger=self._logger)
+        return CoursService(
+            trimestre,
+            session=self.session,
+            stats=self.create_campagne_stats_service(),
+            logger=self._logger,
+        )
 
     def create_groupe_service(self, trimestre: int) -> GroupeService:
-        return GroupeService(trimestre, session=self.session, logger=self._logger)
+        return GroupeService(
+            trimestre,
+            session=self.session,
+            stats=self.create_campagne_stats_service(),
+            logger=self._logger,
+        )
@@ -1,95 +1,510 @@
 from abc import ABC, abstractmethod
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from dataclasses import dataclass
+import hashlib
 import io
+import itertools
+import os
+import re
+import tempfile
+import time
 import zipfile
-from fastapi import UploadFile
+from fastapi import Response, UploadFile
 from fastapi.responses import FileResponse, StreamingResponse
-from pathlib import Path
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, TypeVar
+from urllib.parse import quote
+from starlette.concurrency import run_in_threadpool
 
-import shutil
+from src.exceptions import FileTooLargeError, InvalidFileTypeError
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+"""Bytes read from an upload, and written to disk, at a time."""
+
+ZIP_CHUNK_SIZE = 64 * 1024
+"""Bytes read from a file, and written to the archive, at a time."""
+
+SIGNATURES = {".pdf": b"%PDF-"}
+"""Leading bytes of the content of the files with these extensions."""
+
+STORED_SUFFIXES = frozenset({".pdf"})
+"""Files that are already compressed, stored as they are in archives."""
+
+EXPORT_PARALLEL_READS = 4
+"""Files read ahead, at most, while an export archive is written."""
+
+_BLOB_NAME = re.compile(r"[0-9a-f]{64}\.\w+")
+
+K = TypeVar("K")
+
+
+class _ZipPipe(io.RawIOBase):
+    """Unseekable output of a `zipfile.ZipFile`, collecting the bytes written.
+
+    ``ZipFile`` writes a data descriptor after each member when it can't seek
+    back to its header, so the archive comes out in a single pass.
+    """
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> Iterator[bytes]:
+        """Yield the bytes written since the last call."""
+        chunks, self._chunks = self._chunks, []
+        yield from chunks
+
+
+Opener = Callable[[K], tuple[float, BinaryIO] | None]
+"""Open a stored file, returning its modification time and a stream of its
+content, or ``None`` if it doesn't exist."""
+
+
+def _compress_type(arcname: str) -> int:
+    if PurePosixPath(arcname).suffix.lower() in STORED_SUFFIXES:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def _zip_info(arcname: str, modified: float) -> zipfile.ZipInfo:
+    info = zipfile.ZipInfo(arcname, time.localtime(modified)[:6])
+    info.external_attr = 0o644 << 16
+    info.compress_type = _compress_type(arcname)
+    return info
+
+
+def stream_zip(files: Iterable[tuple[str, K]], open_file: Opener[K]) -> Iterator[bytes]:
+    """Yield a ZIP archive of ``files`` as it's written.
+
+    ``files`` are the name of each member in the archive and the file holding
+    its content, opened with ``open_file``.  Files are read `ZIP_CHUNK_SIZE`
+    bytes at a time, so memory doesn't depend on their size.  PDFs are
+    stored, other files deflated.  This is blocking, `StreamingResponse`
+    iterates it in a worker thread.
+    """
+    pipe = _ZipPipe()
+    with zipfile.ZipFile(pipe, "w") as archive:
+        for arcname, file in files:
+            opened = open_file(file)
+            if opened is None:
+                # Deleted since it was listed
+                continue
+            modified, source = opened
+            info = _zip_info(arcname, modified)
+            with closing(source), archive.open(info, "w") as member:
+                while chunk := source.read(ZIP_CHUNK_SIZE):
+                    member.write(chunk)
+                    yield from pipe.drain()
+            yield from pipe.drain()
+    yield from pipe.drain()
+
+
+def _read(open_file: Opener[K], file: K) -> tuple[float, bytes] | None:
+    opened = open_file(file)
+    if opened is None:
+        return None
+    modified, source = opened
+    with closing(source):
+        return modified, source.read()
+
+
+def stream_shared_zip(
+    files: Iterable[tuple[K, Sequence[str]]],
+    open_file: Opener[K],
+    parallel_reads: int = EXPORT_PARALLEL_READS,
+) -> Iterator[bytes]:
+    """Yield a ZIP archive with the content of each file under several names.
+
+    ``files`` are each file, opened with ``open_file``, and the names of the
+    members holding its content.  Each file is read once, whole, by a pool of
+    ``parallel_reads`` threads reading ahead of the archive, so at most that
+    many files wait in memory.  Like `stream_zip`, this is blocking.
+    """
+    pipe = _ZipPipe()
+    with (
+        ThreadPoolExecutor(parallel_reads) as pool,
+        zipfile.ZipFile(pipe, "w") as archive,
+    ):
+        reads = (
+            (pool.submit(_read, open_file, file), arcnames) for file, arcnames in files
+        )
+        pending = deque(itertools.islice(reads, parallel_reads))
+        while pending:
+            read, arcnames = pending.popleft()
+            pending.extend(itertools.islice(reads, 1))
+            result = read.result()
+            if result is None:
+                # Deleted since it was listed
+                continue
+
+            modified, content = result
+            view = memoryview(content)
+            for arcname in arcnames:
+                with archive.open(_zip_info(arcname, modified), "w") as member:
+                    for start in range(0, len(view), ZIP_CHUNK_SIZE):
+                        member.write(view[start : start + ZIP_CHUNK_SIZE])
+                        yield from pipe.drain()
+                yield from pipe.drain()
+    yield from pipe.drain()
+
+
+def zip_response(zip_file_name: str, content: Iterator[bytes]) -> StreamingResponse:
+    """Download the archive ``content`` as ``zip_file_name``.zip."""
+    # A sync iterator, which Starlette advances in its thread pool
+    return StreamingResponse(
+        content,
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename={zip_file_name}.zip"},
+    )
+
+
+@dataclass(frozen=True, slots=True)
+class Blob:
+    """Content stored under its hash, shared by every file with that content."""
+
+    hash: str
+    """SHA-256 of the content, in hexadecimal."""
+
+    size: int
+
+    suffix: str
+
+    @property
+    def name(self) -> str:
+        """The name the blob is stored as."""
+        return f"{self.hash}{self.suffix}"
+
+
+class UploadCheck:
+    """Check the size and signature of an upload, chunk by chunk."""
+
+    def __init__(self, filename: str, max_size: int | None) -> None:
+        self.filename = filename
+        self.max_size = max_size
+        self.signature = SIGNATURES.get(Path(filename).suffix.lower(), b"")
+        self.size = 0
+        self._head = b""
+
+    def update(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.max_size is not None and self.size > self.max_size:
+            raise FileTooLargeError(self.max_size)
+        if len(self._head) < len(self.signature):
+            self._head += chunk[: len(self.signature) - len(self._head)]
+            if not self.signature.startswith(self._head):
+                raise self._invalid_type()
+
+    def finish(self) -> None:
+        if self._head != self.signature:
+            raise self._invalid_type()
+
+    def _invalid_type(self) -> InvalidFileTypeError:
+        return InvalidFileTypeError(
+            f"Le contenu de {self.filename} ne correspond pas à son type"
+        )
+
+
+async def hash_upload(upload: UploadFile, suffix: str, max_size: int | None) -> Blob:
+    """Check ``upload`` like a file ending with ``suffix``, and hash it."""
+    check = UploadCheck(f"{upload.filename or 'blob'}{suffix}", max_size)
+    digest = hashlib.sha256()
+    while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+        check.update(chunk)
+        # hashlib releases the GIL on large buffers
+        await run_in_threadpool(digest.update, chunk)
+    check.finish()
+    return Blob(hash=digest.hexdigest(), size=check.size, suffix=suffix)
 
 
 class StorageProvider(ABC):
     """Abstract base class for storage providers"""
 
     @abstractmethod
-    def save_file(self, filename: str, upload: UploadFile) -> None:
-        """Save content to a file at the specified path"""
+    async def save_file(self, filename: str, upload: UploadFile) -> None:
+        """Save content to a file at the specified path
+
+        Raises
+        ------
+        FileTooLargeError
+            If the content is larger than the storage accepts.
+        InvalidFileTypeError
+            If the content doesn't match the extension of ``filename``.
+        """
+        pass
+
+    @abstractmethod
+    async def hash_blob(self, upload: UploadFile, suffix: str) -> Blob:
+        """Check an upload and hash its content, without saving anything
+
+        Raises
+        ------
+        FileTooLargeError
+            If the content is larger than the storage accepts.
+        InvalidFileTypeError
+            If the content doesn't match ``suffix``.
+        """
+        pass
+
+    @abstractmethod
+    async def save_blob(self, blob: Blob, upload: UploadFile) -> bool:
+        """Save the content of ``blob`` unless it's already stored
+
+        Returns whether the content was written.  The blob is read and deleted
+        as the file `Blob.name`.
+        """
         pass
 
     @abstractmethod
-    def read_file(self, filename: str) -> FileResponse:
-        """Read content from a file at the specified path"""
+    async def read_file(
+        self, filename: str, download_name: str | None = None
+    ) -> Response:
+        """Return a response downloading the file, named ``download_name``
+
+        Raises
+        ------
+        FileNotFoundError
+            If there's no such file.
+        """
         pass
 
     @abstractmethod
-    def delete_file(self, filename: str) -> None:
+    async def delete_file(self, filename: str) -> None:
         """Delete a file at the specified path"""
         pass
 
     @abstractmethod
-    def file_exists(self, filename: str) -> bool:
+    async def file_exists(self, filename: str) -> bool:
         """Check if a file exists at the specified path"""
         pass
 
     @abstractmethod
-    def zip_files(self, zip_file_name: str, filenames: list[str]) -> StreamingResponse:
-        """Create a zip file from a list of filenames"""
+    def zip_files(
+        self, zip_file_name: str, files: Iterable[tuple[str, str]]
+    ) -> StreamingResponse:
+        """Create a zip file from pairs of names in the archive and filenames"""
+        pass
+
+    @abstractmethod
+    def export_files(
+        self, zip_file_name: str, files: Iterable[tuple[str, Sequence[str]]]
+    ) -> StreamingResponse:
+        """Create a zip file with each file under several names
+
+        ``files`` are pairs of filenames and the names of the members holding
+        their content.  Each file is read once, however many names it has.
+        """
         pass
 
 
+def _sync(buffer: io.BufferedWriter) -> None:
+    buffer.flush()
+    os.fsync(buffer.fileno())
+
+
+def _open(path: Path) -> tuple[float, BinaryIO] | None:
+    try:
+        source = path.open("rb")
+    except FileNotFoundError:
+        return None
+    return os.fstat(source.fileno()).st_mtime, source
+
+
 class LocalStorageProvider(StorageProvider):
-    def __init__(self, base_directory: str) -> None:
+    """Store files in a local directory.
+
+    Files named ``{trimestre}_...`` are sharded into a subdirectory per
+    trimestre, blobs into a subdirectory per first two digits of their hash,
+    and paths are resolved from the name rather than searched for.  Files
+    saved before the sharding, directly in the base directory, are still
+    found there and moved when they're replaced.
+
+    With ``index``, the location of every file is listed once at startup and
+    kept up to date by the provider, so finding a file costs no system call.
+    Names missing from the index are still looked up on disk, in case another
+    process saved them.
+
+    With ``accel_redirect``, the internal location of a reverse proxy serving
+    the base directory, downloads are answered with an ``X-Accel-Redirect``
+    to the file instead of its content, and the proxy sends the file itself.
+    """
+
+    def __init__(
+        self,
+        base_directory: str,
+        *,
+        max_file_size: int | None = None,
+        index: bool = False,
+        accel_redirect: str | None = None,
+    ) -> None:
         self.base_directory: Path = Path(base_directory)
+        self.max_file_size = max_file_size
+        self.accel_redirect = (
+            None if accel_redirect is None else accel_redirect.rstrip("/") + "/"
+        )
         Path(self.base_directory).mkdir(parents=True, exist_ok=True)
+        self._index: dict[str, Path] | None = self._scan() if index else None
+
+    def _scan(self) -> dict[str, Path]:
+        """List the files of the storage, sharded or not."""
+        index: dict[str, Path] = {}
+        with os.scandir(self.base_directory) as entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir():
+                    with os.scandir(entry.path) as shard:
+                        index.update(
+                            (file.name, Path(file.path))
+                            for file in shard
+                            if file.is_file() and not file.name.startswith(".")
+                        )
+                elif entry.is_file():
+                    # Sharded files take precedence over legacy ones
+                    index.setdefault(entry.name, Path(entry.path))
+        return index
 
-    def save_file(self, filename: str, upload: UploadFile) -> None:
-        file_path = self.base_directory / filename
+    def _path(self, filename: str) -> Path:
+        """Return where ``filename`` is saved."""
+        if _BLOB_NAME.fullmatch(filename):
+            return self.base_directory / filename[:2] / filename
+        shard, separator, _ = filename.partition("_")
+        if separator and shard.isdigit():
+            return self.base_directory / shard / filename
+        return self.base_directory / filename
+
+    def _locate(self, filename: str) -> Path | None:
+        """Return the path of ``filename`` if it exists."""
+        if self._index is not None and filename in self._index:
+            return self._index[filename]
+
+        for path in (self._path(filename), self.base_directory / filename):
+            if path.is_file():
+                if self._index is not None:
+                    self._index[filename] = path
+                return path
+        return None
+
+    async def _write(
+        self, filename: str, upload: UploadFile, check: UploadCheck | None = None
+    ) -> None:
+        """Copy ``upload`` to ``filename`` without blocking the event loop.
+
+        The upload is copied in chunks to a temporary file next to its
+        destination, synced and renamed over it, so a file is either replaced
+        entirely or left untouched.
+        """
+        file_path = self._path(filename)
+        await run_in_threadpool(file_path.parent.mkdir, exist_ok=True)
+        fd, temp_name = await run_in_threadpool(
+            tempfile.mkstemp, dir=file_path.parent, prefix=f".{filename}."
+        )
+        try:
+            with os.fdopen(fd, "wb") as buffer:
+                while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                    if check is not None:
+                        check.update(chunk)
+                    await run_in_threadpool(buffer.write, chunk)
+                if check is not None:
+                    check.finish()
+                await run_in_threadpool(_sync, buffer)
 
-        with file_path.open("wb") as buffer:
-            shutil.copyfileobj(upload.file, buffer)
+            await run_in_threadpool(os.replace, temp_name, file_path)
+        except BaseException:
+            Path(temp_name).unlink(missing_ok=True)
+            raise
 
-    def read_file(self, filename: str) -> FileResponse:
-        found_files = list(self.base_directory.glob(filename))
+        legacy_path = self.base_directory / filename
+        if legacy_path != file_path:
+            await run_in_threadpool(legacy_path.unlink, missing_ok=True)
+        if self._index is not None:
+            self._index[filename] = file_path
 
-        if not found_files:
+    async def save_file(self, filename: str, upload: UploadFile) -> None:
+        """Save the upload without blocking the event loop.
+
+        Its size and signature are checked while it's copied, before it
+        replaces the file.
+        """
+        await self._write(filename, upload, UploadCheck(filename, self.max_file_size))
+
+    async def hash_blob(self, upload: UploadFile, suffix: str) -> Blob:
+        return await hash_upload(upload, suffix, self.max_file_size)
+
+    async def save_blob(self, blob: Blob, upload: UploadFile) -> bool:
+        if self._locate(blob.name) is not None:
+            return False
+
+        await upload.seek(0)
+        await self._write(blob.name, upload)
+        return True
+
+    async def read_file(
+        self, filename: str, download_name: str | None = None
+    ) -> Response:
+        file_path = self._locate(filename)
+
+        if file_path is None:
             raise FileNotFoundError(f"File not found: {filename}")
 
+        if self.accel_redirect is not None:
+            location = file_path.relative_to(self.base_directory).as_posix()
+            return Response(
+                media_type="application/octet-stream",
+                headers={
+                    "X-Accel-Redirect": self.accel_redirect + quote(location),
+                    "Content-Disposition": (
+                        f'attachment; filename="{download_name or filename}"'
+                    ),
+                },
+            )
+
         return FileResponse(
-            path=found_files[0],
-            filename=filename,
+            path=file_path,
+            filename=download_name or filename,
             media_type="application/octet-stream",
         )
 
-    def delete_file(self, filename: str) -> None:
-        found_files = list(self.base_directory.glob(filename))
-        if not found_files:
-            return
+    async def delete_file(self, filename: str) -> None:
+        if self._index is not None:
+            self._index.pop(filename, None)
 
-        for file_path in found_files:
-            file_path.unlink()  # Delete the file
+        for file_path in {self._path(filename), self.base_directory / filename}:
+            await run_in_threadpool(file_path.unlink, missing_ok=True)
 
-    def file_exists(self, filename: str) -> bool:
-        found_files = list(self.base_directory.glob(filename))
-        return len(found_files) > 0
+    async def file_exists(self, filename: str) -> bool:
+        return self._locate(filename) is not None
 
-    def zip_files(self, zip_file_name: str, filenames: list[str]) -> StreamingResponse:
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-            for file_name in filenames:
-                found_files = list(self.base_directory.glob(file_name))
+    def zip_files(
+        self, zip_file_name: str, files: Iterable[tuple[str, str]]
+    ) -> StreamingResponse:
+        def resume_paths() -> Iterator[tuple[str, Path]]:
+            for arcname, file_name in files:
+                file_path = self._locate(file_name)
 
-                if not found_files:
+                if file_path is None:
                     # Skip students with no resume file
                     continue
 
-                resume_path = found_files[0]
-                zip_file.write(resume_path, arcname=resume_path.name)
-        zip_buffer.seek(0)
+                yield arcname, file_path
 
-        return StreamingResponse(
-            zip_buffer,
-            media_type="application/zip",
-            headers={
-                "Content-Disposition": f"attachment; filename={zip_file_name}.zip"
-            },
-        )
+        return zip_response(zip_file_name, stream_zip(resume_paths(), _open))
+
+    def export_files(
+        self, zip_file_name: str, files: Iterable[tuple[str, Sequence[str]]]
+    ) -> StreamingResponse:
+        def file_paths() -> Iterator[tuple[Path, Sequence[str]]]:
+            for file_name, arcnames in files:
+                file_path = self._locate(file_name)
+                if file_path is not None:
+                    yield file_path, arcnames
+
+        return zip_response(zip_file_name, stream_shared_zip(file_paths(), _open))
@@ -1,12 +1,20 @@
+from collections.abc import Awaitable, Callable
 from typing import Any, List
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 
 from src.dependencies.context import Context
-from src.dependencies.campagne import CurrentCampagne
-from src.dependencies.cours import CurrentCourse
+from src.dependencies.campagne import (
+    CurrentCampagne,
+    WritableCampagne,
+    ensure_campagne_writable,
+)
+from src.dependencies.projection import CampagneProjection
+from src.dependencies.version import DataVersion, set_etag
+from src.dependencies.cours import WritableCourse
 from src.dependencies.activite import CurrentActivite
 from src.dependencies.groupe import CurrentGroupe, get_current_groupe
+from src.dependencies.pagination import Pagination, set_next_cursor
 
 from src.models.responses import (
     CampagneFullResponse,
@@ -20,11 +28,58 @@ from src.models.requests import (
     CampagneUpdateRequest,
     SeanceUpdateRequest,
 )
-from src.exceptions import CampagneTooAhead, ActiviteNotFoundError
+from src.models.uqo import CampagneStatus
+from src.responses import (
+    accepts_ndjson,
+    dump,
+    negotiated_media_type,
+    render,
+    stream_ndjson,
+)
+from src.services.loaders import CAMPAGNE_TREE
+from src.services.projection import projected
+from src.exceptions import (
+    CampagneTooAhead,
+    CampagneArchivedError,
+    CampagneNotArchivedError,
+    CampagneNotClosedError,
+    ActiviteNotFoundError,
+)
 
 router = APIRouter(tags=["campagne"])
 
 
+async def cached_response(
+    context: Context,
+    trimestre: int,
+    etag: str | None,
+    variant: str,
+    render_body: Callable[[], Awaitable[bytes]],
+) -> Response:
+    """Answer with the rendered body of the current data version of a campagne.
+
+    The body is only rendered on the first request of each data version and
+    encoding, the following ones are served from the process' response cache.
+    """
+    media_type = negotiated_media_type()
+    if etag is None:
+        body = await render_body()
+    else:
+        body = await context.factory.campagne_response_cache.get_or_render(
+            trimestre, etag, f"{variant} {media_type}", render_body
+        )
+    response = Response(body, media_type=media_type)
+    set_etag(response, etag)
+    return response
+
+
+def campagne_not_found(trimestre: int) -> HTTPException:
+    return HTTPException(
+        status_code=404,
+        detail=f"Campagne introuvable pour le trimestre {trimestre}",
+    )
+
+
 @router.post(
     "/v1/campagne",
     response_model=CampagneFullResponse,
@@ -36,7 +91,7 @@ async def create_campagne(
 ) -> Any:
     campagne_service = context.factory.create_campagne_service()
 
-    if campagne_service.get_campagne(payload.trimestre):
+    if await campagne_service.campagne_exists(payload.trimestre):
         raise HTTPException(
             status_code=404,
             detail=f"Campagne already exists for trimestre {payload.trimestre}",
@@ -44,7 +99,7 @@ async def create_campagne(
 
     try:
         campagne = await campagne_service.add_campagne(payload)
-        return campagne
+        return render(CampagneFullResponse, campagne)
     except CampagneTooAhead:
         raise HTTPException(
             status_code=400,
@@ -53,57 +108,159 @@ async def create_campagne(
 
 
 @router.get("/v1/campagne", response_model=List[CampagneResponse])
-async def get_campagnes(*, context: Context) -> Any:
+async def get_campagnes(
+    *,
+    status: CampagneStatus | None = None,
+    pagination: Pagination,
+    context: Context,
+) -> Any:
     campagne_service = context.factory.create_campagne_service()
-    return await campagne_service.get_campagne_list()
+    page = await campagne_service.get_campagne_list(
+        status=status, limit=pagination.limit, after=pagination.after
+    )
+    response = render(List[CampagneResponse], page.items)
+    set_next_cursor(response, page)
+    return response
 
 
 @router.get("/v1/campagne/{trimestre}", response_model=CampagneFullResponse)
-def get_campagne_by_trimestre(
+async def get_campagne_by_trimestre(
     *,
-    campagne: CurrentCampagne,
+    trimestre: int,
+    etag: DataVersion,
+    projection: CampagneProjection,
+    context: Context,
 ) -> Any:
-    return campagne
+    async def render_campagne() -> bytes:
+        campagne_service = context.factory.create_campagne_service()
+        campagne = await campagne_service.get_campagne(
+            trimestre, include=projection.include() if projection else CAMPAGNE_TREE
+        )
+        if campagne is None:
+            raise campagne_not_found(trimestre)
+        return dump(projected(CampagneFullResponse, projection), campagne)
+
+    return await cached_response(
+        context, trimestre, etag, f"campagne {projection!r}", render_campagne
+    )
 
 
 @router.get("/v1/campagne/{trimestre}/cours", response_model=List[CoursResponse])
-def get_cours_by_trimestre(
+async def get_cours_by_trimestre(
     *,
-    campagne: CurrentCampagne,
+    trimestre: int,
+    etag: DataVersion,
+    request: Request,
+    context: Context,
 ) -> Any:
-    return campagne.cours
+    campagne_service = context.factory.create_campagne_service()
+
+    async def campagne_archived() -> bool:
+        archived = await campagne_service.campagne_archived(trimestre)
+        if archived is None:
+            raise campagne_not_found(trimestre)
+        return archived
+
+    if accepts_ndjson(request):
+        archived = await campagne_archived()
+
+        async def cours():
+            async with context.streaming_factory() as factory:
+                campagne_service = factory.create_campagne_service()
+                async for c in campagne_service.stream_cours(
+                    trimestre, archived=archived
+                ):
+                    yield c
+
+        return stream_ndjson(CoursResponse, cours())
+
+    async def render_cours() -> bytes:
+        cours = await campagne_service.get_cours(
+            trimestre, archived=await campagne_archived()
+        )
+        return dump(List[CoursResponse], cours)
+
+    return await cached_response(context, trimestre, etag, "cours", render_cours)
 
 
 @router.put("/v1/campagne/{trimestre}", response_model=CampagneFullResponse)
 async def update_campagne(
     *,
-    campagne: CurrentCampagne,
+    campagne: WritableCampagne,
     payload: CampagneUpdateRequest,
     context: Context,
 ) -> Any:
     campagne_service = context.factory.create_campagne_service()
     try:
-        return await campagne_service.update_campagne(campagne, payload)
+        campagne = await campagne_service.update_campagne(campagne, payload)
     except ValueError:
         raise HTTPException(
             status_code=400, detail="Configuration de campagne invalide"
         )
+    return render(CampagneFullResponse, campagne)
 
 
 @router.post("/v1/campagne/{trimestre}/sync", response_model=CampagneFullResponse)
 async def sync_campagne(
     trimestre: int,
-    campagne: CurrentCampagne,
+    campagne: WritableCampagne,
     context: Context,
 ) -> Any:
     uqo_service = context.factory.create_uqo_horaire_service(trimestre=trimestre)
-    return await uqo_service.sync_courses(campagne)
+    return render(CampagneFullResponse, await uqo_service.sync_courses(campagne))
+
+
+@router.post("/v1/campagne/{trimestre}/archive", response_model=CampagneFullResponse)
+async def archive_campagne(
+    *,
+    trimestre: int,
+    campagne: CurrentCampagne,
+    context: Context,
+) -> Any:
+    archive_service = context.factory.create_archive_service()
+    try:
+        await archive_service.archive(campagne)
+    except CampagneArchivedError:
+        raise HTTPException(
+            status_code=409,
+            detail=f"La campagne du trimestre {trimestre} est déjà archivée",
+        )
+    except CampagneNotClosedError:
+        raise HTTPException(
+            status_code=409,
+            detail="Seules les campagnes clôturées peuvent être archivées",
+        )
+
+    campagne_service = context.factory.create_campagne_service()
+    campagne = await campagne_service.get_campagne(trimestre)
+    return render(CampagneFullResponse, campagne)
+
+
+@router.post("/v1/campagne/{trimestre}/restore", response_model=CampagneFullResponse)
+async def restore_campagne(
+    *,
+    trimestre: int,
+    campagne: CurrentCampagne,
+    context: Context,
+) -> Any:
+    archive_service = context.factory.create_archive_service()
+    try:
+        await archive_service.restore(campagne)
+    except CampagneNotArchivedError:
+        raise HTTPException(
+            status_code=409,
+            detail=f"La campagne du trimestre {trimestre} n'est pas archivée",
+        )
+
+    campagne_service = context.factory.create_campagne_service()
+    campagne = await campagne_service.get_campagne(trimestre)
+    return render(CampagneFullResponse, campagne)
 
 
 @router.patch(
     "/v1/campagne/{trimestre}/{sigle}/changes/approve", response_model=ApprovalResponse
 )
-async def approve_course(*, trimestre: int, cours: CurrentCourse, context: Context):
+async def approve_course(*, trimestre: int, cours: WritableCourse, context: Context):
     cours_service = context.factory.create_cours_service(trimestre)
     return await cours_service.approve_changes(cours)
 
@@ -111,6 +268,7 @@ async def approve_course(*, trimestre: int, cours: CurrentCourse, context: Conte
 @router.patch(
     "/v1/campagne/{trimestre}/{sigle}/{groupe}/changes/approve",
     response_model=ApprovalResponse,
+    dependencies=[Depends(ensure_campagne_writable)],
 )
 async def approve_seance(*, trimestre: int, groupe: CurrentGroupe, context: Context):
     groupe_service = context.factory.create_groupe_service(trimestre)
@@ -120,7 +278,10 @@ async def approve_seance(*, trimestre: int, groupe: CurrentGroupe, context: Cont
 @router.patch(
     "/v1/campagne/{trimestre}/{sigle}/{groupe}/{activite_id}/changes/approve",
     response_model=ApprovalResponse,
-    dependencies=[Depends(get_current_groupe)],
+    dependencies=[
+        Depends(ensure_campagne_writable),
+        Depends(get_current_groupe),
+    ],
 )
 async def approve_activite(
     *, trimestre: int, activite: CurrentActivite, context: Context
@@ -129,7 +290,11 @@ async def approve_activite(
     return await groupe_service.approve_changes_activite(activite)
 
 
-@router.put("/v1/campagne/{trimestre}/{sigle}/{groupe}", response_model=SeanceResponse)
+@router.put(
+    "/v1/campagne/{trimestre}/{sigle}/{groupe}",
+    response_model=SeanceResponse,
+    dependencies=[Depends(ensure_campagne_writable)],
+)
 async def modify_activity(
     *,
     trimestre: int,
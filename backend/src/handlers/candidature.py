@@ -1,14 +1,27 @@
-from fastapi import APIRouter, HTTPException, Depends
+from typing import Annotated
+
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
 from fastapi.responses import FileResponse
 
-from src.dependencies.campagne import get_current_campagne
+from src.dependencies.campagne import ensure_campagne_exists, ensure_campagne_writable
 from src.dependencies.etudiant import ensure_etudiant_does_not_exist, CurrentEtudiant
 from src.dependencies.context import Context
+from src.dependencies.pagination import Pagination, set_next_cursor
+from src.dependencies.projection import EtudiantProjection
+from src.dependencies.version import DataVersion, set_etag
 
 from src.models.responses import EtudiantFullResponse, Message
-from src.models.requests import CandidatureForm
+from src.models.requests import CandidatureFilters, CandidatureForm
+from src.responses import accepts_ndjson, render, stream_ndjson
+from src.services.loaders import ETUDIANT_TREE
+from src.services.projection import projected
 
-from src.exceptions import StorageError, ResumeNotFoundError
+from src.exceptions import (
+    StorageError,
+    FileTooLargeError,
+    InvalidFileTypeError,
+    ResumeNotFoundError,
+)
 
 router = APIRouter(tags=["candidature"])
 
@@ -17,7 +30,7 @@ router = APIRouter(tags=["candidature"])
     "/v1/{trimestre}/candidature",
     response_model=EtudiantFullResponse,
     dependencies=[
-        Depends(get_current_campagne),
+        Depends(ensure_campagne_writable),
         Depends(ensure_etudiant_does_not_exist),
     ],
 )
@@ -30,7 +43,11 @@ async def create_candidature(
     try:
         candidature_service = context.factory.create_candidature_service(trimestre)
         etudiant = await candidature_service.add_candidature(form)
-        return etudiant
+        return render(EtudiantFullResponse, etudiant)
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except InvalidFileTypeError as e:
+        raise HTTPException(status_code=415, detail=str(e))
     except StorageError:
         raise HTTPException(
             status_code=500,
@@ -42,7 +59,7 @@ async def create_candidature(
     "/v1/{trimestre}/candidature/{etudiant_id}/resume",
     response_class=FileResponse,
     dependencies=[
-        Depends(get_current_campagne),
+        Depends(ensure_campagne_exists),
     ],
 )
 async def download_candidature_resume(
@@ -66,19 +83,53 @@ async def download_candidature_resume(
     "/v1/{trimestre}/candidature",
     response_model=list[EtudiantFullResponse],
     dependencies=[
-        Depends(get_current_campagne),
+        Depends(ensure_campagne_exists),
     ],
 )
-async def get_candidatures(*, trimestre: int, context: Context):
+async def get_candidatures(
+    *,
+    trimestre: int,
+    etag: DataVersion,
+    filters: Annotated[CandidatureFilters, Query()],
+    pagination: Pagination,
+    projection: EtudiantProjection,
+    request: Request,
+    context: Context,
+):
+    include = projection.include() if projection else ETUDIANT_TREE
+    if accepts_ndjson(request):
+
+        async def etudiants():
+            async with context.streaming_factory() as factory:
+                candidature_service = factory.create_candidature_service(trimestre)
+                async for etudiant in candidature_service.stream_candidatures(
+                    filters=filters,
+                    limit=pagination.limit,
+                    after=pagination.after,
+                    include=include,
+                ):
+                    yield etudiant
+
+        return stream_ndjson(projected(EtudiantFullResponse, projection), etudiants())
+
     candidature_service = context.factory.create_candidature_service(trimestre)
-    return await candidature_service.get_all_candidature()
+    page = await candidature_service.get_candidatures(
+        filters=filters,
+        limit=pagination.limit,
+        after=pagination.after,
+        include=include,
+    )
+    response = render(list[projected(EtudiantFullResponse, projection)], page.items)
+    set_next_cursor(response, page)
+    set_etag(response, etag)
+    return response
 
 
 @router.put(
     "/v1/{trimestre}/candidature/{etudiant_id}",
     response_model=EtudiantFullResponse,
     dependencies=[
-        Depends(get_current_campagne),
+        Depends(ensure_campagne_writable),
     ],
 )
 async def update_student(
@@ -90,7 +141,12 @@ async def update_student(
 ):
     try:
         candidature_service = context.factory.create_candidature_service(trimestre)
-        return await candidature_service.update_candidature(current_etudiant, form)
+        etudiant = await candidature_service.update_candidature(current_etudiant, form)
+        return render(EtudiantFullResponse, etudiant)
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except InvalidFileTypeError as e:
+        raise HTTPException(status_code=415, detail=str(e))
     except StorageError:
         raise HTTPException(
             status_code=500,
@@ -101,7 +157,7 @@ async def update_student(
 @router.delete(
     "/v1/{trimestre}/candidature/{etudiant_id}",
     dependencies=[
-        Depends(get_current_campagne),
+        Depends(ensure_campagne_writable),
     ],
 )
 async def delete_student(
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import StreamingResponse
 
-from src.dependencies.cours import CurrentCourse
+from src.dependencies.campagne import ensure_campagne_exists
+from src.dependencies.cours import CurrentCourse, WritableCourse
 from src.dependencies.context import Context
 
 from src.models.responses import CoursFullResponse
@@ -18,7 +19,7 @@ router = APIRouter(tags=["cours"])
 )
 async def add_candidature_to_cours(
     *,
-    cours: CurrentCourse,
+    cours: WritableCourse,
     trimestre: int,
     payload: CandidaturePayload,
     context: Context,
@@ -45,3 +46,18 @@ async def download_multiple_resumes(
         raise HTTPException(
             status_code=400, detail="Aucun étudiant trouvé pour le cours donné."
         )
+
+
+@router.post(
+    "/v1/campagne/{trimestre}/resumes",
+    response_class=StreamingResponse,
+    dependencies=[Depends(ensure_campagne_exists)],
+)
+async def download_campagne_resumes(*, trimestre: int, context: Context):
+    try:
+        candidature_service = context.factory.create_candidature_service(trimestre)
+        return await candidature_service.get_resumes_for_campagne()
+    except NoStudentsFoundError:
+        raise HTTPException(
+            status_code=400, detail="Aucun étudiant trouvé pour la campagne donnée."
+        )
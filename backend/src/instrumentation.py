@@ -0,0 +1,139 @@
+"""Per-request SQL instrumentation.
+
+Engine event hooks time every statement and add it to the `QueryStats` of the
+request being served, which `QueryStatsMiddleware` keeps in a context
+variable.  SQLAlchemy runs the async drivers in greenlets that share the
+context of the calling task, so the hooks always see the statistics of the
+request that issued the statement.  Statements that raise are recorded too.
+"""
+
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+__all__ = [
+    "QueryStats",
+    "QueryStatsMiddleware",
+    "current_query_stats",
+    "instrument",
+    "track_queries",
+]
+
+_query_stats: ContextVar["QueryStats | None"] = ContextVar("query_stats", default=None)
+
+
+@dataclass(slots=True)
+class QueryStats:
+    """Statements executed while serving a request."""
+
+    count: int = 0
+    total_time: float = 0.0
+    """Time spent executing statements, in seconds."""
+
+    slowest_time: float = 0.0
+    slowest_statement: str | None = None
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.total_time += elapsed
+        if elapsed >= self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = statement
+
+    def log_fields(self) -> dict[str, Any]:
+        return {
+            "db_statements": self.count,
+            "db_time_ms": round(self.total_time * 1000, 2),
+            "db_slowest_ms": round(self.slowest_time * 1000, 2),
+            "db_slowest_statement": self.slowest_statement,
+        }
+
+    def headers(self) -> dict[str, str]:
+        return {
+            "X-DB-Statement-Count": str(self.count),
+            "X-DB-Time-Ms": f"{self.total_time * 1000:.2f}",
+            "X-DB-Slowest-Ms": f"{self.slowest_time * 1000:.2f}",
+        }
+
+
+def current_query_stats() -> QueryStats | None:
+    """Return the statistics of the request being served, if tracked."""
+    return _query_stats.get()
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Record the statements executed in the current context."""
+    stats = QueryStats()
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+def instrument(engine: AsyncEngine) -> None:
+    """Time the statements executed by ``engine``."""
+
+    def _record(conn: Any, statement: str) -> None:
+        _, start = conn.info["query_start"].pop()
+        stats = _query_stats.get()
+        if stats is not None:
+            stats.record(statement, time.perf_counter() - start)
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        conn.info.setdefault("query_start", []).append((statement, time.perf_counter()))
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        _record(conn, statement)
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def _error(context: Any) -> None:
+        # The statement raised, after_cursor_execute won't pop its start.
+        # Errors raised before it started have nothing to pop.
+        conn = context.connection
+        if conn is None or context.statement is None:
+            return
+        starts = conn.info.get("query_start")
+        if starts and starts[-1][0] == context.statement:
+            _record(conn, context.statement)
+
+
+class QueryStatsMiddleware:
+    """Track the statements of every HTTP request.
+
+    Parameters
+    ----------
+    app
+        The wrapped application.
+    expose_headers
+        Whether to add the statistics to the response headers.
+    """
+
+    def __init__(self, app: ASGIApp, *, expose_headers: bool = False) -> None:
+        self.app = app
+        self.expose_headers = expose_headers
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+
+            async def send_with_stats(message: Message) -> None:
+                if message["type"] == "http.response.start" and self.expose_headers:
+                    MutableHeaders(scope=message).update(stats.headers())
+                await send(message)
+
+            await self.app(scope, receive, send_with_stats)
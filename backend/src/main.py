@@ -1,14 +1,20 @@
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
 
+import structlog
 from fastapi import FastAPI
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from starlette.middleware.cors import CORSMiddleware
 
 from src.handlers import campagnes, candidature, cours, uqo
 from src.config import Settings, settings
 from src.dependencies.context import context_dependency
-from src.dependencies.session import db_session_dependency
+from src.dependencies.session import db_session_dependency, pool_timeout_handler
+from src.dependencies.pagination import NEXT_CURSOR_HEADER
 from src.dependencies.http_client import http_client_dependency
+from src.instrumentation import QueryStatsMiddleware
+from src.responses import APIResponse, NegotiationMiddleware
+from src.sqlite import SQLiteProfile
 
 
 def create_app(settings: Settings):
@@ -16,7 +22,17 @@ def create_app(settings: Settings):
     async def lifespan(app: FastAPI) -> AsyncGenerator[None]:
         await context_dependency.initialize(settings)
         await db_session_dependency.initialize(
-            settings.SQLALCHEMY_DATABASE_URI, connect_args={"check_same_thread": False}
+            settings.SQLALCHEMY_ASYNC_DATABASE_URI,
+            read_only_url=settings.SQLALCHEMY_ASYNC_READONLY_DATABASE_URI,
+            reader_pool_size=settings.SQLITE_READER_POOL_SIZE,
+            archive_path=settings.SQLITE_ARCHIVE_FILE_NAME,
+            connect_args={"check_same_thread": False},
+            profile=SQLiteProfile.from_settings(settings),
+            optimize_interval=settings.SQLITE_OPTIMIZE_INTERVAL,
+            pool_timeout=settings.SQLITE_POOL_TIMEOUT,
+        )
+        structlog.get_logger("gca-uqo").info(
+            "SQLite profile applied", **await db_session_dependency.pragmas()
         )
 
         yield
@@ -29,6 +45,7 @@ def create_app(settings: Settings):
         title=settings.PROJECT_NAME,
         openapi_url=f"{settings.API_V1_STR}/openapi.json",
         lifespan=lifespan,
+        default_response_class=APIResponse,
     )
 
     app.include_router(campagnes.router)
@@ -36,6 +53,13 @@ def create_app(settings: Settings):
     app.include_router(cours.router)
     app.include_router(uqo.router)
 
+    app.add_exception_handler(PoolTimeoutError, pool_timeout_handler)
+
+    app.add_middleware(NegotiationMiddleware)
+    app.add_middleware(
+        QueryStatsMiddleware, expose_headers=settings.ENVIRONMENT != "prod"
+    )
+
     if settings.all_cors_origins:
         app.add_middleware(
             CORSMiddleware,
@@ -43,6 +67,7 @@ def create_app(settings: Settings):
             allow_credentials=True,
             allow_methods=["*"],
             allow_headers=["*"],
+            expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
         )
 
     return app
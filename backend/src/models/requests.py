@@ -34,6 +34,16 @@ class SeanceUpdateRequest(BaseModel):
     activite: List[ActiviteUpdateRequest]
 
 
+class CandidatureFilters(BaseModel):
+    cycle: int | None = None
+    campus: Campus | None = None
+    programme: str | None = None
+    sigle: str | None = None
+    """Only etudiants who applied to this cours."""
+    note: Note | None = None
+    """Only etudiants with a candidature of this note."""
+
+
 class CandidatureCoursItemRequest(BaseModel):
     sigle: str
     titre: str = ""
@@ -0,0 +1,199 @@
+"""Response encoding.
+
+Responses are JSON unless the client prefers MessagePack, which it asks for
+with ``Accept: application/msgpack``.  `NegotiationMiddleware` picks the
+encoding of every request and keeps it in a context variable, and
+`APIResponse`, the default response class of the app, encodes the content of
+the routes with it: orjson for JSON, msgpack for MessagePack.  Both encodings
+have the same shape, the MessagePack one is built from the JSON-compatible
+objects of the response models.  MessagePack bodies are about a fifth smaller,
+for clients on slow links, but they cost the server more CPU time than JSON:
+pydantic-core writes JSON itself, while MessagePack goes through those Python
+objects first.
+
+FastAPI still turns the return value of a route into plain Python objects
+before encoding it, which for the large response trees costs more than the
+encoding itself.  The routes returning those trees use `render` instead, which
+validates the ORM objects into the response model and has pydantic-core write
+the JSON bytes directly.
+
+The list routes can also stream their rows as newline-delimited JSON, one
+object per line serialized as soon as it is read, when the client asks for it
+with ``Accept: application/x-ndjson``.
+"""
+
+from collections.abc import AsyncIterable
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any
+
+import msgpack
+from fastapi import Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import TypeAdapter
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+__all__ = [
+    "JSON_MEDIA_TYPE",
+    "MSGPACK_MEDIA_TYPE",
+    "NDJSON_MEDIA_TYPE",
+    "APIResponse",
+    "NegotiationMiddleware",
+    "accepts_ndjson",
+    "dump",
+    "negotiate",
+    "negotiated_media_type",
+    "render",
+    "stream_ndjson",
+]
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+_media_type: ContextVar[str] = ContextVar("media_type", default=JSON_MEDIA_TYPE)
+
+
+def _media_ranges(accept: str) -> list[tuple[str, float]]:
+    """Parse an ``Accept`` header into its media ranges and their quality."""
+    ranges = []
+    for media_range in accept.split(","):
+        media_type, *params = (part.strip() for part in media_range.split(";"))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if media_type:
+            ranges.append((media_type.lower(), quality))
+    return ranges
+
+
+def negotiate(accept: str | None) -> str:
+    """Return the media type to answer an ``Accept`` header with.
+
+    MessagePack is only used when the client lists it, at least as high as
+    JSON, whether JSON is named or matched by a wildcard.
+    """
+    if not accept:
+        return JSON_MEDIA_TYPE
+
+    msgpack_quality = json_quality = 0.0
+    json_specificity = -1
+    for media_type, quality in _media_ranges(accept):
+        if media_type in (MSGPACK_MEDIA_TYPE, "application/x-msgpack"):
+            msgpack_quality = max(msgpack_quality, quality)
+            continue
+
+        specificity = {JSON_MEDIA_TYPE: 2, "application/*": 1, "*/*": 0}.get(
+            media_type, -1
+        )
+        if specificity > json_specificity:
+            json_quality, json_specificity = quality, specificity
+
+    if msgpack_quality > 0 and msgpack_quality >= json_quality:
+        return MSGPACK_MEDIA_TYPE
+    return JSON_MEDIA_TYPE
+
+
+def negotiated_media_type() -> str:
+    """Return the media type of the response to the request being served."""
+    return _media_type.get()
+
+
+class NegotiationMiddleware:
+    """Pick the encoding of the responses from the ``Accept`` header.
+
+    Every response varies on ``Accept``, so it's added to their ``Vary``
+    header for the caches along the way.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_vary(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).add_vary_header("Accept")
+            await send(message)
+
+        token = _media_type.set(negotiate(Headers(scope=scope).get("accept")))
+        try:
+            await self.app(scope, receive, send_with_vary)
+        finally:
+            _media_type.reset(token)
+
+
+class APIResponse(ORJSONResponse):
+    """Encode content with orjson, or msgpack if the client prefers it."""
+
+    def __init__(self, content: Any, *args: Any, **kwargs: Any) -> None:
+        self.media_type = negotiated_media_type()
+        super().__init__(content, *args, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        if self.media_type == MSGPACK_MEDIA_TYPE:
+            return msgpack.packb(content)
+        return super().render(content)
+
+
+# Bounded, response models are built per sparse fieldset of the clients
+@lru_cache(maxsize=256)
+def _adapter(response_model: Any) -> TypeAdapter[Any]:
+    return TypeAdapter(response_model)
+
+
+def dump(response_model: Any, content: Any, media_type: str | None = None) -> bytes:
+    """Serialize ``content`` as ``response_model``.
+
+    The bytes are encoded as ``media_type``, the negotiated one by default.
+    MessagePack only saves payload size: the model is dumped to Python objects
+    before msgpack packs them, which is slower than pydantic-core writing the
+    JSON bytes (see ``tests/benchmarks/serialization.py``).
+    """
+    adapter = _adapter(response_model)
+    validated = adapter.validate_python(content, from_attributes=True)
+    if (media_type or negotiated_media_type()) == MSGPACK_MEDIA_TYPE:
+        return msgpack.packb(adapter.dump_python(validated, mode="json"))
+    return adapter.dump_json(validated)
+
+
+def render(response_model: Any, content: Any, *, status_code: int = 200) -> Response:
+    """Serialize ``content`` as ``response_model`` into a response.
+
+    The route should still declare ``response_model`` for the OpenAPI schema,
+    FastAPI doesn't process responses returned as they are.
+    """
+    return Response(
+        dump(response_model, content),
+        status_code=status_code,
+        media_type=negotiated_media_type(),
+    )
+
+
+def accepts_ndjson(request: Request) -> bool:
+    """Whether the client asked for a newline-delimited JSON stream."""
+    ranges = _media_ranges(request.headers.get("accept", ""))
+    return any(
+        media_type == NDJSON_MEDIA_TYPE and quality > 0
+        for media_type, quality in ranges
+    )
+
+
+def stream_ndjson(item_model: Any, items: AsyncIterable[Any]) -> StreamingResponse:
+    """Stream ``items`` as newline-delimited JSON, serialized as ``item_model``."""
+
+    async def lines() -> AsyncIterable[bytes]:
+        async for item in items:
+            yield dump(item_model, item, JSON_MEDIA_TYPE)
+            yield b"\n"
+
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,218 @@
+"""Storage of the files in an S3-compatible object store.
+
+Needs boto3, installed with the ``s3`` extra of the project.  Files are the
+objects of a bucket, so every backend host shares them.  The boto3 calls are
+blocking, they run in the thread pool.
+"""
+
+import mimetypes
+from collections.abc import Iterable, Sequence
+from typing import Any, BinaryIO
+
+from botocore.exceptions import ClientError
+from fastapi import Response, UploadFile
+from fastapi.responses import RedirectResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from src.file import (
+    UPLOAD_CHUNK_SIZE,
+    Blob,
+    StorageProvider,
+    UploadCheck,
+    hash_upload,
+    stream_shared_zip,
+    stream_zip,
+    zip_response,
+)
+
+S3_PART_SIZE = 8 * 1024 * 1024
+"""Bytes uploaded per part of a multipart upload, at least 5 MiB for S3."""
+
+
+def _not_found(error: ClientError) -> bool:
+    return error.response.get("Error", {}).get("Code") in (
+        "404",
+        "NoSuchKey",
+        "NotFound",
+    )
+
+
+class S3StorageProvider(StorageProvider):
+    """Store files as the objects of a bucket, named ``{prefix}{filename}``.
+
+    Uploads are sent in parts of ``part_size`` bytes as they're received, and
+    only replace the object once they're complete, so a file is either
+    replaced entirely or left untouched.  Downloads redirect to a presigned
+    URL valid for ``url_expiry`` seconds, and clients fetch the content from
+    the object store directly.  The frontend downloads with XHR, so the
+    bucket must allow its origin with CORS (see the backend README).
+    Archives are written by the backend from the streams of the objects.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        bucket: str,
+        *,
+        prefix: str = "",
+        max_file_size: int | None = None,
+        url_expiry: int = 5 * 60,
+        part_size: int = S3_PART_SIZE,
+    ) -> None:
+        self._client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.max_file_size = max_file_size
+        self.url_expiry = url_expiry
+        self.part_size = part_size
+
+    def _key(self, filename: str) -> str:
+        return f"{self.prefix}{filename}"
+
+    async def _head(self, filename: str) -> dict[str, Any] | None:
+        try:
+            return await run_in_threadpool(
+                self._client.head_object, Bucket=self.bucket, Key=self._key(filename)
+            )
+        except ClientError as e:
+            if _not_found(e):
+                return None
+            raise
+
+    def _open(self, key: str) -> tuple[float, BinaryIO] | None:
+        try:
+            obj = self._client.get_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if _not_found(e):
+                return None
+            raise
+        return obj["LastModified"].timestamp(), obj["Body"]
+
+    async def _write(
+        self, filename: str, upload: UploadFile, check: UploadCheck | None = None
+    ) -> None:
+        """Upload ``upload`` as ``filename`` without blocking the event loop.
+
+        Content fitting in one part is put as it is, larger content goes
+        through a multipart upload, aborted if anything fails.
+        """
+        key = self._key(filename)
+        content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        upload_id: str | None = None
+        parts: list[dict[str, Any]] = []
+        buffer = bytearray()
+
+        async def upload_part() -> None:
+            nonlocal upload_id
+            if upload_id is None:
+                created = await run_in_threadpool(
+                    self._client.create_multipart_upload,
+                    Bucket=self.bucket,
+                    Key=key,
+                    ContentType=content_type,
+                )
+                upload_id = created["UploadId"]
+            part = await run_in_threadpool(
+                self._client.upload_part,
+                Bucket=self.bucket,
+                Key=key,
+                UploadId=upload_id,
+                PartNumber=len(parts) + 1,
+                Body=bytes(buffer),
+            )
+            parts.append({"ETag": part["ETag"], "PartNumber": len(parts) + 1})
+            buffer.clear()
+
+        try:
+            while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                if check is not None:
+                    check.update(chunk)
+                buffer += chunk
+                if len(buffer) >= self.part_size:
+                    await upload_part()
+            if check is not None:
+                check.finish()
+
+            if upload_id is None:
+                await run_in_threadpool(
+                    self._client.put_object,
+                    Bucket=self.bucket,
+                    Key=key,
+                    Body=bytes(buffer),
+                    ContentType=content_type,
+                )
+                return
+
+            if buffer:
+                await upload_part()
+            await run_in_threadpool(
+                self._client.complete_multipart_upload,
+                Bucket=self.bucket,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+        except BaseException:
+            if upload_id is not None:
+                await run_in_threadpool(
+                    self._client.abort_multipart_upload,
+                    Bucket=self.bucket,
+                    Key=key,
+                    UploadId=upload_id,
+                )
+            raise
+
+    async def save_file(self, filename: str, upload: UploadFile) -> None:
+        """Upload the file, checking its size and signature as it's sent."""
+        await self._write(filename, upload, UploadCheck(filename, self.max_file_size))
+
+    async def hash_blob(self, upload: UploadFile, suffix: str) -> Blob:
+        return await hash_upload(upload, suffix, self.max_file_size)
+
+    async def save_blob(self, blob: Blob, upload: UploadFile) -> bool:
+        if await self._head(blob.name) is not None:
+            return False
+
+        await upload.seek(0)
+        await self._write(blob.name, upload)
+        return True
+
+    async def read_file(
+        self, filename: str, download_name: str | None = None
+    ) -> Response:
+        if await self._head(filename) is None:
+            raise FileNotFoundError(f"File not found: {filename}")
+
+        url = self._client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": self._key(filename),
+                "ResponseContentType": "application/octet-stream",
+                "ResponseContentDisposition": (
+                    f'attachment; filename="{download_name or filename}"'
+                ),
+            },
+            ExpiresIn=self.url_expiry,
+        )
+        return RedirectResponse(url)
+
+    async def delete_file(self, filename: str) -> None:
+        await run_in_threadpool(
+            self._client.delete_object, Bucket=self.bucket, Key=self._key(filename)
+        )
+
+    async def file_exists(self, filename: str) -> bool:
+        return await self._head(filename) is not None
+
+    def zip_files(
+        self, zip_file_name: str, files: Iterable[tuple[str, str]]
+    ) -> StreamingResponse:
+        keys = ((arcname, self._key(file_name)) for arcname, file_name in files)
+        return zip_response(zip_file_name, stream_zip(keys, self._open))
+
+    def export_files(
+        self, zip_file_name: str, files: Iterable[tuple[str, Sequence[str]]]
+    ) -> StreamingResponse:
+        keys = ((self._key(file_name), arcnames) for file_name, arcnames in files)
+        return zip_response(zip_file_name, stream_shared_zip(keys, self._open))
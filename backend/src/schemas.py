@@ -13,7 +13,7 @@ from src.models.uqo import (
     ChangeType,
 )
 from sqlalchemy.ext.mutable import MutableDict, MutableList
-from sqlalchemy import ForeignKeyConstraint
+from sqlalchemy import ForeignKeyConstraint, Index
 
 
 class Campagne(SQLModel, table=True):
@@ -22,11 +22,57 @@ class Campagne(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     trimestre: int = Field(index=True)
     status: CampagneStatus = Field(default=CampagneStatus.en_cours)
+    archived: bool = Field(default=False)
+    """Whether the cours and candidatures of the campagne are in the archive."""
     config: Dict[str, Any] = Field(
         default={}, sa_column=Column(MutableDict.as_mutable(JSON))
     )
 
     cours: list["Cours"] = Relationship(back_populates="campagne")
+    stats: Optional["CampagneStats"] = Relationship(
+        back_populates="campagne",
+        cascade_delete=True,
+        sa_relationship_kwargs=dict(uselist=False),
+    )
+
+
+class CampagneStats(SQLModel, table=True):
+    """Statistics of a campaign, kept up to date by every write to the campaign."""
+
+    id_campagne: int = Field(foreign_key="campagne.id", primary_key=True)
+    cout_total: float = 0
+    nb_cours: int = 0
+    nbr_td_total: int = 0
+    nbr_tp_total: int = 0
+    nbr_candidature_cycle1: int = 0
+    nbr_candidature_cycle2: int = 0
+    nbr_candidature_cycle3: int = 0
+    nbr_assistant_cycle1: int = 0
+    nbr_assistant_cycle2: int = 0
+    nbr_assistant_cycle3: int = 0
+    version: int = 1
+    """Data version of the campagne, incremented by every write to it."""
+
+    campagne: Campagne = Relationship(back_populates="stats")
+
+
+class ResumeBlob(SQLModel, table=True):
+    """A resume file, stored once for every etudiant who uploaded the same content.
+
+    Archived etudiants keep their references, so the table stays in the main
+    database.
+    """
+
+    hash: str = Field(primary_key=True)
+    """SHA-256 of the content, in hexadecimal."""
+
+    size: int
+    refcount: int = 0
+    """Number of etudiants referencing the blob, deleted when it drops to 0."""
+
+    @staticmethod
+    def file_name(hash: str) -> str:
+        return f"{hash}.pdf"
 
 
 class Cours(SQLModel, table=True):
@@ -51,7 +97,7 @@ class Cours(SQLModel, table=True):
         )
     )
 
-    id_campagne: int | None = Field(default=None, foreign_key="campagne.id")
+    id_campagne: int | None = Field(default=None, foreign_key="campagne.id", index=True)
     campagne: Campagne = Relationship(back_populates="cours")
 
 
@@ -87,7 +133,9 @@ class ActiviteCandidature(SQLModel, table=True):
     """Association table linking activities and candidatures."""
 
     id_activite: int = Field(foreign_key="activite.id", primary_key=True)
-    id_candidature: int = Field(foreign_key="candidature.id", primary_key=True)
+    id_candidature: int = Field(
+        foreign_key="candidature.id", primary_key=True, index=True
+    )
 
 
 class Activite(SQLModel, table=True):
@@ -98,6 +146,10 @@ class Activite(SQLModel, table=True):
             ["trimestre", "sigle", "groupe"],
             ["seance.trimestre", "seance.sigle", "seance.groupe"],
         ),
+        Index("ix_activite_trimestre_sigle_groupe", "trimestre", "sigle", "groupe"),
+        Index("ix_activite_trimestre_type", "trimestre", "type"),
+        # Ids are never reused, so that archived rows can be restored
+        {"sqlite_autoincrement": True},
     )
 
     trimestre: int
@@ -127,6 +179,13 @@ class Activite(SQLModel, table=True):
 class Etudiant(SQLModel, table=True):
     """Represents a student, including personal and academic information, and their candidatures."""
 
+    __table_args__ = (
+        Index("ix_etudiant_trimestre_code_permanent", "trimestre", "code_permanent"),
+        Index("ix_etudiant_trimestre_email", "trimestre", "email"),
+        # Ids are never reused, so that archived rows can be restored
+        {"sqlite_autoincrement": True},
+    )
+
     id: Optional[int] | None = Field(default=None, primary_key=True)
     code_permanent: str = Field(index=True)
     email: str
@@ -135,7 +194,9 @@ class Etudiant(SQLModel, table=True):
     cycle: int
     campus: Campus = Field(default=Campus.non_specifie)
     programme: str
-    trimestre: int
+    trimestre: int = Field(index=True)
+    resume_hash: str | None = Field(default=None, index=True)
+    """`ResumeBlob` of the resume, which predates deduplication if `None`."""
 
     candidature: list["Candidature"] = Relationship(
         back_populates="etudiant", cascade_delete=True
@@ -145,15 +206,33 @@ class Etudiant(SQLModel, table=True):
     def get_file_name(self):
         return f"{self.trimestre}_{self.id}.pdf"
 
+    @property
+    def resume_file_name(self) -> str:
+        """The name the resume is stored as."""
+        if self.resume_hash is not None:
+            return ResumeBlob.file_name(self.resume_hash)
+        return self.get_file_name
+
 
 class Candidature(SQLModel, table=True):
     """Represents a student's application (candidature) to a course, including their note and related activities."""
 
+    __table_args__ = (
+        Index(
+            "ix_candidature_trimestre_sigle_id_etudiant",
+            "trimestre",
+            "sigle",
+            "id_etudiant",
+        ),
+        # Ids are never reused, so that archived rows can be restored
+        {"sqlite_autoincrement": True},
+    )
+
     sigle: str
     titre: str = ""
     trimestre: int
     id: Optional[int] | None = Field(default=None, primary_key=True)
-    id_etudiant: int = Field(foreign_key="etudiant.id")
+    id_etudiant: int = Field(foreign_key="etudiant.id", index=True)
     note: Note = Field(default=Note.non_specifie)
 
     etudiant: Etudiant = Relationship(back_populates="candidature")
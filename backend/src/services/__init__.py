@@ -1,13 +1,17 @@
+from src.services.archive import ArchiveService
 from src.services.campagne import CampagneService
 from src.services.etudiant import EtudiantService
 from src.services.candidature import CandidatureService
 from src.services.cours import CoursService
 from src.services.groupe import GroupeService
+from src.services.stats import CampagneStatsService
 
 __all__ = [
+    "ArchiveService",
     "CampagneService",
     "EtudiantService",
     "CandidatureService",
     "CoursService",
-    "GroupeService"
+    "GroupeService",
+    "CampagneStatsService",
 ]
@@ -0,0 +1,109 @@
+from typing import Any
+
+from structlog import BoundLogger
+from sqlalchemy import Table, delete, insert, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.archive import ARCHIVED_TABLES, archive_tables, main_tables
+from src.schemas import Campagne
+from src.services.stats import CampagneStatsService
+from src.models.uqo import CampagneStatus
+
+from src.exceptions import (
+    CampagneArchivedError,
+    CampagneNotArchivedError,
+    CampagneNotClosedError,
+)
+
+
+class ArchiveService:
+    """Move the rows of closed campagnes to the archive and back.
+
+    The campagne itself and its statistics stay in the main database, so
+    that the campagne list doesn't depend on the archive.
+
+    SQLite doesn't commit atomically across attached databases in WAL mode,
+    so a move commits the copy before deleting the source rows.  A move
+    interrupted in between leaves the rows in both databases, and the next
+    attempt replaces the copy.
+    """
+
+    def __init__(
+        self,
+        *,
+        session: AsyncSession,
+        stats: CampagneStatsService,
+        logger: BoundLogger,
+    ) -> None:
+        self._session = session
+        self._stats = stats
+        self._logger = logger
+
+    async def archive(self, campagne: Campagne) -> None:
+        if campagne.archived:
+            raise CampagneArchivedError
+        if campagne.status != CampagneStatus.cloturee:
+            raise CampagneNotClosedError
+
+        # The statistics are frozen from now on
+        await self._stats.refresh(campagne.trimestre)
+        await self._move(
+            campagne.trimestre, source=main_tables(), target=archive_tables()
+        )
+
+        campagne.archived = True
+        self._session.add(campagne)
+        await self._session.commit()
+
+        self._logger.info("Campagne archived", trimestre=campagne.trimestre)
+
+    async def restore(self, campagne: Campagne) -> None:
+        if not campagne.archived:
+            raise CampagneNotArchivedError
+
+        await self._move(
+            campagne.trimestre, source=archive_tables(), target=main_tables()
+        )
+
+        campagne.archived = False
+        self._session.add(campagne)
+        await self._stats.refresh(campagne.trimestre)
+        await self._session.commit()
+
+        self._logger.info("Campagne restored", trimestre=campagne.trimestre)
+
+    async def _move(
+        self, trimestre: int, *, source: dict[str, Table], target: dict[str, Table]
+    ) -> None:
+        """Move the rows of ``trimestre`` from the ``source`` tables to ``target``.
+
+        Leaves the transaction open on the deletion of the source rows.
+        """
+        for name in reversed(ARCHIVED_TABLES):
+            await self._session.exec(
+                delete(target[name]).where(self._rows(target, name, trimestre))
+            )
+        for name in ARCHIVED_TABLES:
+            await self._session.exec(
+                insert(target[name]).from_select(
+                    [column.name for column in source[name].columns],
+                    select(source[name]).where(self._rows(source, name, trimestre)),
+                )
+            )
+        await self._session.commit()
+
+        for name in reversed(ARCHIVED_TABLES):
+            await self._session.exec(
+                delete(source[name]).where(self._rows(source, name, trimestre))
+            )
+
+    @staticmethod
+    def _rows(tables: dict[str, Table], name: str, trimestre: int) -> Any:
+        """Select the rows of the campagne of ``trimestre`` in ``tables[name]``."""
+        table = tables[name]
+        if name == "activitecandidature":
+            activite = tables["activite"]
+            return table.c.id_activite.in_(
+                select(activite.c.id).where(activite.c.trimestre == trimestre)
+            )
+        return table.c.trimestre == trimestre
@@ -1,28 +1,104 @@
+from collections.abc import AsyncIterator, Iterable, Sequence
 from datetime import datetime
 from typing import Any
 
 from structlog import BoundLogger
-from sqlmodel import select
-from sqlmodel import Session
-
-from src.schemas import Campagne, Cours, Activite, Etudiant
-from src.models.requests import CampagneCreateRequest, CampagneUpdateRequest
-from src.models.uqo import CampagneConfig, ActiviteType
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Load, joinedload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import SelectOfScalar
+
+from src.archive import FROM_ARCHIVE
+from src.schemas import Campagne, Cours
+from src.services.loaders import CAMPAGNE_TREE, campagne_tree, cours_tree
+from src.services.pagination import STREAM_BATCH_SIZE, Page, keyset, make_page
+from src.services.projection import Include
+from src.services.stats import CampagneStatsService
+from src.models.requests import (
+    CampagneCreateRequest,
+    CampagneUpdateRequest,
+    CampagneCoursRequestItem,
+)
+from src.models.uqo import CampagneConfig, CampagneStatus
 
 from src.exceptions import CampagneTooAhead
 
 
 class CampagneService:
-    def __init__(self, *, session: Session, logger: BoundLogger) -> None:
+    def __init__(
+        self,
+        *,
+        session: AsyncSession,
+        stats: CampagneStatsService,
+        logger: BoundLogger,
+    ) -> None:
         self._session = session
+        self._stats = stats
         self._logger = logger
 
-    def get_campagne(self, trimestre: int) -> Campagne | None:
-        campagne = self._session.exec(
-            select(Campagne).where(Campagne.trimestre == trimestre)
+    async def get_campagne(
+        self, trimestre: int, *, include: Include = CAMPAGNE_TREE
+    ) -> Campagne | None:
+        campagne = (
+            await self._session.exec(
+                select(Campagne)
+                .where(Campagne.trimestre == trimestre)
+                .options(*campagne_tree(trimestre, include))
+                .execution_options(populate_existing=True)
+            )
         ).first()
+        if campagne is not None and "cours" in include:
+            await self._load_archived_cours(
+                [campagne], *cours_tree(trimestre, include=include["cours"])
+            )
         return campagne
 
+    async def campagne_exists(self, trimestre: int) -> bool:
+        campagne_id = (
+            await self._session.exec(
+                select(Campagne.id).where(Campagne.trimestre == trimestre)
+            )
+        ).first()
+        return campagne_id is not None
+
+    async def campagne_archived(self, trimestre: int) -> bool | None:
+        """Whether the campagne of ``trimestre`` is archived, `None` if there is none."""
+        return (
+            await self._session.exec(
+                select(Campagne.archived).where(Campagne.trimestre == trimestre)
+            )
+        ).first()
+
+    async def get_cours(self, trimestre: int, *, archived: bool = False) -> list[Cours]:
+        """Return the cours of the campagne of ``trimestre``, by sigle."""
+        return list(
+            (await self._session.exec(self._cours_statement(trimestre, archived))).all()
+        )
+
+    async def stream_cours(
+        self, trimestre: int, *, archived: bool = False
+    ) -> AsyncIterator[Cours]:
+        """Yield the cours of `get_cours` from a server-side cursor."""
+        result = await self._session.stream_scalars(
+            self._cours_statement(trimestre, archived).execution_options(
+                yield_per=STREAM_BATCH_SIZE
+            )
+        )
+        async for cours in result.partitions():
+            for c in cours:
+                yield c
+            self._session.expunge_all()
+
+    def _cours_statement(self, trimestre: int, archived: bool) -> SelectOfScalar[Cours]:
+        statement = (
+            select(Cours).where(Cours.trimestre == trimestre).order_by(col(Cours.sigle))
+        )
+        if archived:
+            statement = statement.execution_options(**FROM_ARCHIVE)
+        return statement
+
     async def add_campagne(self, payload: CampagneCreateRequest):
         def is_more_than_3_trimestres_ahead(target_trimestre: int) -> bool:
             now = datetime.now()
@@ -41,122 +117,43 @@ class CampagneService:
             config=CampagneConfig(**payload.config).model_dump(),
         )
         self._session.add(campagne)
-        self._session.commit()
-        self._session.refresh(campagne)
-
-        processed_cours = set()
-        for cours in payload.cours:
-            if cours.sigle in processed_cours:
-                continue
-            cours = Cours(
-                campagne=campagne,
-                trimestre=payload.trimestre,
-                sigle=cours.sigle,
-                titre=cours.titre,
-            )
-            processed_cours.add(cours.sigle)
-            self._session.add(cours)
+        await self._session.flush()
 
-        self._session.commit()
+        await self._insert_cours(campagne, payload.cours)
 
-        self._session.refresh(campagne, attribute_names=["cours"])
+        await self._stats.refresh(payload.trimestre)
+        await self._session.commit()
 
-        return campagne
+        return await self.get_campagne(payload.trimestre)
 
-    async def get_campagne_list(self):
-        campagnes = self._session.exec(select(Campagne)).all()
+    async def get_campagne_list(
+        self,
+        *,
+        status: CampagneStatus | None = None,
+        limit: int | None = None,
+        after: int | None = None,
+    ) -> Page[dict[str, Any]]:
+        statement = select(Campagne).options(
+            selectinload(Campagne.cours), joinedload(Campagne.stats)
+        )
+        if status is not None:
+            statement = statement.where(Campagne.status == status)
 
-        result: list[dict[str, Any]] = []
-        for campagne in campagnes:
-            configs = CampagneConfig(**campagne.config)
-
-            # Cout total
-            cout_total = 0
-            total_assistant_par_cycle: tuple[set[int], set[int], set[int]] = (
-                set(),
-                set(),
-                set(),
+        campagnes = (
+            await self._session.exec(
+                keyset(statement, col(Campagne.id), limit=limit, after=after)
             )
+        ).all()
+
+        await self._load_archived_cours(campagnes)
 
-            for cours in campagne.cours:
-                for seance in cours.seance:
-                    etudiant_contracts_total: dict[int, float] = {}
-                    etudiant_contracts_nbr_seance_weekly: dict[
-                        int, dict[ActiviteType, int]
-                    ] = {}
-                    for activite in seance.activite:
-                        for responsable in activite.responsable:
-                            total_assistant_par_cycle[
-                                responsable.etudiant.cycle - 1
-                            ].add(responsable.id_etudiant)
-
-                            if responsable.id_etudiant not in etudiant_contracts_total:
-                                etudiant_contracts_total[responsable.id_etudiant] = 0
-                                etudiant_contracts_nbr_seance_weekly[
-                                    responsable.id_etudiant
-                                ] = {ActiviteType.TD: 0, ActiviteType.TP: 0}
-                            etudiant_contracts_nbr_seance_weekly[
-                                responsable.id_etudiant
-                            ][activite.type] += 1
-
-                            hrs_prepa = configs.activite_heure[
-                                activite.type
-                            ].preparation
-                            hrs_travail = configs.activite_heure[activite.type].travail
-
-                            # Add Prépa time only once per n activity in a week
-                            if (
-                                etudiant_contracts_nbr_seance_weekly[
-                                    responsable.id_etudiant
-                                ][activite.type]
-                                == 1
-                            ):
-                                hrs_prepa = configs.activite_heure[
-                                    activite.type
-                                ].preparation
-                                etudiant_contracts_total[responsable.id_etudiant] += (
-                                    activite.nombre_seance
-                                    * hrs_prepa
-                                    * configs.echelle_salariale[
-                                        responsable.etudiant.cycle - 1
-                                    ]
-                                )
-
-                            etudiant_contracts_total[responsable.id_etudiant] += (
-                                activite.nombre_seance
-                                * hrs_travail
-                                * configs.echelle_salariale[
-                                    responsable.etudiant.cycle - 1
-                                ]
-                            )
-
-                    tot_seance = sum(etudiant_contracts_total.values())
-                    cout_total += tot_seance
-
-            # Distribution des sceances
-            activite_td = self._session.exec(
-                select(Activite).where(
-                    (Activite.type == ActiviteType.TD)
-                    & (Activite.trimestre == campagne.trimestre)
-                )
-            ).all()
-            nbr_td_total = len([activite.nombre_seance for activite in activite_td])
-
-            activite_tp = self._session.exec(
-                select(Activite).where(
-                    (Activite.type == ActiviteType.TP)
-                    & (Activite.trimestre == campagne.trimestre)
-                )
-            ).all()
-            nbr_tp_total = len([activite.nombre_seance for activite in activite_tp])
-
-            # Distribution des candidats
-            etudiant = self._session.exec(
-                select(Etudiant.cycle).where(Etudiant.trimestre == campagne.trimestre)
-            ).all()
-            nbr_candidature_cycle1 = etudiant.count(1)
-            nbr_candidature_cycle2 = etudiant.count(2)
-            nbr_candidature_cycle3 = etudiant.count(3)
+        # Campagnes that predate the statistics table until the next rebuild
+        missing = await self._stats.compute([c for c in campagnes if not c.stats])
+
+        result: list[dict[str, Any]] = []
+        for campagne in campagnes:
+            assert campagne.id is not None
+            stats = campagne.stats or missing[campagne.id]
 
             campagne_dict = {
                 "id": campagne.id,
@@ -164,22 +161,11 @@ class CampagneService:
                 "status": campagne.status,
                 "config": campagne.config,
                 "cours": campagne.cours,
-                "stats": {
-                    "cout_total": float(f"{cout_total:.2f}"),
-                    "nb_cours": len(campagne.cours),
-                    "nbr_td_total": nbr_td_total,
-                    "nbr_tp_total": nbr_tp_total,
-                    "nbr_candidature_cycle1": nbr_candidature_cycle1,
-                    "nbr_candidature_cycle2": nbr_candidature_cycle2,
-                    "nbr_candidature_cycle3": nbr_candidature_cycle3,
-                    "nbr_assistant_cycle1": len(total_assistant_par_cycle[0]),
-                    "nbr_assistant_cycle2": len(total_assistant_par_cycle[1]),
-                    "nbr_assistant_cycle3": len(total_assistant_par_cycle[2]),
-                },
+                "stats": stats.model_dump(exclude={"id_campagne", "version"}),
             }
             result.append(campagne_dict)
 
-        return result
+        return make_page(result, lambda c: c["id"], limit=limit)
 
     async def update_campagne(self, campagne: Campagne, payload: CampagneUpdateRequest):
         # Update Campagne fields
@@ -189,8 +175,6 @@ class CampagneService:
             campagne.status = payload.status
 
         self._session.add(campagne)
-        self._session.commit()
-        self._session.refresh(campagne)
 
         if payload.cours is not None:
             existing_courses = campagne.cours
@@ -202,23 +186,70 @@ class CampagneService:
 
             for course in existing_courses:
                 if course.sigle in sigles_to_remove:
-                    self._session.delete(course)
-
-            processed_cours = set()
-            for cours in payload.cours:
-                if cours.sigle in processed_cours:
-                    continue
-                if cours.sigle in sigles_to_add:
-                    new_course = Cours(
-                        campagne=campagne,
-                        trimestre=campagne.trimestre,
-                        sigle=cours.sigle,
-                        titre=cours.titre,
-                    )
-                    self._session.add(new_course)
+                    await self._session.delete(course)
 
-            self._session.commit()
+            await self._insert_cours(
+                campagne, [c for c in payload.cours if c.sigle in sigles_to_add]
+            )
 
-            self._session.refresh(campagne, attribute_names=["cours"])
+        await self._stats.refresh(campagne.trimestre)
+        await self._session.commit()
+
+        return await self.get_campagne(campagne.trimestre)
+
+    async def _load_archived_cours(
+        self, campagnes: Sequence[Campagne], *options: Load
+    ) -> None:
+        """Load the cours of the archived ``campagnes`` from the archive.
+
+        The eager loads of the campagne query found none of them in the main
+        database.
+        """
+        ids = [campagne.id for campagne in campagnes if campagne.archived]
+        if not ids:
+            return
+
+        cours = (
+            await self._session.exec(
+                select(Cours)
+                .where(col(Cours.id_campagne).in_(ids))
+                .options(*options)
+                .execution_options(populate_existing=True, **FROM_ARCHIVE)
+            )
+        ).all()
 
-        return campagne
+        by_campagne: dict[int, list[Cours]] = {}
+        for c in cours:
+            assert c.id_campagne is not None
+            by_campagne.setdefault(c.id_campagne, []).append(c)
+        for campagne in campagnes:
+            if campagne.archived:
+                assert campagne.id is not None
+                set_committed_value(campagne, "cours", by_campagne.get(campagne.id, []))
+
+    async def _insert_cours(
+        self, campagne: Campagne, items: Iterable[CampagneCoursRequestItem]
+    ) -> None:
+        """Insert the cours of ``items`` with a single ``executemany``.
+
+        Repeated sigles keep their first occurrence, and cours that already
+        exist are left untouched.
+        """
+        rows: dict[str, dict[str, Any]] = {}
+        for item in items:
+            if item.sigle not in rows:
+                rows[item.sigle] = Cours(
+                    id_campagne=campagne.id,
+                    trimestre=campagne.trimestre,
+                    sigle=item.sigle,
+                    titre=item.titre,
+                ).model_dump()
+        if not rows:
+            return
+
+        await self._session.exec(
+            insert(Cours).on_conflict_do_nothing(
+                index_elements=[Cours.sigle, Cours.trimestre]
+            ),
+            params=list(rows.values()),
+        )
@@ -1,15 +1,35 @@
-from structlog import BoundLogger
-from sqlmodel import Session, select
-from fastapi.responses import FileResponse, StreamingResponse
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any
 
-from src.schemas import Etudiant, Candidature, Cours
-from src.models.requests import CandidatureForm, CandidaturePayload
+from structlog import BoundLogger
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import col, select
+from sqlmodel.sql.expression import SelectOfScalar
+from sqlmodel.ext.asyncio.session import AsyncSession
+from fastapi import Response, UploadFile
+from fastapi.responses import StreamingResponse
+
+from src.archive import FROM_ARCHIVE, is_archived
+from src.schemas import Campagne, Etudiant, Candidature, Cours, ResumeBlob
+from src.services.loaders import ETUDIANT_TREE, cours_tree, etudiant_tree
+from src.services.pagination import STREAM_BATCH_SIZE, Page, keyset, make_page
+from src.services.projection import Include
+from src.services.stats import CampagneStatsService
+from src.models.requests import (
+    CandidatureFilters,
+    CandidatureForm,
+    CandidaturePayload,
+)
 from src.models.uqo import Campus
 
-from src.file import StorageProvider
+from src.file import Blob, StorageProvider
 from src.exceptions import (
     StorageError,
-    FileDeleteError,
+    FileTooLargeError,
+    InvalidFileTypeError,
     ResumeNotFoundError,
     CandidatureExistsError,
     NoStudentsFoundError,
@@ -21,160 +41,413 @@ class CandidatureService:
         self,
         trimestre: int,
         *,
-        session: Session,
+        session: AsyncSession,
         storage: StorageProvider,
+        stats: CampagneStatsService,
         logger: BoundLogger,
     ) -> None:
         self._trimestre = trimestre
         self._session = session
         self._storage = storage
+        self._stats = stats
         self._logger = logger
 
     async def add_candidature(self, form: CandidatureForm) -> Etudiant:
-        new_etudiant = Etudiant(
-            code_permanent=form.code_permanent,
-            email=form.email,
-            nom=form.nom,
-            prenom=form.prenom,
-            cycle=form.cycle,
-            campus=form.campus,
-            programme=form.programme,
-            trimestre=self._trimestre,
-        )
-        self._session.add(new_etudiant)
-        self._session.flush()
-
-        assert new_etudiant.id is not None, (
-            "Student ID should not be None after commit."
-        )
-
-        for course in form.courses:
-            candidature = Candidature(
-                id_etudiant=new_etudiant.id,
-                sigle=course.sigle,
-                titre=course.titre,
+        async with self._stored_resume(form.resume) as blob:
+            new_etudiant = Etudiant(
+                code_permanent=form.code_permanent,
+                email=form.email,
+                nom=form.nom,
+                prenom=form.prenom,
+                cycle=form.cycle,
+                campus=form.campus,
+                programme=form.programme,
                 trimestre=self._trimestre,
-                note=course.note,
             )
-            self._session.add(candidature)
+            self._session.add(new_etudiant)
+            await self._session.flush()
+
+            assert new_etudiant.id is not None, (
+                "Student ID should not be None after commit."
+            )
 
-        self._session.flush()
+            for course in form.courses:
+                candidature = Candidature(
+                    id_etudiant=new_etudiant.id,
+                    sigle=course.sigle,
+                    titre=course.titre,
+                    trimestre=self._trimestre,
+                    note=course.note,
+                )
+                self._session.add(candidature)
 
-        if form.resume:
-            try:
-                self._storage.save_file(new_etudiant.get_file_name, form.resume)
-            except Exception as e:
-                self._session.rollback()
-                raise StorageError(e)
-            finally:
-                await form.resume.close()
+            await self._session.flush()
 
-        self._session.commit()
-        self._session.refresh(new_etudiant)
+            released = None
+            if blob is not None:
+                released = await self._reference_resume(new_etudiant, blob)
 
-        return new_etudiant
+            await self._stats.refresh(self._trimestre)
+            await self._session.commit()
+
+        await self._delete_released(released)
+
+        return await self._get_etudiant_full(new_etudiant.id)
 
     async def update_candidature(self, etudiant: Etudiant, form: CandidatureForm):
-        if form.nom:
-            etudiant.nom = form.nom
-        if form.prenom:
-            etudiant.prenom = form.prenom
-        if form.cycle:
-            etudiant.cycle = form.cycle
-        if form.email:
-            etudiant.email = form.email
-        if form.campus:
-            etudiant.campus = form.campus
-        if form.programme:
-            etudiant.programme = form.programme
+        legacy = await self._legacy_resume(etudiant) if form.resume else None
+        async with self._stored_resume(form.resume) as blob:
+            if form.nom:
+                etudiant.nom = form.nom
+            if form.prenom:
+                etudiant.prenom = form.prenom
+            if form.cycle:
+                etudiant.cycle = form.cycle
+            if form.email:
+                etudiant.email = form.email
+            if form.campus:
+                etudiant.campus = form.campus
+            if form.programme:
+                etudiant.programme = form.programme
+
+            self._session.add(etudiant)
+            await self._session.flush()
+
+            assert etudiant.id is not None, (
+                "Student ID should not be None after commit."
+            )
 
+            if form.courses is not None:
+                existing_candidatures = etudiant.candidature
+
+                existing_sigles = {c.sigle for c in existing_candidatures}
+                new_sigles = {course.sigle for course in form.courses}
+                sigles_to_add = new_sigles - existing_sigles
+                sigles_to_remove = existing_sigles - new_sigles
+
+                for course in existing_candidatures:
+                    if course.sigle in sigles_to_remove:
+                        await self._session.delete(course)
+                    else:
+                        course.note = [
+                            c for c in form.courses if c.sigle == course.sigle
+                        ][0].note
+
+                    processed_cours = set()
+                    for cours in form.courses:
+                        if cours.sigle in processed_cours:
+                            continue
+                        if cours.sigle in sigles_to_add:
+                            candidature = Candidature(
+                                id_etudiant=etudiant.id,
+                                sigle=cours.sigle,
+                                titre=cours.titre,
+                                trimestre=self._trimestre,
+                                note=cours.note,
+                            )
+                            self._session.add(candidature)
+
+                await self._session.flush()
+
+            released = None
+            if blob is not None:
+                released = await self._reference_resume(etudiant, blob, legacy)
+
+            await self._stats.refresh(self._trimestre)
+            await self._session.commit()
+
+        await self._delete_released(released)
+
+        return await self._get_etudiant_full(etudiant.id)
+
+    @asynccontextmanager
+    async def _stored_resume(
+        self, resume: UploadFile | None
+    ) -> AsyncIterator[Blob | None]:
+        """Store ``resume`` for the change made in the block.
+
+        A blob saved for the change is deleted if the change fails, unless
+        another upload referenced it meanwhile.
+        """
+        if resume is None:
+            yield None
+            return
+
+        blob, saved = await self._store_resume(resume)
+        try:
+            yield blob
+        except BaseException:
+            if saved:
+                await self._session.rollback()
+                await self._delete_released(blob.name)
+            raise
+
+    async def _store_resume(self, resume: UploadFile) -> tuple[Blob, bool]:
+        """Check and hash ``resume``, and save its blob unless it's stored.
+
+        Returns the blob, and whether it was saved for this upload.
+
+        Runs before the change: the transaction of the dependencies is ended
+        first, so the writer connection goes back to the pool and other
+        writes go on while the file is received and written.
+
+        Raises
+        ------
+        FileTooLargeError, InvalidFileTypeError
+            If the resume is refused.
+        StorageError
+            If it couldn't be saved.
+        """
+        await self._session.commit()
+        try:
+            blob = await self._storage.hash_blob(resume, ".pdf")
+            saved = await self._storage.save_blob(blob, resume)
+            if saved:
+                self._logger.info("Resume blob saved", hash=blob.hash, size=blob.size)
+        except (FileTooLargeError, InvalidFileTypeError):
+            raise
+        except Exception as e:
+            raise StorageError(e)
+        finally:
+            await resume.close()
+        return blob, saved
+
+    async def _legacy_resume(self, etudiant: Etudiant) -> str | None:
+        """Return the file of the resume ``etudiant`` saved before deduplication.
+
+        Etudiants without a blob either have one or no resume at all.  The
+        storage is checked before the change, like the uploads.
+        """
+        if etudiant.resume_hash is not None:
+            return None
+
+        await self._session.commit()
+        if await self._storage.file_exists(etudiant.get_file_name):
+            return etudiant.get_file_name
+        return None
+
+    async def _reference_resume(
+        self, etudiant: Etudiant, blob: Blob, legacy: str | None = None
+    ) -> str | None:
+        """Point ``etudiant`` at the stored ``blob``.
+
+        Returns the file of the previous resume to delete once the change is
+        committed, as `_release_resume` does.  ``legacy`` is the file found by
+        `_legacy_resume`.
+        """
+        if etudiant.resume_hash == blob.hash:
+            return None
+
+        await self._session.exec(
+            insert(ResumeBlob)
+            .values(hash=blob.hash, size=blob.size, refcount=1)
+            .on_conflict_do_update(
+                index_elements=[ResumeBlob.hash],
+                set_={"refcount": ResumeBlob.refcount + 1},
+            )
+        )
+
+        previous = etudiant.resume_hash
+        etudiant.resume_hash = blob.hash
         self._session.add(etudiant)
-        self._session.flush()
-
-        assert etudiant.id is not None, "Student ID should not be None after commit."
-
-        if form.courses is not None:
-            existing_candidatures = etudiant.candidature
-
-            existing_sigles = {c.sigle for c in existing_candidatures}
-            new_sigles = {course.sigle for course in form.courses}
-            sigles_to_add = new_sigles - existing_sigles
-            sigles_to_remove = existing_sigles - new_sigles
-
-            for course in existing_candidatures:
-                if course.sigle in sigles_to_remove:
-                    self._session.delete(course)
-                else:
-                    course.note = [c for c in form.courses if c.sigle == course.sigle][
-                        0
-                    ].note
-
-                processed_cours = set()
-                for cours in form.courses:
-                    if cours.sigle in processed_cours:
-                        continue
-                    if cours.sigle in sigles_to_add:
-                        candidature = Candidature(
-                            id_etudiant=etudiant.id,
-                            sigle=cours.sigle,
-                            titre=cours.titre,
-                            trimestre=self._trimestre,
-                            note=cours.note,
-                        )
-                        self._session.add(candidature)
-
-            self._session.flush()
-
-        if form.resume:
-            try:
-                self._storage.save_file(etudiant.get_file_name, form.resume)
-            except Exception as e:
-                self._session.rollback()
-                raise StorageError(e)
-            finally:
-                await form.resume.close()
-
-        self._session.commit()
-        self._session.refresh(etudiant, attribute_names=["candidature"])
-
-        return etudiant
-
-    async def get_resume(self, etudiant: Etudiant) -> FileResponse:
+        return await self._release_resume(previous, legacy)
+
+    async def _release_resume(self, hash: str | None, legacy: str | None) -> str | None:
+        """Drop a reference to the blob ``hash``, or to the ``legacy`` file.
+
+        Returns the file to delete once the change is committed: the blob
+        when this was its last reference, or the resume saved before
+        deduplication.  Deleting it before the commit would leave a rolled
+        back row pointing to a missing file.
+        """
+        if hash is None:
+            return legacy
+
+        refcount = (
+            await self._session.exec(
+                update(ResumeBlob)
+                .where(col(ResumeBlob.hash) == hash)
+                .values(refcount=ResumeBlob.refcount - 1)
+                .returning(ResumeBlob.refcount)
+            )
+        ).scalar_one_or_none()
+        if refcount is None or refcount > 0:
+            return None
+
+        await self._session.exec(delete(ResumeBlob).where(col(ResumeBlob.hash) == hash))
+        return ResumeBlob.file_name(hash)
+
+    async def _delete_released(self, filename: str | None) -> None:
+        """Delete a file released by a committed change.
+
+        The change is already committed, so a failure only leaves an
+        unreferenced file behind, and is logged rather than raised.  Blobs
+        are saved before they're referenced, so a blob referenced again by an
+        upload committed in between is kept.
+        """
+        if filename is None:
+            return
+        referenced = await self._session.get(
+            ResumeBlob, Path(filename).stem, populate_existing=True
+        )
+        await self._session.commit()
+        if referenced is not None:
+            return
+        try:
+            await self._storage.delete_file(filename)
+        except Exception:
+            self._logger.warning(
+                "Released resume not deleted", filename=filename, exc_info=True
+            )
+
+    async def get_resume(self, etudiant: Etudiant) -> Response:
         try:
-            return self._storage.read_file(etudiant.get_file_name)
+            return await self._storage.read_file(
+                etudiant.resume_file_name, etudiant.get_file_name
+            )
         except FileNotFoundError:
             raise ResumeNotFoundError()
 
     async def get_resumes_for_course(self, cours: Cours) -> StreamingResponse:
-        filenames = [c.etudiant.get_file_name for c in cours.candidature]
-        if not filenames:
+        files = [
+            (c.etudiant.get_file_name, c.etudiant.resume_file_name)
+            for c in cours.candidature
+        ]
+        if not files:
             raise NoStudentsFoundError()
 
-        return self._storage.zip_files(f"resumes_{self._trimestre}", filenames)
+        return self._storage.zip_files(f"resumes_{self._trimestre}", files)
 
-    async def get_all_candidature(self) -> list[Etudiant]:
-        return list(
-            self._session.exec(
-                select(Etudiant).where(Etudiant.trimestre == self._trimestre)
-            ).all()
+    async def get_resumes_for_campagne(self) -> StreamingResponse:
+        """Archive the resumes of the campagne, in a folder per course.
+
+        A resume is read once for all the courses of the student, and once
+        for all the students who uploaded the same file.
+        """
+        statement = (
+            select(Candidature.sigle, Etudiant)
+            .join(Etudiant, col(Etudiant.id) == Candidature.id_etudiant)
+            .where(Candidature.trimestre == self._trimestre)
+            .order_by(col(Etudiant.id), col(Candidature.sigle))
         )
+        if await self._archived():
+            statement = statement.execution_options(**FROM_ARCHIVE)
 
-    async def remove_candidature(self, etudiant: Etudiant) -> None:
-        try:
-            self._storage.delete_file(etudiant.get_file_name)
-        except Exception:
-            raise FileDeleteError
+        files: dict[str, list[str]] = {}
+        for sigle, etudiant in await self._session.exec(statement):
+            files.setdefault(etudiant.resume_file_name, []).append(
+                f"{sigle}/{etudiant.get_file_name}"
+            )
+        if not files:
+            raise NoStudentsFoundError()
+
+        return self._storage.export_files(f"resumes_{self._trimestre}", files.items())
+
+    async def get_candidatures(
+        self,
+        *,
+        filters: CandidatureFilters | None = None,
+        limit: int | None = None,
+        after: int | None = None,
+        include: Include = ETUDIANT_TREE,
+    ) -> Page[Etudiant]:
+        statement = await self._candidatures_statement(filters, include)
+        etudiants = (
+            await self._session.exec(
+                keyset(statement, col(Etudiant.id), limit=limit, after=after)
+            )
+        ).all()
+        return make_page(etudiants, lambda e: e.id, limit=limit)
+
+    async def stream_candidatures(
+        self,
+        *,
+        filters: CandidatureFilters | None = None,
+        limit: int | None = None,
+        after: int | None = None,
+        include: Include = ETUDIANT_TREE,
+    ) -> AsyncIterator[Etudiant]:
+        """Yield the etudiants of `get_candidatures` from a server-side cursor.
+
+        Rows are fetched and eager loaded `STREAM_BATCH_SIZE` at a time, and
+        each batch is expunged from the session once consumed, so memory
+        doesn't grow with the number of etudiants.
+        """
+        statement = keyset(
+            await self._candidatures_statement(filters, include),
+            col(Etudiant.id),
+            limit=None,
+            after=after,
+        )
+        if limit is not None:
+            statement = statement.limit(limit)
+
+        result = await self._session.stream_scalars(
+            statement.execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+        async for etudiants in result.partitions():
+            for etudiant in etudiants:
+                yield etudiant
+            self._session.expunge_all()
+
+    async def _candidatures_statement(
+        self, filters: CandidatureFilters | None, include: Include
+    ) -> SelectOfScalar[Etudiant]:
+        statement = (
+            select(Etudiant)
+            .where(Etudiant.trimestre == self._trimestre)
+            .options(*etudiant_tree(include))
+        )
+        if filters:
+            statement = statement.where(*self._filter_clauses(filters))
+
+        if await self._archived():
+            statement = statement.execution_options(**FROM_ARCHIVE)
+        return statement
+
+    async def _archived(self) -> bool:
+        """Whether the rows of the campagne are in the archive database."""
+        return await is_archived(self._session, self._trimestre)
+
+    @staticmethod
+    def _filter_clauses(filters: CandidatureFilters) -> list[Any]:
+        clauses: list[Any] = []
+        if filters.cycle is not None:
+            clauses.append(Etudiant.cycle == filters.cycle)
+        if filters.campus is not None:
+            clauses.append(Etudiant.campus == filters.campus)
+        if filters.programme is not None:
+            clauses.append(Etudiant.programme == filters.programme)
+
+        if filters.sigle is not None or filters.note is not None:
+            candidature = select(Candidature.id).where(
+                Candidature.id_etudiant == Etudiant.id
+            )
+            if filters.sigle is not None:
+                candidature = candidature.where(Candidature.sigle == filters.sigle)
+            if filters.note is not None:
+                candidature = candidature.where(Candidature.note == filters.note)
+            clauses.append(candidature.exists())
+
+        return clauses
 
-        self._session.delete(etudiant)
-        self._session.commit()
+    async def remove_candidature(self, etudiant: Etudiant) -> None:
+        legacy = await self._legacy_resume(etudiant)
+        released = await self._release_resume(etudiant.resume_hash, legacy)
+        await self._session.delete(etudiant)
+        await self._stats.refresh(self._trimestre)
+        await self._session.commit()
+        await self._delete_released(released)
 
     async def add_candidature_to_cours(
         self, *, cours: Cours, payload: CandidaturePayload
     ):
-        student = self._session.exec(
-            select(Etudiant).where(
-                (Etudiant.code_permanent == payload.code_permanent)
-                & (Etudiant.trimestre == self._trimestre)
+        student = (
+            await self._session.exec(
+                select(Etudiant).where(
+                    (Etudiant.code_permanent == payload.code_permanent)
+                    & (Etudiant.trimestre == self._trimestre)
+                )
             )
         ).first()
 
@@ -193,16 +466,17 @@ class CandidatureService:
                 trimestre=self._trimestre,
             )
             self._session.add(student)
-            self._session.commit()
-            self._session.refresh(student)
+            await self._session.flush()
 
         assert student.id is not None, "Student ID should not be None after commit."
 
-        candidature = self._session.exec(
-            select(Candidature).where(
-                (Candidature.sigle == cours.sigle)
-                & (Candidature.trimestre == cours.trimestre)
-                & (Candidature.id_etudiant == student.id)
+        candidature = (
+            await self._session.exec(
+                select(Candidature).where(
+                    (Candidature.sigle == cours.sigle)
+                    & (Candidature.trimestre == cours.trimestre)
+                    & (Candidature.id_etudiant == student.id)
+                )
             )
         ).first()
 
@@ -216,7 +490,26 @@ class CandidatureService:
         )
 
         self._session.add(candidature)
-        self._session.commit()
-        self._session.refresh(cours, attribute_names=["candidature"])
-
-        return cours
+        await self._stats.refresh(self._trimestre)
+        await self._session.commit()
+
+        return (
+            await self._session.exec(
+                select(Cours)
+                .where(
+                    (Cours.trimestre == cours.trimestre) & (Cours.sigle == cours.sigle)
+                )
+                .options(*cours_tree(cours.trimestre))
+                .execution_options(populate_existing=True)
+            )
+        ).one()
+
+    async def _get_etudiant_full(self, etudiant_id: int | None) -> Etudiant:
+        return (
+            await self._session.exec(
+                select(Etudiant)
+                .where(Etudiant.id == etudiant_id)
+                .options(*etudiant_tree())
+                .execution_options(populate_existing=True)
+            )
+        ).one()
@@ -1,24 +1,47 @@
 from structlog import BoundLogger
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from src.archive import FROM_ARCHIVE, is_archived
 from src.schemas import Cours
+from src.services.loaders import cours_tree
+from src.services.stats import CampagneStatsService
 from src.models.responses import ApprovalResponse, ChangeInfo, ChangeType
 
 
 class CoursService:
     def __init__(
-        self, trimestre: int, *, session: Session, logger: BoundLogger
+        self,
+        trimestre: int,
+        *,
+        session: AsyncSession,
+        stats: CampagneStatsService,
+        logger: BoundLogger,
     ) -> None:
         self._trimestre = trimestre
         self._session = session
+        self._stats = stats
         self._logger = logger
 
-    async def get_course(self, sigle: str) -> Cours | None:
-        return self._session.exec(
-            select(Cours).where(
-                (Cours.trimestre == self._trimestre) & (Cours.sigle == sigle)
-            )
-        ).first()
+    async def get_course(
+        self, sigle: str, *, archived: bool | None = None
+    ) -> Cours | None:
+        """Return the cours ``sigle`` of the campagne.
+
+        It's read from the archive if the campagne is ``archived``, looked up
+        when it's None.
+        """
+        statement = (
+            select(Cours)
+            .where((Cours.trimestre == self._trimestre) & (Cours.sigle == sigle))
+            .options(*cours_tree(self._trimestre))
+            .execution_options(populate_existing=True)
+        )
+        if archived is None:
+            archived = await is_archived(self._session, self._trimestre)
+        if archived:
+            statement = statement.execution_options(**FROM_ARCHIVE)
+        return (await self._session.exec(statement)).first()
 
     async def approve_changes(self, cours: Cours) -> ApprovalResponse:
         approved_change = ChangeInfo(**cours.change)
@@ -32,7 +55,8 @@ class CoursService:
 
             self._session.add(cours)
 
-        self._session.commit()
+        await self._stats.refresh(self._trimestre)
+        await self._session.commit()
 
         return ApprovalResponse(
             entity=cours.model_dump(), change=approved_change, approved=True
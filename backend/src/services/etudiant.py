@@ -1,29 +1,49 @@
+from typing import Any
+
 from structlog import BoundLogger
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from src.archive import FROM_ARCHIVE, is_archived
 from src.schemas import Etudiant
+from src.services.loaders import etudiant_tree
 
 
 class EtudiantService:
     def __init__(
-        self, trimestre: int, *, session: Session, logger: BoundLogger
+        self, trimestre: int, *, session: AsyncSession, logger: BoundLogger
     ) -> None:
         self._trimestre = trimestre
         self._session = session
         self._logger = logger
 
-    def get_etudiant(self, *, code_permanent: str, email: str) -> Etudiant | None:
-        etudiant = self._session.exec(
-            select(Etudiant).where(
-                (
-                    (Etudiant.code_permanent == code_permanent)
-                    | (Etudiant.email == email)
+    async def get_etudiant(self, *, code_permanent: str, email: str) -> Etudiant | None:
+        etudiant = (
+            await self._session.exec(
+                select(Etudiant)
+                .where(
+                    (
+                        (Etudiant.code_permanent == code_permanent)
+                        | (Etudiant.email == email)
+                    )
+                    & (Etudiant.trimestre == self._trimestre)
                 )
-                & (Etudiant.trimestre == self._trimestre)
+                .options(*etudiant_tree())
+                .execution_options(populate_existing=True, **await self._source())
             )
         ).first()
 
         return etudiant
 
-    def get_etudiant_by_id(self, id) -> Etudiant | None:
-        return self._session.get(Etudiant, id)
+    async def get_etudiant_by_id(self, id) -> Etudiant | None:
+        return await self._session.get(
+            Etudiant,
+            id,
+            options=etudiant_tree(),
+            populate_existing=True,
+            execution_options=await self._source(),
+        )
+
+    async def _source(self) -> dict[str, Any]:
+        """Execution options reading the etudiants of an archived campagne."""
+        return FROM_ARCHIVE if await is_archived(self._session, self._trimestre) else {}
@@ -1,33 +1,54 @@
 from structlog import BoundLogger
-from sqlmodel import Session, select
+from sqlalchemy import bindparam, delete
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import selectinload
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from src.schemas import Seance, Activite, Candidature
+from src.schemas import Seance, Activite, ActiviteCandidature, Candidature
 from src.models.requests import SeanceUpdateRequest
 from src.models.responses import ApprovalResponse, ChangeInfo, ChangeType
 from src.models.uqo import ActiviteStatus
+from src.services.loaders import seance_tree
+from src.services.stats import CampagneStatsService
 from src.exceptions import ActiviteNotFoundError
 
 
 class GroupeService:
     def __init__(
-        self, trimestre: int, *, session: Session, logger: BoundLogger
+        self,
+        trimestre: int,
+        *,
+        session: AsyncSession,
+        stats: CampagneStatsService,
+        logger: BoundLogger,
     ) -> None:
         self._trimestre = trimestre
         self._session = session
+        self._stats = stats
         self._logger = logger
 
     async def get_groupe(self, *, sigle: str, groupe: str) -> Seance | None:
-        return self._session.exec(
-            select(Seance).where(
-                Seance.trimestre == self._trimestre,
-                Seance.sigle == sigle,
-                Seance.groupe == groupe,
+        return (
+            await self._session.exec(
+                select(Seance)
+                .where(
+                    Seance.trimestre == self._trimestre,
+                    Seance.sigle == sigle,
+                    Seance.groupe == groupe,
+                )
+                .options(*seance_tree(self._trimestre))
+                .execution_options(populate_existing=True)
             )
         ).first()
 
     async def get_activite(self, *, activite_id: int) -> Activite | None:
-        return self._session.exec(
-            select(Activite).where(Activite.id == activite_id)
+        return (
+            await self._session.exec(
+                select(Activite)
+                .where(Activite.id == activite_id)
+                .options(selectinload(Activite.responsable))
+            )
         ).first()
 
     async def approve_changes(self, seance: Seance) -> ApprovalResponse:
@@ -47,9 +68,10 @@ class GroupeService:
             seance.change["value"] = {}
 
         if approved_change.change_type == ChangeType.REMOVED:
-            self._session.delete(seance)
+            await self._session.delete(seance)
 
-        self._session.commit()
+        await self._stats.refresh(self._trimestre)
+        await self._session.commit()
 
         return ApprovalResponse(
             entity=seance.model_dump(), change=approved_change, approved=True
@@ -63,9 +85,10 @@ class GroupeService:
             activite.change["value"] = {}
 
         if approved_change.change_type == ChangeType.REMOVED:
-            self._session.delete(activite)
+            await self._session.delete(activite)
 
-        self._session.commit()
+        await self._stats.refresh(self._trimestre)
+        await self._session.commit()
 
         return ApprovalResponse(
             entity=activite.model_dump(), change=approved_change, approved=True
@@ -74,39 +97,94 @@ class GroupeService:
     async def update_groupe(
         self, *, groupe: Seance, payload: SeanceUpdateRequest
     ) -> Seance:
-        for act in payload.activite:
-            activite = await self.get_activite(activite_id=act.id)
+        activites, links = await self._get_activites_with_links(
+            [act.id for act in payload.activite]
+        )
+        candidatures = await self._get_existing_candidatures(
+            {
+                candidature_id
+                for act in payload.activite
+                for candidature_id in act.candidature or []
+            }
+        )
 
+        # The payload replaces the responsables of the activites that list them
+        replaced: set[int] = set()
+        wanted: set[tuple[int, int]] = set()
+        for act in payload.activite:
+            activite = activites.get(act.id)
             if not activite:
                 raise ActiviteNotFoundError()
-                raise HTTPException(status_code=404, detail="Activite not found")
 
             if act.candidature is not None:
-                # Reset candidature
-                activite.responsable = []
-                self._session.add(activite)
-                self._session.flush()
-
-                # Assign new list from payload
-                for candidature_id in act.candidature:
-                    candidature = self._session.exec(
-                        select(Candidature).where(Candidature.id == candidature_id)
-                    ).first()
-
-                    if not candidature:
-                        continue
-
-                    activite.responsable.append(candidature)
-
-                self._session.add(activite)
+                replaced.add(act.id)
+                wanted.update(
+                    (act.id, candidature_id)
+                    for candidature_id in act.candidature
+                    if candidature_id in candidatures
+                )
             if act.nombre_seance:
                 activite.nombre_seance = act.nombre_seance
-                self._session.add(activite)
             if act.status:
                 activite.status = ActiviteStatus(act.status)
 
-            self._session.refresh(activite, attribute_names=["responsable"])
-        self._session.commit()
-        self._session.refresh(groupe, attribute_names=["activite"])
+        current = {link for link in links if link[0] in replaced}
+        await self._delete_links(current - wanted)
+        await self._insert_links(wanted - current)
+
+        await self._stats.refresh(self._trimestre)
+        await self._session.commit()
 
-        return groupe
+        return await self.get_groupe(sigle=groupe.sigle, groupe=groupe.groupe)
+
+    async def _get_activites_with_links(
+        self, ids: list[int]
+    ) -> tuple[dict[int, Activite], set[tuple[int, int]]]:
+        """Load the activites of ``ids`` and their ``(activite, candidature)`` links."""
+        rows = await self._session.exec(
+            select(Activite, ActiviteCandidature.id_candidature)
+            .outerjoin(
+                ActiviteCandidature, ActiviteCandidature.id_activite == Activite.id
+            )
+            .where(col(Activite.id).in_(ids))
+        )
+
+        activites: dict[int, Activite] = {}
+        links: set[tuple[int, int]] = set()
+        for activite, candidature_id in rows:
+            assert activite.id is not None
+            activites[activite.id] = activite
+            if candidature_id is not None:
+                links.add((activite.id, candidature_id))
+        return activites, links
+
+    async def _get_existing_candidatures(self, ids: set[int]) -> set[int]:
+        if not ids:
+            return set()
+        return set(
+            (
+                await self._session.exec(
+                    select(Candidature.id).where(col(Candidature.id).in_(ids))
+                )
+            ).all()
+        )
+
+    async def _delete_links(self, links: set[tuple[int, int]]) -> None:
+        if not links:
+            return
+        table = ActiviteCandidature.__table__
+        await self._session.exec(
+            delete(table).where(
+                table.c.id_activite == bindparam("activite"),
+                table.c.id_candidature == bindparam("candidature"),
+            ),
+            params=[{"activite": a, "candidature": c} for a, c in links],
+        )
+
+    async def _insert_links(self, links: set[tuple[int, int]]) -> None:
+        if not links:
+            return
+        await self._session.exec(
+            insert(ActiviteCandidature).on_conflict_do_nothing(),
+            params=[{"id_activite": a, "id_candidature": c} for a, c in links],
+        )
@@ -0,0 +1,104 @@
+"""Eager-loading strategies for the response trees.
+
+Async sessions can't lazy load, so every query whose result is serialized
+into one of the nested response models must load the relationships that
+model walks.  Collections use ``selectinload``, which costs one ``SELECT ...
+WHERE ... IN (...)`` per level regardless of the number of parents, while
+many-to-one relationships use ``joinedload`` so that they ride along with the
+query that loads their parent.
+
+The trees are described as nested mappings of relationship names, so that a
+`~src.services.projection.Projection` can load a part of them instead.
+
+Relationships keyed on composite columns are loaded with ``(a, b) IN (VALUES
+...)``, which SQLite can't answer from an index once there is more than one
+parent.  Those loaders are narrowed to the ``trimestre`` being loaded so that
+the planner searches the trimestre-leading index instead of scanning the table.
+"""
+
+from sqlalchemy.orm import Load
+
+from src.schemas import Campagne, Cours, Seance, Etudiant
+from src.services.projection import Include
+
+__all__ = [
+    "CAMPAGNE_TREE",
+    "COURS_TREE",
+    "ETUDIANT_TREE",
+    "SEANCE_TREE",
+    "campagne_tree",
+    "cours_tree",
+    "seance_tree",
+    "etudiant_tree",
+    "load_tree",
+]
+
+SEANCE_TREE: Include = {"activite": {"responsable": {"etudiant": {}}}}
+"""Matches `~src.models.responses.SeanceResponse`."""
+
+COURS_TREE: Include = {"seance": SEANCE_TREE, "candidature": {"etudiant": {}}}
+"""Matches `~src.models.responses.CoursFullResponse`."""
+
+CAMPAGNE_TREE: Include = {"cours": COURS_TREE}
+"""Matches `~src.models.responses.CampagneFullResponse`."""
+
+ETUDIANT_TREE: Include = {"candidature": {"activite": {}}}
+"""Matches `~src.models.responses.EtudiantFullResponse`."""
+
+_NARROWED = (Cours.seance, Cours.candidature, Seance.activite)
+"""Relationships keyed on composite columns."""
+
+
+def load_tree(
+    entity: type,
+    include: Include,
+    *,
+    trimestre: int | None = None,
+    load: Load | None = None,
+) -> list[Load]:
+    """Load the relationships of ``include`` below ``entity``.
+
+    With ``trimestre``, the relationships keyed on composite columns are
+    narrowed to it.
+    """
+    load = load if load is not None else Load(entity)
+    options: list[Load] = []
+    for name, below in include.items():
+        attribute = getattr(entity, name)
+        relationship = attribute.property
+        target = relationship.mapper.class_
+        if trimestre is not None and any(
+            relationship is narrowed.property for narrowed in _NARROWED
+        ):
+            attribute = attribute.and_(target.trimestre == trimestre)
+
+        if relationship.uselist:
+            child = load.selectinload(attribute)
+        else:
+            child = load.joinedload(attribute)
+        options.extend(
+            load_tree(target, below, trimestre=trimestre, load=child) or [child]
+        )
+    return options
+
+
+def seance_tree(trimestre: int, load: Load | None = None) -> list[Load]:
+    """Load a seance's activites, their responsables and their etudiant."""
+    return load_tree(Seance, SEANCE_TREE, trimestre=trimestre, load=load)
+
+
+def cours_tree(
+    trimestre: int, load: Load | None = None, include: Include = COURS_TREE
+) -> list[Load]:
+    """Load a cours' seances and candidatures, or only ``include``."""
+    return load_tree(Cours, include, trimestre=trimestre, load=load)
+
+
+def campagne_tree(trimestre: int, include: Include = CAMPAGNE_TREE) -> list[Load]:
+    """Load a campagne's cours and everything below them, or only ``include``."""
+    return load_tree(Campagne, include, trimestre=trimestre)
+
+
+def etudiant_tree(include: Include = ETUDIANT_TREE) -> list[Load]:
+    """Load an etudiant's candidatures and their activites, or only ``include``."""
+    return load_tree(Etudiant, include)
@@ -0,0 +1,55 @@
+"""Keyset pagination.
+
+Pages are ordered by an integer key, and the cursor of the next page is the key
+of the last item of the current one.  Fetching any page is an index seek past
+the cursor, where ``OFFSET`` would read and discard every previous row.
+"""
+
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+from typing import Any, Generic, TypeVar
+
+from sqlalchemy.sql.elements import ColumnElement
+
+T = TypeVar("T")
+S = TypeVar("S", bound=Any)
+
+__all__ = ["STREAM_BATCH_SIZE", "Page", "keyset", "make_page"]
+
+STREAM_BATCH_SIZE = 500
+"""Rows fetched, and eager loaded, per round trip when streaming a list."""
+
+
+@dataclass(slots=True)
+class Page(Generic[T]):
+    """A page of results."""
+
+    items: list[T] = field(default_factory=list)
+    next_cursor: int | None = None
+    """Cursor of the next page, `None` on the last one."""
+
+
+def keyset(
+    statement: S, key: ColumnElement[Any], *, limit: int | None, after: int | None
+) -> S:
+    """Restrict ``statement`` to the page following ``after``, ordered by ``key``.
+
+    One row more than ``limit`` is selected so that `make_page` can tell
+    whether another page follows.  Without ``limit``, every remaining row is
+    selected.
+    """
+    if after is not None:
+        statement = statement.where(key > after)
+    statement = statement.order_by(key)
+    if limit is not None:
+        statement = statement.limit(limit + 1)
+    return statement
+
+
+def make_page(
+    items: Sequence[T], key: Callable[[T], int], *, limit: int | None
+) -> Page[T]:
+    """Build the page of the rows selected by a `keyset` statement."""
+    if limit is None or len(items) <= limit:
+        return Page(list(items))
+    return Page(list(items[:limit]), next_cursor=key(items[limit - 1]))
@@ -0,0 +1,165 @@
+"""Sparse fieldsets.
+
+A `Projection` restricts a response tree to the relationships listed in
+``include`` and the attributes listed in ``fields``, both as dotted paths from
+the root of the tree::
+
+    ?include=cours.seance&fields=trimestre,cours.sigle,cours.seance.groupe
+
+Relationships that aren't included are neither loaded nor serialized, and the
+levels without fields keep all their attributes.  Projections are canonical,
+requests describing the same tree in a different order get equal projections,
+so the response models built for them are shared.  A response model field is a
+relationship when its type is another response model, and relationships are
+named after the ORM relationships that load them.
+"""
+
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from functools import cache, lru_cache
+from typing import Any, Self, get_args, get_origin, get_type_hints
+
+from pydantic import BaseModel, ConfigDict, create_model
+from sqlmodel import SQLModel
+
+__all__ = ["Include", "Projection", "projected", "relationships"]
+
+PROJECTED_MODELS = 256
+"""Response models of projections kept, the least recently used are rebuilt."""
+
+Include = Mapping[str, "Include"]
+"""Relationships to load, each with the relationships to load below it."""
+
+
+@dataclass(frozen=True, slots=True)
+class Projection:
+    """The part of a response tree to load and return."""
+
+    fields: tuple[str, ...] | None = None
+    """Attributes to return, sorted, all of them if `None`."""
+
+    children: tuple[tuple[str, "Projection"], ...] = ()
+    """Relationships to load and return, with their own projection."""
+
+    @classmethod
+    def parse(
+        cls,
+        model: type[SQLModel],
+        *,
+        fields: Iterable[str] | None = None,
+        include: Iterable[str] | None = None,
+    ) -> Self:
+        """Build the projection of ``model`` described by dotted paths.
+
+        Raises
+        ------
+        ValueError
+            If a path doesn't exist in ``model``, or if fields are requested
+            below a relationship that isn't included.
+        """
+        tree: dict[str, Any] | None = None
+        if include is not None:
+            tree = {}
+            for path in include:
+                node = tree
+                for name in path.split("."):
+                    node = node.setdefault(name, {})
+
+        levels: dict[tuple[str, ...], set[str]] = {}
+        for path in fields or ():
+            *parents, name = path.split(".")
+            levels.setdefault(tuple(parents), set()).add(name)
+
+        projection = cls._build(model, (), tree, levels)
+        if levels:
+            path = ".".join(next(iter(levels)))
+            raise ValueError(f"Fields requested below '{path}', which isn't included")
+        return projection
+
+    @classmethod
+    def _build(
+        cls,
+        model: type[SQLModel],
+        path: tuple[str, ...],
+        tree: dict[str, Any] | None,
+        levels: dict[tuple[str, ...], set[str]],
+    ) -> Self:
+        related = relationships(model)
+        names = sorted(related if tree is None else tree)
+        for name in names:
+            if name not in related:
+                raise ValueError(f"Unknown relationship '{'.'.join((*path, name))}'")
+
+        fields = levels.pop(path, None)
+        for name in fields or ():
+            if name not in model.model_fields or name in related:
+                raise ValueError(f"Unknown field '{'.'.join((*path, name))}'")
+
+        if fields is not None and fields >= model.model_fields.keys() - related:
+            fields = None
+        return cls(
+            fields=tuple(sorted(fields)) if fields is not None else None,
+            children=tuple(
+                (
+                    name,
+                    cls._build(
+                        related[name],
+                        (*path, name),
+                        None if tree is None else tree[name],
+                        levels,
+                    ),
+                )
+                for name in names
+            ),
+        )
+
+    def include(self) -> dict[str, Any]:
+        """Return the relationships to load, as nested mappings."""
+        return {name: child.include() for name, child in self.children}
+
+
+@cache
+def relationships(model: type[SQLModel]) -> dict[str, type[SQLModel]]:
+    """Map the relationships of ``model`` to their response model."""
+    hints = get_type_hints(model)
+    result: dict[str, type[SQLModel]] = {}
+    for name in model.model_fields:
+        annotation = hints[name]
+        target = (
+            get_args(annotation)[0] if get_origin(annotation) is list else annotation
+        )
+        if isinstance(target, type) and issubclass(target, SQLModel):
+            result[name] = target
+    return result
+
+
+def projected(model: type[SQLModel], projection: Projection | None) -> type[BaseModel]:
+    """Return the response model of ``projection``, ``model`` itself if `None`."""
+    if projection is None:
+        return model
+    return _projected(model, projection)
+
+
+@lru_cache(maxsize=PROJECTED_MODELS)
+def _projected(model: type[SQLModel], projection: Projection) -> type[BaseModel]:
+    hints = get_type_hints(model)
+    related = relationships(model)
+    children = dict(projection.children)
+
+    definitions: dict[str, Any] = {}
+    for name, info in model.model_fields.items():
+        annotation = hints[name]
+        if name in related:
+            if name not in children:
+                continue
+            target = _projected(related[name], children[name])
+            annotation = list[target] if get_origin(annotation) is list else target
+        elif projection.fields is not None and name not in projection.fields:
+            continue
+        definitions[name] = (annotation, ... if info.is_required() else info.default)
+
+    return create_model(
+        model.__name__,
+        __config__=ConfigDict(from_attributes=True),
+        **definitions,
+    )
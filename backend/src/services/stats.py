@@ -0,0 +1,319 @@
+from collections.abc import Sequence
+from typing import Any
+
+from structlog import BoundLogger
+from sqlalchemy import case, distinct, func
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import col, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.cache import ResponseCache
+from src.schemas import (
+    Campagne,
+    CampagneStats,
+    Cours,
+    Activite,
+    ActiviteCandidature,
+    Candidature,
+    Etudiant,
+)
+from src.models.uqo import CampagneConfig, ActiviteType
+
+
+class CampagneStatsService:
+    """Maintain the `CampagneStats` table.
+
+    Every service that writes to a campagne calls `refresh` before committing,
+    so the statistics are updated in the same transaction as the data they
+    summarize, and so is the data version of the campagne.  It also drops the
+    rendered responses of the campagne from ``response_cache``.
+    """
+
+    def __init__(
+        self,
+        *,
+        session: AsyncSession,
+        logger: BoundLogger,
+        response_cache: ResponseCache | None = None,
+    ) -> None:
+        self._session = session
+        self._logger = logger
+        self._response_cache = response_cache
+
+    async def refresh(self, trimestre: int) -> None:
+        """Recompute the statistics of the campagne of ``trimestre``.
+
+        The statistics of archived campagnes are frozen, but their data
+        version still moves forward, so their ETags never outlive a change.
+        """
+        if self._response_cache is not None:
+            self._response_cache.invalidate(trimestre)
+
+        campagne = (
+            await self._session.exec(
+                select(Campagne).where(Campagne.trimestre == trimestre)
+            )
+        ).first()
+        if campagne is None:
+            return
+        if campagne.archived:
+            await self._session.exec(
+                update(CampagneStats)
+                .where(col(CampagneStats.id_campagne) == campagne.id)
+                .values(version=CampagneStats.version + 1)
+            )
+            return
+
+        await self._store(await self.compute([campagne]))
+
+    async def get_version(self, trimestre: int) -> int | None:
+        """Return the data version of the campagne of ``trimestre``."""
+        return (
+            await self._session.exec(
+                select(CampagneStats.version)
+                .join(Campagne)
+                .where(Campagne.trimestre == trimestre)
+            )
+        ).first()
+
+    async def rebuild(self, *, missing_only: bool = False) -> int:
+        """Recompute the statistics of every campagne that isn't archived.
+
+        Every rebuilt campagne gets a new data version, so the clients' ETags
+        stop matching and their caches are thrown away.
+
+        Parameters
+        ----------
+        missing_only
+            Only compute the campagnes without statistics yet, the others
+            keep theirs and their data version.
+
+        Returns
+        -------
+        int
+            The number of campagnes rebuilt.
+        """
+        statement = select(Campagne).where(col(Campagne.archived).is_(False))
+        if missing_only:
+            statement = statement.where(
+                ~select(CampagneStats.id_campagne)
+                .where(CampagneStats.id_campagne == Campagne.id)
+                .exists()
+            )
+        campagnes = (await self._session.exec(statement)).all()
+        await self._store(await self.compute(campagnes))
+        await self._session.commit()
+
+        self._logger.info("Campagne statistics rebuilt", nb_campagnes=len(campagnes))
+        return len(campagnes)
+
+    async def compute(self, campagnes: Sequence[Campagne]) -> dict[int, CampagneStats]:
+        """Compute the statistics of ``campagnes`` with grouped aggregates.
+
+        The number of queries does not depend on the number of campagnes.
+        """
+        if not campagnes:
+            return {}
+
+        ids = [campagne.id for campagne in campagnes]
+        trimestres = [campagne.trimestre for campagne in campagnes]
+
+        heures = await self._get_heures_assistants(ids)
+        assistants = await self._get_nbr_assistants(ids)
+        cours = await self._get_nbr_cours(ids)
+        activites = await self._get_nbr_activites(trimestres)
+        candidatures = await self._get_nbr_candidatures(trimestres)
+
+        result: dict[int, CampagneStats] = {}
+        for campagne in campagnes:
+            assert campagne.id is not None
+            configs = CampagneConfig(**campagne.config)
+
+            # Cout total
+            cout_total = 0.0
+            for (
+                cycle,
+                type_,
+                nombre_seance,
+                nombre_seance_prepa,
+            ) in heures.get(campagne.id, []):
+                activite_heure = configs.activite_heure[type_]
+                cout_total += (
+                    nombre_seance_prepa * activite_heure.preparation
+                    + nombre_seance * activite_heure.travail
+                ) * configs.echelle_salariale[cycle - 1]
+
+            nbr_activites = activites.get(campagne.trimestre, {})
+            nbr_candidatures = candidatures.get(campagne.trimestre, {})
+            nbr_assistants = assistants.get(campagne.id, {})
+
+            result[campagne.id] = CampagneStats(
+                id_campagne=campagne.id,
+                cout_total=float(f"{cout_total:.2f}"),
+                nb_cours=cours.get(campagne.id, 0),
+                nbr_td_total=nbr_activites.get(ActiviteType.TD, 0),
+                nbr_tp_total=nbr_activites.get(ActiviteType.TP, 0),
+                nbr_candidature_cycle1=nbr_candidatures.get(1, 0),
+                nbr_candidature_cycle2=nbr_candidatures.get(2, 0),
+                nbr_candidature_cycle3=nbr_candidatures.get(3, 0),
+                nbr_assistant_cycle1=nbr_assistants.get(1, 0),
+                nbr_assistant_cycle2=nbr_assistants.get(2, 0),
+                nbr_assistant_cycle3=nbr_assistants.get(3, 0),
+            )
+
+        return result
+
+    async def _store(self, stats: dict[int, CampagneStats]) -> None:
+        if not stats:
+            return
+
+        rows: list[dict[str, Any]] = [s.model_dump() for s in stats.values()]
+        statement = insert(CampagneStats).values(rows)
+        await self._session.exec(
+            statement.on_conflict_do_update(
+                index_elements=[CampagneStats.id_campagne],
+                set_={
+                    **{
+                        name: statement.excluded[name]
+                        for name in rows[0]
+                        if name not in ("id_campagne", "version")
+                    },
+                    "version": CampagneStats.version + 1,
+                },
+            )
+        )
+
+    def _assignations(self, ids: list[int | None]):
+        """Join every assigned activite to its campagne and its assistant."""
+        return (
+            select(
+                Cours.id_campagne,
+                Activite.id.label("id_activite"),
+                Activite.sigle,
+                Activite.groupe,
+                Activite.type,
+                Activite.nombre_seance,
+                Candidature.id_etudiant,
+                Etudiant.cycle,
+            )
+            .join(
+                Cours,
+                (Cours.trimestre == Activite.trimestre)
+                & (Cours.sigle == Activite.sigle),
+            )
+            .join(
+                ActiviteCandidature,
+                ActiviteCandidature.id_activite == Activite.id,
+            )
+            .join(
+                Candidature,
+                Candidature.id == ActiviteCandidature.id_candidature,
+            )
+            .join(Etudiant, Etudiant.id == Candidature.id_etudiant)
+            .where(col(Cours.id_campagne).in_(ids))
+        )
+
+    async def _get_heures_assistants(
+        self, ids: list[int | None]
+    ) -> dict[int, list[tuple[int, ActiviteType, int, int]]]:
+        """Number of paid seances per campagne, assistant cycle and activite type.
+
+        Each row holds the total number of seances worked, and the number of
+        seances for which preparation is paid: an assistant is only paid to
+        prepare the first activite of a given type in each seance.
+        """
+        assignations = self._assignations(ids).subquery()
+        rang = (
+            select(
+                assignations,
+                func.row_number()
+                .over(
+                    partition_by=(
+                        assignations.c.id_campagne,
+                        assignations.c.sigle,
+                        assignations.c.groupe,
+                        assignations.c.id_etudiant,
+                        assignations.c.type,
+                    ),
+                    order_by=assignations.c.id_activite,
+                )
+                .label("rang"),
+            )
+        ).subquery()
+
+        rows = await self._session.exec(
+            select(
+                rang.c.id_campagne,
+                rang.c.cycle,
+                rang.c.type,
+                func.sum(rang.c.nombre_seance),
+                func.sum(case((rang.c.rang == 1, rang.c.nombre_seance), else_=0)),
+            ).group_by(rang.c.id_campagne, rang.c.cycle, rang.c.type)
+        )
+
+        heures: dict[int, list[tuple[int, ActiviteType, int, int]]] = {}
+        for id_campagne, cycle, type_, nombre_seance, nombre_seance_prepa in rows:
+            heures.setdefault(id_campagne, []).append(
+                (cycle, ActiviteType(type_), nombre_seance, nombre_seance_prepa)
+            )
+        return heures
+
+    async def _get_nbr_assistants(
+        self, ids: list[int | None]
+    ) -> dict[int, dict[int, int]]:
+        """Number of distinct assistants per campagne and cycle."""
+        assignations = self._assignations(ids).subquery()
+        rows = await self._session.exec(
+            select(
+                assignations.c.id_campagne,
+                assignations.c.cycle,
+                func.count(distinct(assignations.c.id_etudiant)),
+            ).group_by(assignations.c.id_campagne, assignations.c.cycle)
+        )
+
+        assistants: dict[int, dict[int, int]] = {}
+        for id_campagne, cycle, count in rows:
+            assistants.setdefault(id_campagne, {})[cycle] = count
+        return assistants
+
+    async def _get_nbr_cours(self, ids: list[int | None]) -> dict[int, int]:
+        """Number of cours per campagne."""
+        rows = await self._session.exec(
+            select(Cours.id_campagne, func.count())
+            .where(col(Cours.id_campagne).in_(ids))
+            .group_by(Cours.id_campagne)
+        )
+        return {id_campagne: count for id_campagne, count in rows}
+
+    async def _get_nbr_activites(
+        self, trimestres: list[int]
+    ) -> dict[int, dict[ActiviteType, int]]:
+        """Number of TD and TP activites per trimestre."""
+        rows = await self._session.exec(
+            select(Activite.trimestre, Activite.type, func.count())
+            .where(
+                col(Activite.trimestre).in_(trimestres),
+                col(Activite.type).in_([ActiviteType.TD, ActiviteType.TP]),
+            )
+            .group_by(Activite.trimestre, Activite.type)
+        )
+
+        activites: dict[int, dict[ActiviteType, int]] = {}
+        for trimestre, type_, count in rows:
+            activites.setdefault(trimestre, {})[ActiviteType(type_)] = count
+        return activites
+
+    async def _get_nbr_candidatures(
+        self, trimestres: list[int]
+    ) -> dict[int, dict[int, int]]:
+        """Number of candidats per trimestre and cycle."""
+        rows = await self._session.exec(
+            select(Etudiant.trimestre, Etudiant.cycle, func.count())
+            .where(col(Etudiant.trimestre).in_(trimestres))
+            .group_by(Etudiant.trimestre, Etudiant.cycle)
+        )
+
+        candidatures: dict[int, dict[int, int]] = {}
+        for trimestre, cycle, count in rows:
+            candidatures.setdefault(trimestre, {})[cycle] = count
+        return candidatures
@@ -4,7 +4,11 @@ from datetime import datetime
 import json
 from typing import Dict, List, Any
 
-from sqlmodel import Session
+from sqlalchemy import inspect
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from src.schemas import Cours, Seance, Activite, Campagne
 from src.models.uqo import (
@@ -16,6 +20,8 @@ from src.models.uqo import (
     CoursStatus,
 )
 from src.services.uqo.diffs import CoursDiffer
+from src.services.loaders import campagne_tree
+from src.services.stats import CampagneStatsService
 
 from src.cache import AsyncCache
 
@@ -27,16 +33,19 @@ class UQOHoraireService:
         *,
         diff_checker_cls: type[CoursDiffer] = CoursDiffer,
         horaire_cache: AsyncCache[List[dict[str, Any]]],
-        session: Session,
+        session: AsyncSession,
+        stats: CampagneStatsService,
         http_client: AsyncClient,
         logger: BoundLogger,
     ) -> None:
         self.url = "https://etudier.uqo.ca/activites/recherche-horaire-resultats-ajax"
         self.trimestre = trimestre
         self.horaire = None
+        self._horaire_index: dict[str, dict[str, Any]] | None = None
         self.diff_checker_cls = diff_checker_cls
         self._horaire_cache = horaire_cache
         self._session = session
+        self._stats = stats
         self._http_client = http_client
         self._logger = logger
 
@@ -68,13 +77,14 @@ class UQOHoraireService:
         return results.json()
 
     async def get_course(self, sigle: str):
-        self.horaire = await self.get_horaire(self.trimestre)
-        cours = None
-        for cours_data in self.horaire:
-            if cours_data["SigCrs"] == sigle:
-                cours = self._parse_course(cours_data)
+        horaire = await self.get_horaire(self.trimestre)
+        if self._horaire_index is None or horaire is not self.horaire:
+            # The last entry of a sigle wins
+            self._horaire_index = {c["SigCrs"]: c for c in horaire}
+            self.horaire = horaire
 
-        return cours
+        cours_data = self._horaire_index.get(sigle)
+        return self._parse_course(cours_data) if cours_data is not None else None
 
     @staticmethod
     def _parse_course(cours: Dict[str, Any]) -> Cours:
@@ -120,20 +130,57 @@ class UQOHoraireService:
         )
 
     async def sync_courses(self, campagne: Campagne) -> Campagne:
-        for old_course in campagne.cours:
-            await self.sync_course(old_course)
-
-        self._session.commit()
-        self._session.refresh(campagne, attribute_names=["cours"])
+        # Fetched before the changes, with the writer connection back in the
+        # pool, so other writes go on while the UQO answers
+        await self._session.commit()
+        await self.get_horaire(self.trimestre)
 
-        return campagne
-
-    async def sync_course(self, old_cours: Cours) -> None:
+        seances: list[Seance] = []
+        activites: list[Activite] = []
+        for old_course in campagne.cours:
+            new_seances, new_activites = await self.sync_course(old_course)
+            seances.extend(new_seances)
+            activites.extend(new_activites)
+
+        if seances:
+            await self._session.exec(
+                insert(Seance).on_conflict_do_nothing(
+                    index_elements=[Seance.trimestre, Seance.sigle, Seance.groupe]
+                ),
+                params=[s.model_dump() for s in seances],
+            )
+        if activites:
+            await self._session.exec(
+                insert(Activite),
+                params=[a.model_dump(exclude={"id"}) for a in activites],
+            )
+
+        await self._stats.refresh(campagne.trimestre)
+        await self._session.commit()
+
+        return (
+            await self._session.exec(
+                select(Campagne)
+                .where(Campagne.id == campagne.id)
+                .options(*campagne_tree(campagne.trimestre))
+                .execution_options(populate_existing=True)
+            )
+        ).one()
+
+    async def sync_course(
+        self, old_cours: Cours
+    ) -> tuple[list[Seance], list[Activite]]:
+        """Apply the horaire of ``old_cours`` to the loaded tree.
+
+        Changes to existing rows are left to the unit of work.  The seances and
+        activites added by the diff are detached from the tree and returned so
+        that `sync_courses` can insert them in bulk.
+        """
         new_cours = await self.get_course(old_cours.sigle)
 
         if not new_cours:
             old_cours.status = CoursStatus.non_confirmee
-            return
+            return [], []
         else:
             old_cours.status = CoursStatus.confirmee
 
@@ -141,11 +188,28 @@ class UQOHoraireService:
 
         old_cours = differ.compare()
 
+        seances = _detach_new(old_cours, "seance")
+        activites = [act for seance in seances for act in seance.activite]
         for seance in old_cours.seance:
-            for act in seance.activite:
-                self._session.add(act)
+            activites.extend(_detach_new(seance, "activite"))
 
         self._session.add(old_cours)
+        return seances, activites
+
+
+def _detach_new(parent: Cours | Seance, key: str) -> list[Any]:
+    """Remove the children of ``parent`` that aren't rows yet.
+
+    The collection is reset without history, so the unit of work neither
+    inserts the removed children nor notices that they are gone.
+    """
+    children = getattr(parent, key)
+    new = [child for child in children if inspect(child).key is None]
+    if new:
+        set_committed_value(
+            parent, key, [child for child in children if child not in new]
+        )
+    return new
 
 
 def _parse_campus(unparsed: str) -> List[Campus]:
@@ -0,0 +1,113 @@
+"""SQLite performance profile.
+
+SQLite reads most of its tuning knobs from per-connection pragmas, so the
+profile is applied every time the pool opens a new DBAPI connection.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Self
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.config import Settings
+
+__all__ = ["SQLiteProfile", "effective_pragmas", "optimize"]
+
+REPORTED_PRAGMAS = (
+    "journal_mode",
+    "synchronous",
+    "cache_size",
+    "mmap_size",
+    "temp_store",
+    "busy_timeout",
+)
+"""Pragmas included in the startup report."""
+
+
+@dataclass(frozen=True, slots=True)
+class SQLiteProfile:
+    """Connection-level pragmas applied to every SQLite connection.
+
+    The default settings trade a little durability on power loss
+    (``synchronous`` is ``NORMAL`` rather than ``FULL``) for commits that do
+    not fsync the main database file, and readers that are never blocked by a
+    writer thanks to the write-ahead log.
+    """
+
+    journal_mode: str
+    synchronous: str
+    cache_size: int
+    """Page cache size, negative values are in KiB."""
+
+    mmap_size: int
+    temp_store: str
+    busy_timeout: int
+    """Time to wait on a locked database, in milliseconds."""
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> Self:
+        return cls(
+            journal_mode=settings.SQLITE_JOURNAL_MODE,
+            synchronous=settings.SQLITE_SYNCHRONOUS,
+            cache_size=settings.SQLITE_CACHE_SIZE,
+            mmap_size=settings.SQLITE_MMAP_SIZE,
+            temp_store=settings.SQLITE_TEMP_STORE,
+            busy_timeout=settings.SQLITE_BUSY_TIMEOUT,
+        )
+
+    def pragmas(self, *, read_only: bool = False) -> dict[str, str | int]:
+        """Return the pragmas to apply, in order.
+
+        The journal mode is stored in the database file, so read-only
+        connections leave it to the writer.
+        """
+        pragmas: dict[str, str | int] = {
+            # busy_timeout goes first so that switching the journal mode
+            # waits for other connections instead of failing right away.
+            "busy_timeout": self.busy_timeout,
+            "journal_mode": self.journal_mode,
+            "synchronous": self.synchronous,
+            "cache_size": self.cache_size,
+            "mmap_size": self.mmap_size,
+            "temp_store": self.temp_store,
+        }
+        if read_only:
+            del pragmas["journal_mode"]
+        return pragmas
+
+    def apply(self, dbapi_connection: Any, *, read_only: bool = False) -> None:
+        """Apply the pragmas to a freshly opened DBAPI connection."""
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in self.pragmas(read_only=read_only).items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    def install(self, engine: AsyncEngine, *, read_only: bool = False) -> None:
+        """Apply the profile to every connection opened by ``engine``."""
+
+        @event.listens_for(engine.sync_engine, "connect")
+        def _on_connect(dbapi_connection: Any, connection_record: Any) -> None:
+            self.apply(dbapi_connection, read_only=read_only)
+
+
+async def effective_pragmas(engine: AsyncEngine) -> dict[str, Any]:
+    """Read back the pragmas SQLite actually uses on a pooled connection."""
+    async with engine.connect() as conn:
+        return {
+            name: (await conn.exec_driver_sql(f"PRAGMA {name}")).scalar()
+            for name in REPORTED_PRAGMAS
+        }
+
+
+async def optimize(engine: AsyncEngine) -> None:
+    """Refresh the query planner statistics and checkpoint the WAL.
+
+    The checkpoint is passive so that it never waits for readers or writers;
+    whatever can't be copied back now is picked up by the next run.
+    """
+    async with engine.connect() as conn:
+        await conn.execute(text("PRAGMA optimize"))
+        await conn.execute(text("PRAGMA wal_checkpoint(PASSIVE)"))
@@ -0,0 +1,145 @@
+"""Benchmark the write-heavy campagne paths.
+
+Creates a campagne with hundreds of cours, then syncs it against a synthetic
+horaire that adds thousands of activites, and reports the time and the number
+of statements of each step::
+
+    python -m tests.benchmarks.bulk_insert --cours 500 --groupes 3 --activites 3
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import Engine, event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import create_engine
+
+from src.config import Settings
+from src.factory import Factory
+from src.models.requests import CampagneCreateRequest, CampagneCoursRequestItem
+from src.models.uqo import ActiviteType
+
+from tests.scripts.initial_data import init_db
+
+TRIMESTRE = 20251
+JOURS = ["lundi", "mardi", "mercredi", "jeudi", "vendredi"]
+
+
+def make_horaire(nb_cours: int, nb_groupes: int, nb_activites: int) -> list[dict]:
+    """Build a horaire in the format of the UQO search endpoint."""
+    types = [ActiviteType.TD.value, ActiviteType.TP.value]
+    return [
+        {
+            "SigCrs": f"INF{c:04d}",
+            "CdTrimestreAct": str(TRIMESTRE),
+            "TitreCrs": f"Cours {c}",
+            "CdCyc": "1",
+            "LstActCrs": [
+                {
+                    "Gr": f"{g + 1:02d}",
+                    "LblRegrLieuEnsei": " Gatineau (Lucien-Brault)",
+                    "LstEnsei": [
+                        {"Nom": "Nom", "Prenom": "Prenom", "AdrCourriel": None}
+                    ],
+                    "CollActCrsHor": [
+                        {
+                            "LblDescAct": types[a % len(types)],
+                            "CdModeEnsei": "PRES",
+                            "JourSem": JOURS[a % len(JOURS)],
+                            "HrsDHor": f"{830 + 100 * a:04d}",
+                            "HrsFHor": f"{930 + 100 * a:04d}",
+                            "DateDHor": "2025-01-06T00:00:00",
+                            "DateFHor": "2025-04-18T00:00:00",
+                        }
+                        for a in range(nb_activites)
+                    ],
+                }
+                for g in range(nb_groupes)
+            ],
+        }
+        for c in range(nb_cours)
+    ]
+
+
+class StatementCounter:
+    """Count the statements executed on any engine, by verb."""
+
+    def __init__(self) -> None:
+        self.counts: Counter[str] = Counter()
+        event.listen(Engine, "before_cursor_execute", self._count)
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        self.counts[statement.split(maxsplit=1)[0]] += 1
+
+    def reset(self) -> dict[str, int]:
+        counts = dict(self.counts)
+        self.counts.clear()
+        return counts
+
+
+async def run(nb_cours: int, nb_groupes: int, nb_activites: int) -> None:
+    horaire = make_horaire(nb_cours, nb_groupes, nb_activites)
+
+    async def fetch_horaire() -> list[dict[str, Any]]:
+        return horaire
+
+    with tempfile.TemporaryDirectory() as tmp:
+        settings = Settings(SQLLITE_FILE_NAME=str(Path(tmp) / "bench.db"))
+        init_db(settings, create_engine(settings.SQLALCHEMY_DATABASE_URI))
+        engine = create_async_engine(settings.SQLALCHEMY_ASYNC_DATABASE_URI)
+        factory = await Factory.create(settings, engine)
+        await factory._context.uqo_horaire_cache.get_or_create(
+            str(TRIMESTRE), fetch_horaire
+        )
+        counter = StatementCounter()
+
+        try:
+            start = time.perf_counter()
+            campagne = await factory.create_campagne_service().add_campagne(
+                CampagneCreateRequest(
+                    trimestre=TRIMESTRE,
+                    cours=[
+                        CampagneCoursRequestItem(sigle=c["SigCrs"]) for c in horaire
+                    ],
+                )
+            )
+            report("add_campagne", start, counter.reset())
+
+            start = time.perf_counter()
+            service = factory.create_uqo_horaire_service(TRIMESTRE)
+            campagne = await service.sync_courses(campagne)
+            report("sync_courses", start, counter.reset())
+        finally:
+            await factory.aclose()
+            await engine.dispose()
+
+    nb_seances = sum(len(c.seance) for c in campagne.cours)
+    nb_activites = sum(len(s.activite) for c in campagne.cours for s in c.seance)
+    print(
+        f"{len(campagne.cours)} cours, {nb_seances} seances, {nb_activites} activites"
+    )
+
+
+def report(step: str, start: float, counts: dict[str, int]) -> None:
+    elapsed = (time.perf_counter() - start) * 1000
+    statements = ", ".join(f"{verb}={n}" for verb, n in sorted(counts.items()))
+    print(f"{step:<14} {elapsed:>9.1f} ms  {statements}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cours", type=int, default=500)
+    parser.add_argument("--groupes", type=int, default=3)
+    parser.add_argument("--activites", type=int, default=3)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.cours, args.groupes, args.activites))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Benchmark the serialization of the large response trees.
+
+Seeds a campagne, loads its tree and its candidatures, then times each way of
+turning them into a JSON or MessagePack body, and decoding that body back as a
+client would::
+
+    python -m tests.benchmarks.serialization --cours 100 --seances 3 --etudiants 50
+"""
+
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import msgpack
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import create_engine
+
+from src.config import Settings
+from src.factory import Factory
+from src.models.responses import CampagneFullResponse, EtudiantFullResponse
+from src.responses import MSGPACK_MEDIA_TYPE, dump, render
+
+from tests.scripts.initial_data import init_db
+from tests.scripts.seed_data import seed_campagne
+
+TRIMESTRE = 20251
+
+
+def fastapi_body(
+    response_model: Any, response_class: type[JSONResponse]
+) -> Callable[[Any], bytes]:
+    """Serialize like a route returning ``content`` with ``response_model``."""
+    field = create_model_field(
+        name="Response", type_=response_model, mode="serialization"
+    )
+
+    def body(content: Any) -> bytes:
+        data = asyncio.run(serialize_response(field=field, response_content=content))
+        return bytes(response_class(data).body)
+
+    return body
+
+
+def render_body(response_model: Any) -> Callable[[Any], bytes]:
+    return lambda content: bytes(render(response_model, content).body)
+
+
+def msgpack_body(response_model: Any) -> Callable[[Any], bytes]:
+    return lambda content: dump(response_model, content, MSGPACK_MEDIA_TYPE)
+
+
+def best_time(function: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def compare(name: str, response_model: Any, content: Any, repeat: int) -> None:
+    paths = {
+        "fastapi + json": (fastapi_body(response_model, JSONResponse), json.loads),
+        "fastapi + orjson": (
+            fastapi_body(response_model, ORJSONResponse),
+            json.loads,
+        ),
+        "render": (render_body(response_model), json.loads),
+        "render msgpack": (msgpack_body(response_model), msgpack.unpackb),
+    }
+
+    print(name)
+    print(f"  {'':<17} {'encode':>12}  {'':<6} {'size':>8}      {'decode':>9}")
+    baseline = None
+    for path, (body, decode) in paths.items():
+        encoded = body(content)
+        best = best_time(lambda: body(content), repeat)
+        decoding = best_time(lambda: decode(encoded), repeat)
+        baseline = baseline or best
+        print(
+            f"  {path:<17} {best:>9.1f} ms  x{baseline / best:<5.1f}"
+            f" {len(encoded) / 1024:>8.0f} KiB {decoding:>9.1f} ms"
+        )
+
+
+async def load(nb_cours: int, nb_seances: int, nb_etudiants: int) -> tuple[Any, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        settings = Settings(SQLLITE_FILE_NAME=str(Path(tmp) / "bench.db"))
+        init_db(settings, create_engine(settings.SQLALCHEMY_DATABASE_URI))
+        engine = create_async_engine(settings.SQLALCHEMY_ASYNC_DATABASE_URI)
+        factory = await Factory.create(settings, engine)
+
+        try:
+            await seed_campagne(
+                factory.session,
+                trimestre=TRIMESTRE,
+                nb_cours=nb_cours,
+                nb_seances=nb_seances,
+                nb_etudiants=nb_etudiants,
+            )
+            campagne = await factory.create_campagne_service().get_campagne(TRIMESTRE)
+            candidatures = await factory.create_candidature_service(
+                TRIMESTRE
+            ).get_candidatures()
+        finally:
+            await factory.aclose()
+            await engine.dispose()
+
+    return campagne, candidatures.items
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cours", type=int, default=100)
+    parser.add_argument("--seances", type=int, default=3)
+    parser.add_argument("--etudiants", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    campagne, etudiants = asyncio.run(load(args.cours, args.seances, args.etudiants))
+    compare("GET /v1/campagne/{trimestre}", CampagneFullResponse, campagne, args.repeat)
+    compare(
+        "GET /v1/{trimestre}/candidature",
+        list[EtudiantFullResponse],
+        etudiants,
+        args.repeat,
+    )
+
+
+if __name__ == "__main__":
+    main()
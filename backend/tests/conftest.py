@@ -1,10 +1,12 @@
 import os
 import pytest
 import pytest_asyncio
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Callable, Generator
 
 from fastapi.testclient import TestClient
-from sqlalchemy import Engine
+from httpx import Response
+from sqlalchemy import Engine, event
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlmodel import create_engine
 from sqlmodel.pool import StaticPool
 
@@ -19,8 +21,10 @@ from tests.scripts.initial_data import init_db
 def test_settings(
     tmp_path_factory: pytest.TempPathFactory, monkeypatch: pytest.MonkeyPatch
 ) -> Generator[Settings, None, None]:
-    db_path = tmp_path_factory.mktemp("tmp_test_databases") / "test_database.db"
-    monkeypatch.setenv("SQLLITE_FILE_NAME", str(db_path))
+    db_dir = tmp_path_factory.mktemp("tmp_test_databases")
+    monkeypatch.setenv("SQLLITE_FILE_NAME", str(db_dir / "test_database.db"))
+    monkeypatch.setenv("SQLITE_ARCHIVE_FILE_NAME", str(db_dir / "test_archive.db"))
+    monkeypatch.setenv("STORAGE_DIRECTORY", str(db_dir / "resumes"))
 
     yield settings()
 
@@ -34,6 +38,17 @@ def engine(test_settings: Settings) -> Engine:
     )
 
 
+@pytest_asyncio.fixture(scope="function")
+async def async_engine(test_settings: Settings) -> AsyncGenerator[AsyncEngine, None]:
+    async_engine = create_async_engine(
+        test_settings.SQLALCHEMY_ASYNC_DATABASE_URI,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    yield async_engine
+    await async_engine.dispose()
+
+
 @pytest.fixture(scope="function")
 def empty_database(test_settings: Settings, engine: Engine) -> None:
     init_db(test_settings, engine)
@@ -41,13 +56,44 @@ def empty_database(test_settings: Settings, engine: Engine) -> None:
 
 @pytest_asyncio.fixture(scope="function")
 async def factory(
-    test_settings: Settings, engine: Engine, empty_database: None
-) -> Factory:
-    return await Factory.create(test_settings, engine)
+    test_settings: Settings, async_engine: AsyncEngine, empty_database: None
+) -> AsyncGenerator[Factory, None]:
+    factory = await Factory.create(test_settings, async_engine)
+    yield factory
+    await factory.aclose()
 
 
 @pytest.fixture(scope="function")
-def client(test_settings: Settings):
+def client(test_settings: Settings, empty_database: None):
     app = create_app(test_settings)
     with TestClient(app) as test_client:
         yield test_client
+
+
+@pytest.fixture(scope="function")
+def statements() -> Generator[list[str], None, None]:
+    """Record the SQL statements executed on any engine during the test."""
+    executed: list[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, *args) -> None:
+        executed.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+    yield executed
+    event.remove(Engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.fixture(scope="function")
+def query_budget() -> Callable[[Response, int], None]:
+    """Assert that a response was served with at most ``budget`` statements.
+
+    Relies on the statistics headers that the app exposes outside of
+    production.
+    """
+
+    def check(response: Response, budget: int) -> None:
+        count = int(response.headers["X-DB-Statement-Count"])
+        route = f"{response.request.method} {response.request.url.path}"
+        assert count <= budget, f"{route} issued {count} statements ({budget=})"
+
+    return check
@@ -0,0 +1,475 @@
+import json
+from collections.abc import Callable
+
+import pytest
+from fastapi.testclient import TestClient
+from httpx import Response
+from sqlmodel import select
+
+from src.factory import Factory
+from src.models.uqo import ChangeType
+from src.schemas import Candidature, Etudiant
+
+from tests.scripts.seed_data import seed_campagne
+
+
+@pytest.mark.asyncio
+async def test_get_campagnes(client: TestClient, factory: Factory):
+    await seed_campagne(factory.session)
+
+    response = client.get("/v1/campagne")
+    assert response.status_code == 200
+
+    data = response.json()
+    assert len(data) == 1
+    assert data[0]["stats"]["nb_cours"] == 3
+    assert data[0]["stats"]["nbr_td_total"] == 6
+    assert data[0]["stats"]["nbr_assistant_cycle1"] == 2
+    assert data[0]["stats"]["nbr_candidature_cycle2"] == 1
+    # 6 seances * 12 TD * (1h prep + 2h travail) * (2 * 18.85 + 24.49 + 26.48)
+    assert data[0]["stats"]["cout_total"] == 19152.72
+
+
+@pytest.mark.asyncio
+async def test_get_campagnes_statement_count(
+    client: TestClient,
+    factory: Factory,
+    query_budget: Callable[[Response, int], None],
+):
+    for trimestre in (20243, 20251, 20252):
+        await seed_campagne(factory.session, trimestre=trimestre, nb_cours=10)
+
+    response = client.get("/v1/campagne")
+    assert response.status_code == 200
+    assert len(response.json()) == 3
+
+    # The statistics are read from the campagnestats table
+    query_budget(response, 2)
+
+
+@pytest.mark.asyncio
+async def test_get_campagnes_pages(client: TestClient, factory: Factory):
+    for trimestre in (20243, 20251, 20252):
+        await seed_campagne(factory.session, trimestre=trimestre, nb_cours=1)
+
+    response = client.get("/v1/campagne", params={"limit": 2})
+    assert [c["trimestre"] for c in response.json()] == [20243, 20251]
+
+    after = response.headers["X-Next-Cursor"]
+    response = client.get("/v1/campagne", params={"limit": 2, "after": after})
+    assert [c["trimestre"] for c in response.json()] == [20252]
+    assert "X-Next-Cursor" not in response.headers
+
+    response = client.get("/v1/campagne", params={"status": "en_cours"})
+    assert len(response.json()) == 3
+
+
+@pytest.mark.asyncio
+async def test_get_campagne_by_trimestre(client: TestClient, factory: Factory):
+    await seed_campagne(factory.session)
+
+    response = client.get("/v1/campagne/20251")
+    assert response.status_code == 200
+
+    data = response.json()
+    assert len(data["cours"]) == 3
+    assert len(data["cours"][0]["seance"]) == 2
+    assert len(data["cours"][0]["candidature"]) == 4
+    td = data["cours"][0]["seance"][0]["activite"][0]
+    assert len(td["responsable"]) == 4
+    assert td["responsable"][0]["etudiant"]["nom"] == "Nom0"
+
+    assert client.get("/v1/campagne/20253").status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_get_campagne_statement_count(
+    client: TestClient,
+    factory: Factory,
+    query_budget: Callable[[Response, int], None],
+):
+    await seed_campagne(factory.session, nb_cours=20, nb_seances=3, nb_etudiants=10)
+
+    response = client.get("/v1/campagne/20251")
+    assert response.status_code == 200
+    assert len(response.json()["cours"]) == 20
+
+    # The data version, then one statement per level of the tree, independent
+    # of its size
+    query_budget(response, 7)
+
+
+@pytest.mark.asyncio
+async def test_get_campagne_projection(
+    client: TestClient,
+    factory: Factory,
+    query_budget: Callable[[Response, int], None],
+):
+    await seed_campagne(factory.session)
+    full = client.get("/v1/campagne/20251")
+
+    response = client.get(
+        "/v1/campagne/20251",
+        params={"include": "cours", "fields": "trimestre,cours.sigle,cours.titre"},
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        "trimestre": 20251,
+        "cours": [{"sigle": f"INF{c:04d}", "titre": f"Cours {c}"} for c in range(3)],
+    }
+    assert len(response.content) < len(full.content) / 10
+    query_budget(response, 3)
+
+    response = client.get(
+        "/v1/campagne/20251",
+        params={"include": "cours.seance", "fields": "cours.sigle,cours.seance.groupe"},
+    )
+    assert response.status_code == 200
+    cours = response.json()["cours"][0]
+    assert cours == {"sigle": "INF0000", "seance": [{"groupe": "01"}, {"groupe": "02"}]}
+    query_budget(response, 4)
+
+    # Levels without fields keep all their attributes
+    response = client.get("/v1/campagne/20251", params={"fields": "id"})
+    assert response.json()["cours"] == full.json()["cours"]
+
+    for params in (
+        {"include": "cours.etudiant"},
+        {"fields": "cours.inconnu"},
+        {"include": "cours", "fields": "cours.seance.groupe"},
+    ):
+        assert client.get("/v1/campagne/20251", params=params).status_code == 400
+
+    assert client.get("/v1/campagne/20253", params={"include": ""}).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_get_campagne_not_modified(
+    client: TestClient,
+    factory: Factory,
+    query_budget: Callable[[Response, int], None],
+):
+    await seed_campagne(factory.session)
+
+    response = client.get("/v1/campagne/20251")
+    etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"] == "no-cache"
+    assert client.get("/v1/campagne/20251/cours").headers["ETag"] == etag
+    assert client.get("/v1/20251/candidature").headers["ETag"] == etag
+
+    response = client.get("/v1/campagne/20251", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+    # Answered from the data version alone
+    query_budget(response, 1)
+
+    for url in ("/v1/campagne/20251/cours", "/v1/20251/candidature"):
+        response = client.get(url, headers={"If-None-Match": f"W/{etag}"})
+        assert response.status_code == 304
+
+    # Any write moves the version forward
+    seance = client.get("/v1/campagne/20251").json()["cours"][0]["seance"][0]
+    client.patch(f"/v1/campagne/20251/INF0000/{seance['groupe']}/changes/approve")
+    response = client.get("/v1/campagne/20251", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+    assert client.get("/v1/campagne/20252/cours").status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_data_version_variants(client: TestClient, factory: Factory):
+    await seed_campagne(factory.session)
+    etag = client.get("/v1/campagne/20251/cours").headers["ETag"]
+
+    # NDJSON streams aren't answered from the tag of the JSON bodies
+    headers = {"Accept": "application/x-ndjson", "If-None-Match": etag}
+    for url in ("/v1/campagne/20251/cours", "/v1/20251/candidature"):
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        assert response.text
+        assert "ETag" not in response.headers
+
+    # The version of archived campagnes still moves forward
+    client.put("/v1/campagne/20251", json={"status": "cloturee"})
+    assert client.post("/v1/campagne/20251/archive").status_code == 200
+    etag = client.get("/v1/campagne/20251").headers["ETag"]
+    response = client.get("/v1/campagne/20251", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    await factory.create_campagne_stats_service().refresh(20251)
+    await factory.session.commit()
+    response = client.get("/v1/campagne/20251", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+@pytest.mark.asyncio
+async def test_get_campagne_cached(
+    client: TestClient,
+    factory: Factory,
+    query_budget: Callable[[Response, int], None],
+):
+    await seed_campagne(factory.session)
+
+    first = client.get("/v1/campagne/20251")
+    again = client.get("/v1/campagne/20251")
+    assert again.content == first.content
+    assert again.headers["ETag"] == first.headers["ETag"]
+    # Only the data version is read
+    query_budget(again, 1)
+
+    params = {"include": "cours", "fields": "trimestre,cours.sigle"}
+    projected = client.get("/v1/campagne/20251", params=params)
+    assert projected.content != first.content
+    query_budget(client.get("/v1/campagne/20251", params=params), 1)
+
+    cours = client.get("/v1/campagne/20251/cours")
+    query_budget(client.get("/v1/campagne/20251/cours"), 1)
+
+    # Writes drop the cached bodies
+    sigles = [c["sigle"] for c in cours.json()]
+    client.put(
+        "/v1/campagne/20251",
+        json={"cours": [{"sigle": sigle} for sigle in [*sigles, "INF9999"]]},
+    )
+    response = client.get("/v1/campagne/20251")
+    assert response.headers["ETag"] != first.headers["ETag"]
+    assert "INF9999" in {c["sigle"] for c in response.json()["cours"]}
+    cours = client.get("/v1/campagne/20251/cours").json()
+    assert [c["sigle"] for c in cours] == [*sigles, "INF9999"]
+
+
+@pytest.mark.asyncio
+async def test_get_cours_ndjson(client: TestClient, factory: Factory):
+    await seed_campagne(factory.session, nb_cours=4)
+
+    response = client.get(
+        "/v1/campagne/20251/cours", headers={"Accept": "application/x-ndjson"}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    cours = [json.loads(line) for line in response.text.splitlines()]
+    assert [c["sigle"] for c in cours] == [f"INF{c:04d}" for c in range(4)]
+    assert cours == client.get("/v1/campagne/20251/cours").json()
+
+    response = client.get(
+        "/v1/campagne/20252/cours", headers={"Accept": "application/x-ndjson"}
+    )
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_create_and_update_campagne(client: TestClient, factory: Factory):
+    response = client.post(
+        "/v1/campagne",
+        json={
+            "trimestre": 20251,
+            "cours": [{"sigle": "INF1013"}, {"sigle": "INF1023"}],
+        },
+    )
+    assert response.status_code == 200
+    assert {c["sigle"] for c in response.json()["cours"]} == {"INF1013", "INF1023"}
+
+    response = client.put(
+        "/v1/campagne/20251",
+        json={"cours": [{"sigle": "INF1023"}, {"sigle": "INF1033"}]},
+    )
+    assert response.status_code == 200
+    assert {c["sigle"] for c in response.json()["cours"]} == {"INF1023", "INF1033"}
+
+
+@pytest.mark.asyncio
+async def test_modify_activity(client: TestClient, factory: Factory):
+    await seed_campagne(factory.session)
+
+    seance = client.get("/v1/campagne/20251").json()["cours"][0]["seance"][0]
+    td, tp = seance["activite"]
+    candidatures = client.get("/v1/campagne/20251").json()["cours"][0]["candidature"]
+
+    response = client.put(
+        "/v1/campagne/20251/INF0000/01",
+        json={
+            "activite": [
+                {"id": td["id"], "candidature": []},
+                {"id": tp["id"], "candidature": [], "nombre_seance": 10},
+            ]
+        },
+    )
+    assert response.status_code == 200
+    activites = {a["id"]: a for a in response.json()["activite"]}
+    assert activites[td["id"]]["responsable"] == []
+    assert activites[tp["id"]]["nombre_seance"] == 10
+    assert len(candidatures) == 4
+
+    stats = client.get("/v1/campagne").json()[0]["stats"]
+    assert stats["nbr_assistant_cycle1"] == 2
+    assert stats["cout_total"] == 15960.6
+
+
+@pytest.mark.asyncio
+async def test_assign_roster(
+    client: TestClient,
+    factory: Factory,
+    query_budget: Callable[[Response, int], None],
+):
+    await seed_campagne(factory.session, nb_seances=1, nb_etudiants=20)
+
+    td, tp = client.get("/v1/campagne/20251").json()["cours"][0]["seance"][0][
+        "activite"
+    ]
+    assert len(td["responsable"]) == 20
+    # Candidature ids, ordered like their etudiant
+    candidatures = (
+        await factory.session.exec(
+            select(Candidature.id)
+            .where(Candidature.sigle == "INF0000")
+            .order_by(Candidature.id_etudiant)
+        )
+    ).all()
+    etudiants = (
+        await factory.session.exec(select(Etudiant.id).order_by(Etudiant.id))
+    ).all()
+
+    response = client.put(
+        "/v1/campagne/20251/INF0000/01",
+        json={
+            "activite": [
+                {"id": td["id"], "candidature": candidatures[10:] + [999_999]},
+                {"id": tp["id"], "candidature": candidatures[:15]},
+            ]
+        },
+    )
+    assert response.status_code == 200
+    activites = {a["id"]: a for a in response.json()["activite"]}
+    responsables = lambda a: sorted(
+        r["id_etudiant"] for r in activites[a["id"]]["responsable"]
+    )
+    assert responsables(td) == etudiants[10:]
+    assert responsables(tp) == etudiants[:15]
+
+    # Independent of the number of activites and candidatures
+    query_budget(response, 18)
+
+    response = client.put(
+        "/v1/campagne/20251/INF0000/01",
+        json={"activite": [{"id": 999_999, "candidature": []}]},
+    )
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_approve_removed_seance(client: TestClient, factory: Factory):
+    await seed_campagne(factory.session)
+
+    seance = await factory.create_groupe_service(20251).get_groupe(
+        sigle="INF0000", groupe="01"
+    )
+    assert seance is not None
+    seance.change["change_type"] = ChangeType.REMOVED
+    await factory.session.commit()
+
+    response = client.patch("/v1/campagne/20251/INF0000/01/changes/approve")
+    assert response.status_code == 200
+    assert response.json()["approved"]
+
+    cours = client.get("/v1/campagne/20251").json()["cours"][0]
+    assert [s["groupe"] for s in cours["seance"]] == ["02"]
+
+    response = client.patch("/v1/campagne/20251/INF0000/changes/approve")
+    assert response.status_code == 200
+
+
+def get_candidatures(client: TestClient, trimestre: int) -> list[dict]:
+    """List the candidatures of ``trimestre``, whose activites are unordered."""
+    etudiants = client.get(f"/v1/{trimestre}/candidature").json()
+    for etudiant in etudiants:
+        for candidature in etudiant["candidature"]:
+            candidature["activite"].sort(key=lambda a: a["id"])
+    return etudiants
+
+
+@pytest.mark.asyncio
+async def test_archive_campagne(client: TestClient, factory: Factory):
+    await seed_campagne(factory.session, trimestre=20251)
+    await seed_campagne(factory.session, trimestre=20252)
+
+    # Only closed campagnes can be archived
+    assert client.post("/v1/campagne/20251/archive").status_code == 409
+    client.put("/v1/campagne/20251", json={"status": "cloturee"})
+
+    campagne = client.get("/v1/campagne/20251").json()
+    campagnes = client.get("/v1/campagne").json()
+    candidatures = get_candidatures(client, 20251)
+
+    response = client.post("/v1/campagne/20251/archive")
+    assert response.status_code == 200
+    assert response.json() == campagne
+    assert client.post("/v1/campagne/20251/archive").status_code == 409
+
+    etudiants = await factory.session.exec(
+        select(Etudiant.trimestre).distinct().execution_options(populate_existing=True)
+    )
+    assert etudiants.all() == [20252]
+
+    # Reads are served from the archive
+    assert client.get("/v1/campagne/20251").json() == campagne
+    assert client.get("/v1/campagne").json() == campagnes
+    assert get_candidatures(client, 20251) == candidatures
+    assert get_candidatures(client, 20252) != []
+
+    # Writes are refused
+    assert client.put("/v1/campagne/20251", json={}).status_code == 409
+    assert client.post("/v1/campagne/20251/sync").status_code == 409
+    etudiant_id = candidatures[0]["id"]
+    assert client.delete(f"/v1/20251/candidature/{etudiant_id}").status_code == 409
+
+    response = client.post("/v1/campagne/20251/restore")
+    assert response.status_code == 200
+    assert response.json() == campagne
+    assert client.post("/v1/campagne/20251/restore").status_code == 409
+    assert get_candidatures(client, 20251) == candidatures
+    assert client.get("/v1/campagne").json() == campagnes
+
+
+@pytest.mark.asyncio
+async def test_archived_campagne_writes(client: TestClient, factory: Factory):
+    await seed_campagne(factory.session)
+    client.put("/v1/campagne/20251", json={"status": "cloturee"})
+    assert client.post("/v1/campagne/20251/archive").status_code == 200
+
+    campagne = client.get("/v1/campagne/20251").json()
+    candidatures = get_candidatures(client, 20251)
+    td = campagne["cours"][0]["seance"][0]["activite"][0]
+
+    writes = [
+        client.post(
+            "/v1/cours/20251/INF0000/candidature",
+            json={
+                "code_permanent": "ARCH00000002",
+                "nom": "Archive",
+                "prenom": "Write",
+                "cycle": 1,
+                "campus": "gatineau",
+                "programme": "1234",
+                "email": "write@uqo.ca",
+            },
+        ),
+        client.patch("/v1/campagne/20251/INF0000/changes/approve"),
+        client.patch("/v1/campagne/20251/INF0000/01/changes/approve"),
+        client.patch(f"/v1/campagne/20251/INF0000/01/{td['id']}/changes/approve"),
+        client.put(
+            "/v1/campagne/20251/INF0000/01",
+            json={"activite": [{"id": td["id"], "candidature": []}]},
+        ),
+    ]
+    assert [response.status_code for response in writes] == [409] * len(writes)
+
+    # Nothing reached the main tables, nor the archive
+    etudiants = await factory.session.exec(
+        select(Etudiant).execution_options(populate_existing=True)
+    )
+    assert etudiants.all() == []
+    assert get_candidatures(client, 20251) == candidatures
+    assert client.get("/v1/campagne/20251").json() == campagne
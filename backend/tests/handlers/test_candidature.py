@@ -1,10 +1,25 @@
+import hashlib
+import io
+import json
+import zipfile
+from pathlib import Path
+
+import pytest
+from sqlmodel import select
+
+from src.config import Settings
 from src.factory import Factory
-from src.schemas import Etudiant, Campagne
+from src.file import LocalStorageProvider
+from src.schemas import Etudiant, Campagne, ResumeBlob
 from src.models.uqo import Campus
+from src.services.stats import CampagneStatsService
 from fastapi.testclient import TestClient
 
+from tests.scripts.seed_data import seed_campagne
+
 
-def test_candidature(client: TestClient, factory: Factory):
+@pytest.mark.asyncio
+async def test_candidature(client: TestClient, factory: Factory):
     factory.session.add(Campagne(trimestre=20251))
     factory.session.add(
         Etudiant(
@@ -18,7 +33,7 @@ def test_candidature(client: TestClient, factory: Factory):
             trimestre=20251,
         )
     )
-    factory.session.commit()
+    await factory.session.commit()
 
     response = client.get("/v1/20251/candidature")
     data = response.json()
@@ -28,7 +43,8 @@ def test_candidature(client: TestClient, factory: Factory):
     assert 1 == 1
 
 
-def test_candidature_2(client: TestClient, factory: Factory):
+@pytest.mark.asyncio
+async def test_candidature_2(client: TestClient, factory: Factory):
     factory.session.add(Campagne(trimestre=20251))
     factory.session.add(
         Etudiant(
@@ -42,7 +58,7 @@ def test_candidature_2(client: TestClient, factory: Factory):
             trimestre=20251,
         )
     )
-    factory.session.commit()
+    await factory.session.commit()
 
     response = client.get("/v1/20251/candidature")
     data = response.json()
@@ -50,3 +66,397 @@ def test_candidature_2(client: TestClient, factory: Factory):
     assert len(data) > 0
 
     assert 1 == 1
+
+
+@pytest.mark.asyncio
+async def test_candidature_lifecycle(client: TestClient, factory: Factory):
+    await seed_campagne(factory.session, nb_etudiants=0)
+
+    form = {
+        "code_permanent": "LIFE12345678",
+        "nom": "Cycle",
+        "prenom": "Vie",
+        "cycle": "2",
+        "campus": Campus.gat.value,
+        "programme": "1234",
+        "email": "vie.cycle@uqo.ca",
+        "courses_json": '[{"sigle": "INF0000", "note": "A"}]',
+    }
+    response = client.post("/v1/20251/candidature", data=form)
+    assert response.status_code == 200
+    etudiant = response.json()
+    assert [c["sigle"] for c in etudiant["candidature"]] == ["INF0000"]
+
+    form["courses_json"] = '[{"sigle": "INF0001", "note": "B"}]'
+    response = client.put(f"/v1/20251/candidature/{etudiant['id']}", data=form)
+    assert response.status_code == 200
+    assert [c["sigle"] for c in response.json()["candidature"]] == ["INF0001"]
+
+    response = client.post(
+        "/v1/cours/20251/INF0002/candidature",
+        json={
+            "code_permanent": "LIFE12345678",
+            "nom": "Cycle",
+            "prenom": "Vie",
+            "cycle": 2,
+        },
+    )
+    assert response.status_code == 200
+    assert len(response.json()["candidature"]) == 1
+
+    response = client.delete(f"/v1/20251/candidature/{etudiant['id']}")
+    assert response.status_code == 200
+    assert client.get("/v1/20251/candidature").json() == []
+
+
+@pytest.mark.asyncio
+async def test_candidatures_pages(client: TestClient, factory: Factory):
+    await seed_campagne(factory.session, nb_etudiants=7)
+
+    pages = []
+    params: dict = {"limit": 3}
+    while True:
+        response = client.get("/v1/20251/candidature", params=params)
+        assert response.status_code == 200
+        pages.append([e["id"] for e in response.json()])
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["after"] = response.headers["X-Next-Cursor"]
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    ids = [id for page in pages for id in page]
+    assert ids == sorted(ids)
+    assert ids == [e["id"] for e in client.get("/v1/20251/candidature").json()]
+
+    assert client.get("/v1/20251/candidature?limit=0").status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_candidatures_filters(client: TestClient, factory: Factory):
+    await seed_campagne(factory.session, nb_etudiants=6)
+
+    def count(**params) -> int:
+        response = client.get("/v1/20251/candidature", params=params)
+        assert response.status_code == 200
+        return len(response.json())
+
+    assert count(cycle=1) == 2
+    assert count(campus="gatineau", programme="1234") == 6
+    assert count(campus="st-jerome") == 0
+    assert count(sigle="INF0001") == 6
+    assert count(sigle="INF0001", note="A") == 6
+    assert count(sigle="INF0001", note="B") == 0
+    assert count(sigle="INF9999") == 0
+    assert count(cycle=2, sigle="INF0001", limit=1) == 1
+
+
+@pytest.mark.asyncio
+async def test_candidatures_projection(client: TestClient, factory: Factory):
+    await seed_campagne(factory.session)
+
+    response = client.get(
+        "/v1/20251/candidature", params={"include": "", "fields": "id,nom"}
+    )
+    assert response.status_code == 200
+    assert response.json() == [{"id": i + 1, "nom": f"Nom{i}"} for i in range(4)]
+
+    response = client.get(
+        "/v1/20251/candidature",
+        params={"include": "candidature", "fields": "nom,candidature.sigle"},
+    )
+    assert response.json()[0] == {
+        "nom": "Nom0",
+        "candidature": [{"sigle": f"INF{c:04d}"} for c in range(3)],
+    }
+
+
+@pytest.mark.asyncio
+async def test_candidatures_ndjson(client: TestClient, factory: Factory):
+    await seed_campagne(factory.session, nb_etudiants=6)
+    ndjson = {"Accept": "application/x-ndjson"}
+
+    def lines(**params) -> list[dict]:
+        response = client.get("/v1/20251/candidature", params=params, headers=ndjson)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert "ETag" not in response.headers
+        return [json.loads(line) for line in response.text.splitlines()]
+
+    assert lines() == client.get("/v1/20251/candidature").json()
+    assert [e["id"] for e in lines(after=2, limit=3)] == [3, 4, 5]
+    assert len(lines(cycle=1)) == 2
+    assert lines(include="", fields="id") == [{"id": i + 1} for i in range(6)]
+
+
+@pytest.mark.asyncio
+async def test_candidature_resume(client: TestClient, factory: Factory):
+    await seed_campagne(factory.session, nb_etudiants=0)
+    form = {
+        "code_permanent": "CVCV12345678",
+        "nom": "Resume",
+        "prenom": "Test",
+        "cycle": "1",
+        "campus": Campus.gat.value,
+        "programme": "1234",
+        "email": "test.resume@uqo.ca",
+        "courses_json": "[]",
+    }
+
+    def post(content: bytes):
+        return client.post(
+            "/v1/20251/candidature",
+            data=form,
+            files={"resume": ("cv.pdf", content, "application/pdf")},
+        )
+
+    assert post(b"not a pdf").status_code == 415
+    assert client.get("/v1/20251/candidature").json() == []
+
+    response = post(b"%PDF-1.4\n%%EOF\n")
+    assert response.status_code == 200
+    etudiant_id = response.json()["id"]
+    response = client.get(f"/v1/20251/candidature/{etudiant_id}/resume")
+    assert response.content == b"%PDF-1.4\n%%EOF\n"
+
+
+@pytest.mark.asyncio
+async def test_candidature_resume_deduplicated(
+    client: TestClient, factory: Factory, test_settings: Settings
+):
+    await seed_campagne(factory.session, nb_etudiants=0)
+    storage = Path(test_settings.STORAGE_DIRECTORY)
+
+    def form(code: str) -> dict:
+        return {
+            "code_permanent": code,
+            "nom": "Dedup",
+            "prenom": code,
+            "cycle": "1",
+            "campus": Campus.gat.value,
+            "programme": "1234",
+            "email": f"{code}@uqo.ca",
+            "courses_json": '[{"sigle": "INF0000", "note": "A"}]',
+        }
+
+    def resume(content: bytes) -> dict:
+        return {"resume": ("cv.pdf", content, "application/pdf")}
+
+    def blobs() -> dict[str, int]:
+        return {
+            path.name: path.stat().st_size
+            for path in storage.rglob("*.pdf")
+            if len(path.stem) == 64
+        }
+
+    async def refcounts() -> dict[str, int]:
+        rows = await factory.session.exec(select(ResumeBlob))
+        return {blob.hash: blob.refcount for blob in rows}
+
+    cv = b"%PDF-1.4\nsame\n%%EOF\n"
+    ids = [
+        client.post("/v1/20251/candidature", data=form(code), files=resume(cv)).json()[
+            "id"
+        ]
+        for code in ("DEDU00000001", "DEDU00000002")
+    ]
+    digest = hashlib.sha256(cv).hexdigest()
+    assert blobs() == {f"{digest}.pdf": len(cv)}
+    assert await refcounts() == {digest: 2}
+
+    for id in ids:
+        response = client.get(f"/v1/20251/candidature/{id}/resume")
+        assert response.content == cv
+        assert f"20251_{id}.pdf" in response.headers["Content-Disposition"]
+
+    response = client.post("/v1/cours/20251/INF0000/resumes")
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert sorted(archive.namelist()) == [f"20251_{id}.pdf" for id in ids]
+
+    # Replacing a resume moves the reference, deleting drops it
+    other = b"%PDF-1.4\nother\n%%EOF\n"
+    client.put(
+        f"/v1/20251/candidature/{ids[0]}",
+        data=form("DEDU00000001"),
+        files=resume(other),
+    )
+    other_digest = hashlib.sha256(other).hexdigest()
+    assert await refcounts() == {digest: 1, other_digest: 1}
+
+    client.delete(f"/v1/20251/candidature/{ids[1]}")
+    assert await refcounts() == {other_digest: 1}
+    assert blobs() == {f"{other_digest}.pdf": len(other)}
+
+
+@pytest.mark.asyncio
+async def test_campagne_resumes(client: TestClient, factory: Factory):
+    await seed_campagne(factory.session, nb_etudiants=0)
+
+    response = client.post("/v1/campagne/20251/resumes")
+    assert response.status_code == 400
+    assert client.post("/v1/campagne/19991/resumes").status_code == 404
+
+    resumes = {}
+    for code, sigles in [
+        ("EXPO00000001", ["INF0000", "INF1111"]),
+        ("EXPO00000002", ["INF1111"]),
+    ]:
+        content = f"%PDF-1.4\n{code}\n%%EOF\n".encode()
+        response = client.post(
+            "/v1/20251/candidature",
+            data={
+                "code_permanent": code,
+                "nom": "Export",
+                "prenom": code,
+                "cycle": "1",
+                "campus": Campus.gat.value,
+                "programme": "1234",
+                "email": f"{code}@uqo.ca",
+                "courses_json": json.dumps(
+                    [{"sigle": sigle, "note": "A"} for sigle in sigles]
+                ),
+            },
+            files={"resume": ("cv.pdf", content, "application/pdf")},
+        )
+        id = response.json()["id"]
+        resumes.update({f"{sigle}/20251_{id}.pdf": content for sigle in sigles})
+
+    response = client.post("/v1/campagne/20251/resumes")
+    assert response.status_code == 200
+    assert "resumes_20251.zip" in response.headers["Content-Disposition"]
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert archive.testzip() is None
+        assert {name: archive.read(name) for name in archive.namelist()} == resumes
+
+
+@pytest.mark.asyncio
+async def test_candidature_resume_kept_on_failed_change(
+    client: TestClient,
+    factory: Factory,
+    test_settings: Settings,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    await seed_campagne(factory.session, nb_etudiants=0)
+    storage = Path(test_settings.STORAGE_DIRECTORY)
+    data = {
+        "code_permanent": "FAIL00000001",
+        "nom": "Fail",
+        "prenom": "Commit",
+        "cycle": "1",
+        "campus": Campus.gat.value,
+        "programme": "1234",
+        "email": "fail@uqo.ca",
+        "courses_json": "[]",
+    }
+    cv = b"%PDF-1.4\nkept\n%%EOF\n"
+    id = client.post(
+        "/v1/20251/candidature",
+        data=data,
+        files={"resume": ("cv.pdf", cv, "application/pdf")},
+    ).json()["id"]
+
+    async def failing_refresh(self, trimestre: int) -> None:
+        raise RuntimeError("refresh failed")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(CampagneStatsService, "refresh", failing_refresh)
+        with pytest.raises(RuntimeError):
+            client.put(
+                f"/v1/20251/candidature/{id}",
+                data=data,
+                files={"resume": ("cv.pdf", b"%PDF-1.4\nnew\n", "application/pdf")},
+            )
+        with pytest.raises(RuntimeError):
+            client.delete(f"/v1/20251/candidature/{id}")
+
+    # The rolled back rows still point to the resume, which is still there,
+    # and the blob saved for the failed update is gone
+    assert [path.read_bytes() for path in storage.rglob("*.pdf")] == [cv]
+    assert client.get(f"/v1/20251/candidature/{id}/resume").content == cv
+
+
+@pytest.mark.asyncio
+async def test_candidature_resume_legacy_file(
+    client: TestClient,
+    factory: Factory,
+    test_settings: Settings,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    await seed_campagne(factory.session, nb_etudiants=0)
+    deleted: list[str] = []
+
+    async def delete_file(self, filename: str) -> None:
+        deleted.append(filename)
+
+    monkeypatch.setattr(LocalStorageProvider, "delete_file", delete_file)
+
+    def form(code: str) -> dict:
+        return {
+            "code_permanent": code,
+            "nom": "Legacy",
+            "prenom": code,
+            "cycle": "1",
+            "campus": Campus.gat.value,
+            "programme": "1234",
+            "email": f"{code}@uqo.ca",
+            "courses_json": "[]",
+        }
+
+    def resume(content: bytes) -> dict:
+        return {"resume": ("cv.pdf", content, "application/pdf")}
+
+    # Etudiants without a legacy file have nothing to delete
+    client.post(
+        "/v1/20251/candidature", data=form("LEGA00000001"), files=resume(b"%PDF-1")
+    )
+    id = client.post("/v1/20251/candidature", data=form("LEGA00000002")).json()["id"]
+    client.put(
+        f"/v1/20251/candidature/{id}",
+        data=form("LEGA00000002"),
+        files=resume(b"%PDF-2"),
+    )
+    assert deleted == []
+
+    # A resume saved before deduplication is deleted once replaced
+    id = client.post("/v1/20251/candidature", data=form("LEGA00000003")).json()["id"]
+    legacy = Path(test_settings.STORAGE_DIRECTORY) / "20251" / f"20251_{id}.pdf"
+    legacy.parent.mkdir(parents=True, exist_ok=True)
+    legacy.write_bytes(b"%PDF-legacy")
+    client.put(
+        f"/v1/20251/candidature/{id}",
+        data=form("LEGA00000003"),
+        files=resume(b"%PDF-3"),
+    )
+    assert deleted == [f"20251_{id}.pdf"]
+
+
+@pytest.mark.asyncio
+async def test_archived_campagne_resumes(client: TestClient, factory: Factory):
+    await seed_campagne(factory.session, nb_etudiants=0)
+    cv = b"%PDF-1.4\narchived\n%%EOF\n"
+    id = client.post(
+        "/v1/20251/candidature",
+        data={
+            "code_permanent": "ARCH00000001",
+            "nom": "Archive",
+            "prenom": "Read",
+            "cycle": "1",
+            "campus": Campus.gat.value,
+            "programme": "1234",
+            "email": "archive@uqo.ca",
+            "courses_json": '[{"sigle": "INF0000", "note": "A"}]',
+        },
+        files={"resume": ("cv.pdf", cv, "application/pdf")},
+    ).json()["id"]
+
+    client.put("/v1/campagne/20251", json={"status": "cloturee"})
+    assert client.post("/v1/campagne/20251/archive").status_code == 200
+
+    # Read from the archive tables
+    response = client.get(f"/v1/20251/candidature/{id}/resume")
+    assert response.status_code == 200
+    assert response.content == cv
+
+    response = client.post("/v1/cours/20251/INF0000/resumes")
+    assert response.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert archive.read(f"20251_{id}.pdf") == cv
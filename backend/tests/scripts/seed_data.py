@@ -0,0 +1,96 @@
+from datetime import datetime
+
+import structlog
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.schemas import Campagne, Cours, Seance, Activite, Candidature, Etudiant
+from src.models.uqo import ActiviteType, ActiviteMode, Campus, Note
+from src.services.stats import CampagneStatsService
+
+
+async def seed_campagne(
+    session: AsyncSession,
+    *,
+    trimestre: int = 20251,
+    nb_cours: int = 3,
+    nb_seances: int = 2,
+    nb_etudiants: int = 4,
+) -> Campagne:
+    """Seed a complete campagne tree.
+
+    Every cours gets ``nb_seances`` seances with one TD and one TP each.  Every
+    etudiant applies to every cours and is made responsable of the first
+    activite of each seance.
+    """
+    campagne = Campagne(trimestre=trimestre)
+    session.add(campagne)
+    await session.flush()
+
+    etudiants = [
+        Etudiant(
+            code_permanent=f"TEST{trimestre}{i:04d}",
+            email=f"etudiant{i}@{trimestre}.uqo.ca",
+            nom=f"Nom{i}",
+            prenom=f"Prenom{i}",
+            cycle=i % 3 + 1,
+            campus=Campus.gat,
+            programme="1234",
+            trimestre=trimestre,
+        )
+        for i in range(nb_etudiants)
+    ]
+    session.add_all(etudiants)
+    await session.flush()
+
+    for c in range(nb_cours):
+        sigle = f"INF{c:04d}"
+        session.add(
+            Cours(
+                sigle=sigle,
+                trimestre=trimestre,
+                titre=f"Cours {c}",
+                id_campagne=campagne.id,
+            )
+        )
+        candidatures = [
+            Candidature(
+                sigle=sigle,
+                trimestre=trimestre,
+                id_etudiant=etudiant.id,
+                note=Note.A,
+            )
+            for etudiant in etudiants
+        ]
+        session.add_all(candidatures)
+        for s in range(nb_seances):
+            groupe = f"{s + 1:02d}"
+            session.add(
+                Seance(
+                    trimestre=trimestre,
+                    sigle=sigle,
+                    groupe=groupe,
+                    campus=[Campus.gat],
+                )
+            )
+            for type_ in (ActiviteType.TD, ActiviteType.TP):
+                session.add(
+                    Activite(
+                        trimestre=trimestre,
+                        sigle=sigle,
+                        groupe=groupe,
+                        type=type_,
+                        mode=ActiviteMode.PRESENTIEL,
+                        jour=s % 5 + 1,
+                        hr_debut=830,
+                        hr_fin=1130,
+                        date_debut=datetime(2025, 1, 6),
+                        date_fin=datetime(2025, 4, 18),
+                        nombre_seance=12,
+                        responsable=candidatures if type_ == ActiviteType.TD else [],
+                    )
+                )
+
+    stats = CampagneStatsService(session=session, logger=structlog.get_logger())
+    await stats.refresh(trimestre)
+    await session.commit()
+    return campagne
@@ -0,0 +1,31 @@
+import pytest
+
+from src.cache import ResponseCache
+
+
+@pytest.mark.asyncio
+async def test_response_cache_variants():
+    cache = ResponseCache(max_variants=2)
+    renders: list[str] = []
+
+    async def get(variant: str, etag: str = '"1"') -> bytes:
+        async def render() -> bytes:
+            renders.append(variant)
+            return variant.encode()
+
+        return await cache.get_or_render(20251, etag, variant, render)
+
+    assert await get("a") == b"a"
+    assert await get("b") == b"b"
+    assert await get("a") == b"a"
+    assert renders == ["a", "b"]
+
+    # The least recently used variant is dropped past the limit
+    await get("c")
+    await get("a")
+    await get("b")
+    assert renders == ["a", "b", "c", "b"]
+
+    # A new data version drops the others
+    await get("a", '"2"')
+    assert renders == ["a", "b", "c", "b", "a"]
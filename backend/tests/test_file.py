@@ -0,0 +1,146 @@
+import io
+import os
+import zipfile
+from pathlib import Path
+
+import pytest
+from fastapi import UploadFile
+
+from src.exceptions import FileTooLargeError, InvalidFileTypeError
+from src.file import UPLOAD_CHUNK_SIZE, ZIP_CHUNK_SIZE, LocalStorageProvider
+
+
+@pytest.mark.asyncio
+async def test_zip_files_streams(tmp_path: Path):
+    storage = LocalStorageProvider(str(tmp_path))
+    resume = os.urandom(5 * ZIP_CHUNK_SIZE + 123)
+    (tmp_path / "20251_1.pdf").write_bytes(resume)
+    (tmp_path / "20251_2.txt").write_bytes(b"notes " * 1000)
+
+    names = ["20251_1.pdf", "20251_3.pdf", "20251_2.txt"]
+    response = storage.zip_files("resumes_20251", [(name, name) for name in names])
+    assert response.headers["Content-Disposition"] == (
+        "attachment; filename=resumes_20251.zip"
+    )
+
+    chunks = [chunk async for chunk in response.body_iterator]
+    assert len(chunks) > 5
+    assert max(len(chunk) for chunk in chunks) <= ZIP_CHUNK_SIZE + 1024
+
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+        assert archive.testzip() is None
+        assert archive.namelist() == ["20251_1.pdf", "20251_2.txt"]
+        assert archive.getinfo("20251_1.pdf").compress_type == zipfile.ZIP_STORED
+        assert archive.getinfo("20251_2.txt").compress_type == zipfile.ZIP_DEFLATED
+        assert archive.read("20251_1.pdf") == resume
+
+
+@pytest.mark.asyncio
+async def test_save_file(tmp_path: Path):
+    storage = LocalStorageProvider(str(tmp_path), max_file_size=3 * UPLOAD_CHUNK_SIZE)
+    resume = b"%PDF-1.7\n" + os.urandom(2 * UPLOAD_CHUNK_SIZE)
+
+    await storage.save_file("20251_1.pdf", UploadFile(io.BytesIO(resume)))
+    assert (tmp_path / "20251" / "20251_1.pdf").read_bytes() == resume
+
+    too_large = b"%PDF-1.7\n" + os.urandom(3 * UPLOAD_CHUNK_SIZE)
+    with pytest.raises(FileTooLargeError):
+        await storage.save_file("20251_1.pdf", UploadFile(io.BytesIO(too_large)))
+    for content in (b"<html></html>", b"%PD"):
+        with pytest.raises(InvalidFileTypeError):
+            await storage.save_file("20251_1.pdf", UploadFile(io.BytesIO(content)))
+
+    # Rejected uploads leave the previous file, and no temporary file, behind
+    assert (tmp_path / "20251" / "20251_1.pdf").read_bytes() == resume
+    assert [path.name for path in (tmp_path / "20251").iterdir()] == ["20251_1.pdf"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("index", [False, True])
+async def test_storage_layout(tmp_path: Path, index: bool):
+    # Saved before the files were sharded by trimestre
+    (tmp_path / "20251_1.pdf").write_bytes(b"%PDF-legacy")
+    (tmp_path / "20251_2.pdf").write_bytes(b"%PDF-legacy")
+    storage = LocalStorageProvider(str(tmp_path), index=index)
+
+    await storage.save_file("20251_3.pdf", UploadFile(io.BytesIO(b"%PDF-3")))
+    assert (tmp_path / "20251" / "20251_3.pdf").read_bytes() == b"%PDF-3"
+
+    # Saved by another process after startup
+    (tmp_path / "20251" / "20251_4.pdf").write_bytes(b"%PDF-4")
+
+    for name in ("20251_1.pdf", "20251_2.pdf", "20251_3.pdf", "20251_4.pdf"):
+        assert await storage.file_exists(name)
+    assert not await storage.file_exists("20251_5.pdf")
+    with pytest.raises(FileNotFoundError):
+        await storage.read_file("20251_5.pdf")
+    assert (await storage.read_file("20251_1.pdf")).path == tmp_path / "20251_1.pdf"
+
+    # Replacing a legacy file moves it to its shard
+    await storage.save_file("20251_1.pdf", UploadFile(io.BytesIO(b"%PDF-1")))
+    assert not (tmp_path / "20251_1.pdf").exists()
+    assert (
+        await storage.read_file("20251_1.pdf")
+    ).path == tmp_path / "20251" / "20251_1.pdf"
+
+    await storage.delete_file("20251_2.pdf")
+    await storage.delete_file("20251_3.pdf")
+    assert not await storage.file_exists("20251_2.pdf")
+    assert not await storage.file_exists("20251_3.pdf")
+
+    names = [f"20251_{i}.pdf" for i in range(1, 6)]
+    response = storage.zip_files("resumes", [(name, name) for name in names])
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    with zipfile.ZipFile(io.BytesIO(body)) as archive:
+        assert archive.namelist() == ["20251_1.pdf", "20251_4.pdf"]
+
+
+@pytest.mark.asyncio
+async def test_read_file_accel_redirect(tmp_path: Path):
+    (tmp_path / "20251_1.pdf").write_bytes(b"%PDF-legacy")
+    storage = LocalStorageProvider(str(tmp_path), index=True, accel_redirect="/_cv")
+    await storage.save_file("20251_2.pdf", UploadFile(io.BytesIO(b"%PDF-2")))
+
+    for filename, location in [
+        ("20251_1.pdf", "/_cv/20251_1.pdf"),
+        ("20251_2.pdf", "/_cv/20251/20251_2.pdf"),
+    ]:
+        response = await storage.read_file(filename, "cv.pdf")
+        # The proxy sends the content
+        assert response.body == b""
+        assert response.headers["X-Accel-Redirect"] == location
+        assert response.headers["Content-Disposition"] == (
+            'attachment; filename="cv.pdf"'
+        )
+
+    with pytest.raises(FileNotFoundError):
+        await storage.read_file("20251_3.pdf")
+
+
+@pytest.mark.asyncio
+async def test_export_files(tmp_path: Path):
+    storage = LocalStorageProvider(str(tmp_path))
+    resumes = {f"20251_{i}.pdf": os.urandom(i * ZIP_CHUNK_SIZE + i) for i in (1, 2, 3)}
+    for name, content in resumes.items():
+        (tmp_path / name).write_bytes(content)
+
+    files = [
+        ("20251_1.pdf", ["INF0000/20251_1.pdf", "INF1111/20251_1.pdf"]),
+        ("20251_4.pdf", ["INF0000/20251_4.pdf"]),
+        ("20251_2.pdf", ["INF1111/20251_2.pdf"]),
+        ("20251_3.pdf", ["INF2222/20251_3.pdf"]),
+    ]
+    response = storage.export_files("resumes_20251", files)
+    chunks = [chunk async for chunk in response.body_iterator]
+    assert max(len(chunk) for chunk in chunks) <= ZIP_CHUNK_SIZE + 1024
+
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+        assert archive.testzip() is None
+        assert archive.namelist() == [
+            "INF0000/20251_1.pdf",
+            "INF1111/20251_1.pdf",
+            "INF1111/20251_2.pdf",
+            "INF2222/20251_3.pdf",
+        ]
+        for name in archive.namelist():
+            assert archive.read(name) == resumes[name.partition("/")[2]]
@@ -0,0 +1,86 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+from structlog.testing import capture_logs
+
+from src.config import Settings
+from src.factory import Factory
+from src.instrumentation import instrument, track_queries
+from src.main import create_app
+
+from tests.scripts.seed_data import seed_campagne
+
+
+@pytest.mark.asyncio
+async def test_statistics_headers(client: TestClient, factory: Factory):
+    await seed_campagne(factory.session)
+
+    response = client.get("/v1/campagne/20251")
+    assert response.status_code == 200
+    # The campagne, then one statement per level of the tree
+    assert int(response.headers["X-DB-Statement-Count"]) >= 4
+    assert float(response.headers["X-DB-Time-Ms"]) > 0
+    assert float(response.headers["X-DB-Slowest-Ms"]) <= float(
+        response.headers["X-DB-Time-Ms"]
+    )
+
+
+@pytest.mark.asyncio
+async def test_statistics_are_logged(client: TestClient, factory: Factory):
+    await seed_campagne(factory.session)
+
+    with capture_logs() as logs:
+        response = client.get("/v1/20251/candidature")
+    assert response.status_code == 200
+
+    [event] = [log for log in logs if log["event"] == "Database statements"]
+    assert event["httpRequest"]["requestMethod"] == "GET"
+    assert event["db_statements"] == int(response.headers["X-DB-Statement-Count"])
+    assert event["db_slowest_statement"].startswith("SELECT")
+
+
+@pytest.mark.asyncio
+async def test_streamed_statistics_are_logged(client: TestClient, factory: Factory):
+    await seed_campagne(factory.session)
+
+    with capture_logs() as logs:
+        response = client.get(
+            "/v1/20251/candidature", headers={"Accept": "application/x-ndjson"}
+        )
+    assert response.status_code == 200
+
+    events = [log for log in logs if log["event"] == "Database statements"]
+    [streamed] = [event for event in events if event.get("streamed")]
+    assert streamed["db_statements"] > 0
+    assert streamed["db_slowest_statement"].startswith("SELECT")
+
+
+@pytest.mark.asyncio
+async def test_failed_statement_is_timed():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    instrument(engine)
+
+    async with engine.connect() as conn:
+        with track_queries() as stats:
+            with pytest.raises(OperationalError):
+                await conn.execute(text("SELECT * FROM missing"))
+            await conn.execute(text("SELECT 1"))
+
+        assert conn.sync_connection.info["query_start"] == []
+    await engine.dispose()
+
+    assert stats.count == 2
+    assert stats.slowest_statement is not None
+
+
+def test_no_headers_in_prod(
+    test_settings: Settings, empty_database: None, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setenv("ENVIRONMENT", "prod")
+    with TestClient(create_app(Settings())) as client:
+        response = client.get("/v1/campagne")
+
+    assert response.status_code == 200
+    assert "X-DB-Statement-Count" not in response.headers
@@ -0,0 +1,30 @@
+import pytest
+
+from src.models.responses import CampagneFullResponse
+from src.services.projection import Projection, projected
+
+
+def test_projection_canonical():
+    def parse(fields: list[str] | None, include: list[str] | None) -> Projection:
+        return Projection.parse(CampagneFullResponse, fields=fields, include=include)
+
+    projection = parse(["cours.titre", "cours.sigle", "trimestre"], ["cours"])
+    assert projection == parse(
+        ["trimestre", "cours.sigle", "cours.titre", "cours.sigle"],
+        ["cours", "cours"],
+    )
+    assert repr(projection) == repr(
+        parse(["cours.sigle", "trimestre", "cours.titre"], ["cours"])
+    )
+    # The same response model is built once
+    assert projected(CampagneFullResponse, projection) is projected(
+        CampagneFullResponse,
+        parse(["trimestre", "cours.titre", "cours.sigle"], ["cours"]),
+    )
+
+    # Listing every attribute is the same as listing none
+    attributes = [name for name in CampagneFullResponse.model_fields if name != "cours"]
+    assert parse(attributes, ["cours"]) == parse(None, ["cours"])
+
+    with pytest.raises(ValueError):
+        parse(["unknown"], None)
@@ -0,0 +1,103 @@
+import sqlite3
+from collections.abc import Generator
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import Engine, event
+from sqlmodel import SQLModel
+
+from src.config import Settings
+from src.factory import Factory
+
+from tests.scripts.seed_data import seed_campagne
+
+ALLOWED_SCANS = {"campagne"}
+"""Tables that are small enough to be read in full."""
+
+REQUESTS = [
+    ("GET", "/v1/campagne", None),
+    ("GET", "/v1/campagne/20251", None),
+    ("GET", "/v1/campagne/20251/cours", None),
+    ("GET", "/v1/20251/candidature", None),
+    ("GET", "/v1/20251/candidature?limit=2&after=1&cycle=1&sigle=INF0001", None),
+    ("GET", "/v1/20251/candidature/1/resume", None),
+    (
+        "PUT",
+        "/v1/campagne/20251/INF0001/01",
+        {"activite": [{"id": 5, "candidature": [1, 2]}]},
+    ),
+    ("PATCH", "/v1/campagne/20251/INF0001/changes/approve", None),
+    ("PATCH", "/v1/campagne/20251/INF0001/02/changes/approve", None),
+    ("PATCH", "/v1/campagne/20251/INF0001/02/7/changes/approve", None),
+    (
+        "POST",
+        "/v1/cours/20251/INF0002/candidature",
+        {"code_permanent": "TEST202519999", "nom": "N", "prenom": "P", "cycle": 1},
+    ),
+    ("POST", "/v1/cours/20251/INF0002/resumes", None),
+    ("POST", "/v1/campagne/20251/resumes", None),
+    ("DELETE", "/v1/20251/candidature/2", None),
+]
+
+
+@pytest.fixture(scope="function")
+def executed() -> Generator[list[tuple[str, tuple]], None, None]:
+    """Record the statements and parameters executed during the test."""
+    statements: list[tuple[str, tuple]] = []
+
+    def before_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ) -> None:
+        if not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(Engine, "before_cursor_execute", before_cursor_execute)
+
+
+def full_scans(database: str, statement: str, parameters: tuple) -> list[str]:
+    """Return the plan steps of ``statement`` that read a whole table or index."""
+    tables = set(SQLModel.metadata.tables) - ALLOWED_SCANS
+    with sqlite3.connect(database) as conn:
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+
+    scans = []
+    for *_, detail in plan:
+        words = detail.split()
+        # SQLite before 3.36 writes "SCAN TABLE x"
+        if words[1:2] == ["TABLE"]:
+            del words[1]
+        if words[0] == "SCAN" and words[1] in tables:
+            scans.append(detail)
+    return scans
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(("method", "url", "body"), REQUESTS)
+async def test_no_table_scan(
+    client: TestClient,
+    factory: Factory,
+    test_settings: Settings,
+    executed: list[tuple[str, tuple]],
+    method: str,
+    url: str,
+    body: dict | None,
+):
+    await seed_campagne(factory.session, nb_cours=5, nb_etudiants=5)
+    resume = Path(test_settings.STORAGE_DIRECTORY) / "20251" / "20251_1.pdf"
+    resume.parent.mkdir(parents=True, exist_ok=True)
+    resume.write_bytes(b"%PDF-1.4\n")
+    executed.clear()
+
+    response = client.request(method, url, json=body)
+
+    assert response.is_success, response.text
+    assert executed
+    for statement, parameters in executed:
+        if not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            continue
+        assert not full_scans(test_settings.SQLLITE_FILE_NAME, statement, parameters), (
+            statement
+        )
@@ -0,0 +1,92 @@
+import json
+
+import msgpack
+import pytest
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from src.factory import Factory
+from src.models.responses import CampagneFullResponse
+from src.responses import JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, negotiate, render
+
+from fastapi.testclient import TestClient
+
+from tests.scripts.seed_data import seed_campagne
+
+
+@pytest.mark.asyncio
+async def test_render_matches_fastapi(factory: Factory):
+    await seed_campagne(factory.session)
+    campagne = await factory.create_campagne_service().get_campagne(20251)
+
+    field = create_model_field(
+        name="Response", type_=CampagneFullResponse, mode="serialization"
+    )
+    expected = await serialize_response(field=field, response_content=campagne)
+
+    response = render(CampagneFullResponse, campagne)
+    assert response.media_type == "application/json"
+    assert json.loads(response.body) == expected
+
+
+@pytest.mark.parametrize(
+    ("accept", "expected"),
+    [
+        (None, JSON_MEDIA_TYPE),
+        ("*/*", JSON_MEDIA_TYPE),
+        ("application/msgpack", MSGPACK_MEDIA_TYPE),
+        ("application/x-msgpack, application/json;q=0.9", MSGPACK_MEDIA_TYPE),
+        ("application/msgpack, */*", MSGPACK_MEDIA_TYPE),
+        ("application/msgpack;q=0.5, application/json", JSON_MEDIA_TYPE),
+        ("application/msgpack;q=0, */*", JSON_MEDIA_TYPE),
+        ("text/html", JSON_MEDIA_TYPE),
+    ],
+)
+def test_negotiate(accept: str | None, expected: str):
+    assert negotiate(accept) == expected
+
+
+@pytest.mark.asyncio
+async def test_msgpack_responses(client: TestClient, factory: Factory):
+    await seed_campagne(factory.session)
+    msgpack_headers = {"Accept": MSGPACK_MEDIA_TYPE}
+
+    for url in (
+        "/v1/campagne",
+        "/v1/campagne/20251",
+        "/v1/campagne/20251/cours",
+        "/v1/20251/candidature",
+    ):
+        expected = client.get(url)
+        response = client.get(url, headers=msgpack_headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == MSGPACK_MEDIA_TYPE
+        assert response.headers["Vary"] == "Accept"
+        assert msgpack.unpackb(response.content) == expected.json()
+        assert ("ETag" in response.headers) == ("ETag" in expected.headers)
+
+    # Routes returning plain objects go through the default response class
+    seance = client.get("/v1/campagne/20251").json()["cours"][0]["seance"][0]
+    url = f"/v1/campagne/20251/INF0000/{seance['groupe']}/changes/approve"
+    expected = client.patch(url).json()
+    response = client.patch(url, headers=msgpack_headers)
+    assert response.headers["content-type"] == MSGPACK_MEDIA_TYPE
+    assert msgpack.unpackb(response.content) == expected
+
+    json_etag = client.get("/v1/campagne/20251").headers["ETag"]
+    response = client.get("/v1/campagne/20251", headers=msgpack_headers)
+    assert response.headers["ETag"] != json_etag
+    assert (
+        client.get(
+            "/v1/campagne/20251",
+            headers={**msgpack_headers, "If-None-Match": json_etag},
+        ).status_code
+        == 200
+    )
+    assert (
+        client.get(
+            "/v1/campagne/20251",
+            headers={**msgpack_headers, "If-None-Match": response.headers["ETag"]},
+        ).status_code
+        == 304
+    )
@@ -0,0 +1,127 @@
+import io
+import os
+import zipfile
+from collections.abc import Generator
+from typing import Any
+
+import boto3
+import moto
+import pytest
+from fastapi import UploadFile
+
+from src.exceptions import FileTooLargeError, InvalidFileTypeError
+from src.s3 import S3StorageProvider
+
+PART_SIZE = 5 * 1024 * 1024
+"""The smallest part S3 accepts."""
+
+
+@pytest.fixture
+def client(monkeypatch: pytest.MonkeyPatch) -> Generator[Any, None, None]:
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="resumes")
+        yield client
+
+
+@pytest.fixture
+def storage(client: Any) -> S3StorageProvider:
+    return S3StorageProvider(
+        client,
+        "resumes",
+        prefix="cv/",
+        max_file_size=3 * PART_SIZE,
+        part_size=PART_SIZE,
+    )
+
+
+def content(client: Any, key: str) -> bytes:
+    return client.get_object(Bucket="resumes", Key=key)["Body"].read()
+
+
+@pytest.mark.asyncio
+async def test_save_file(client: Any, storage: S3StorageProvider):
+    small = b"%PDF-1.7\nsmall"
+    await storage.save_file("20251_1.pdf", UploadFile(io.BytesIO(small)))
+    assert content(client, "cv/20251_1.pdf") == small
+
+    # Sent in three parts, as it's received
+    resume = b"%PDF-1.7\n" + os.urandom(2 * PART_SIZE + 123)
+    await storage.save_file("20251_1.pdf", UploadFile(io.BytesIO(resume)))
+    assert content(client, "cv/20251_1.pdf") == resume
+    head = client.head_object(Bucket="resumes", Key="cv/20251_1.pdf")
+    assert head["ETag"].endswith('-3"')
+    assert head["ContentType"] == "application/pdf"
+
+    too_large = b"%PDF-1.7\n" + os.urandom(3 * PART_SIZE)
+    with pytest.raises(FileTooLargeError):
+        await storage.save_file("20251_1.pdf", UploadFile(io.BytesIO(too_large)))
+    with pytest.raises(InvalidFileTypeError):
+        await storage.save_file("20251_1.pdf", UploadFile(io.BytesIO(b"<html>")))
+
+    # Rejected uploads leave the previous object, and no upload, behind
+    assert content(client, "cv/20251_1.pdf") == resume
+    assert "Uploads" not in client.list_multipart_uploads(Bucket="resumes")
+
+
+@pytest.mark.asyncio
+async def test_blobs(client: Any, storage: S3StorageProvider):
+    resume = b"%PDF-1.7\nblob"
+    blob = await storage.hash_blob(UploadFile(io.BytesIO(resume)), ".pdf")
+    assert blob.size == len(resume)
+
+    assert await storage.save_blob(blob, UploadFile(io.BytesIO(resume)))
+    assert not await storage.save_blob(blob, UploadFile(io.BytesIO(resume)))
+    assert content(client, f"cv/{blob.name}") == resume
+    assert await storage.file_exists(blob.name)
+
+    await storage.delete_file(blob.name)
+    assert not await storage.file_exists(blob.name)
+
+
+@pytest.mark.asyncio
+async def test_read_file(storage: S3StorageProvider):
+    await storage.save_file("20251_1.pdf", UploadFile(io.BytesIO(b"%PDF-1")))
+
+    response = await storage.read_file("20251_1.pdf", "cv.pdf")
+    assert response.status_code == 307
+    location = response.headers["Location"]
+    assert "cv/20251_1.pdf?" in location
+    assert "response-content-disposition=attachment" in location
+    assert "Signature" in location
+
+    with pytest.raises(FileNotFoundError):
+        await storage.read_file("20251_2.pdf")
+
+
+@pytest.mark.asyncio
+async def test_zip_files(storage: S3StorageProvider):
+    resumes = {f"20251_{i}.pdf": b"%PDF-" + os.urandom(i * 100_000) for i in (1, 2)}
+    for name, resume in resumes.items():
+        await storage.save_file(name, UploadFile(io.BytesIO(resume)))
+
+    names = ["20251_1.pdf", "20251_3.pdf", "20251_2.pdf"]
+    response = storage.zip_files("resumes", [(name, name) for name in names])
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    with zipfile.ZipFile(io.BytesIO(body)) as archive:
+        assert archive.namelist() == ["20251_1.pdf", "20251_2.pdf"]
+        assert archive.read("20251_2.pdf") == resumes["20251_2.pdf"]
+
+    files = [
+        ("20251_1.pdf", ["INF0000/20251_1.pdf", "INF1111/20251_1.pdf"]),
+        ("20251_3.pdf", ["INF0000/20251_3.pdf"]),
+        ("20251_2.pdf", ["INF1111/20251_2.pdf"]),
+    ]
+    response = storage.export_files("resumes", files)
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    with zipfile.ZipFile(io.BytesIO(body)) as archive:
+        assert archive.testzip() is None
+        assert archive.namelist() == [
+            "INF0000/20251_1.pdf",
+            "INF1111/20251_1.pdf",
+            "INF1111/20251_2.pdf",
+        ]
+        for name in archive.namelist():
+            assert archive.read(name) == resumes[name.partition("/")[2]]
@@ -0,0 +1,178 @@
+import asyncio
+import time
+from collections.abc import AsyncGenerator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+import pytest
+import pytest_asyncio
+from fastapi import Request, UploadFile
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlmodel import select
+
+from src.config import Settings
+from src.dependencies.session import (
+    POOL_BUSY_RETRY_AFTER,
+    DatabaseSessionDependency,
+    pool_timeout_handler,
+)
+from src.factory import Factory
+from src.file import Blob, LocalStorageProvider
+from src.main import create_app
+from src.schemas import Campagne
+from src.sqlite import SQLiteProfile
+
+from tests.scripts.seed_data import seed_campagne
+
+
+@pytest.mark.asyncio
+async def test_profile_is_applied(test_settings: Settings):
+    dependency = DatabaseSessionDependency()
+    await dependency.initialize(
+        test_settings.SQLALCHEMY_ASYNC_DATABASE_URI,
+        profile=SQLiteProfile.from_settings(test_settings),
+        optimize_interval=test_settings.SQLITE_OPTIMIZE_INTERVAL,
+    )
+    try:
+        pragmas = await dependency.pragmas()
+    finally:
+        await dependency.aclose()
+
+    assert pragmas == {
+        "journal_mode": "wal",
+        "synchronous": 1,
+        "cache_size": test_settings.SQLITE_CACHE_SIZE,
+        "mmap_size": test_settings.SQLITE_MMAP_SIZE,
+        "temp_store": 2,
+        "busy_timeout": test_settings.SQLITE_BUSY_TIMEOUT,
+    }
+
+
+@pytest.mark.asyncio
+async def test_periodic_optimize(test_settings: Settings):
+    dependency = DatabaseSessionDependency()
+    await dependency.initialize(
+        test_settings.SQLALCHEMY_ASYNC_DATABASE_URI,
+        profile=SQLiteProfile.from_settings(test_settings),
+        optimize_interval=1,
+    )
+    assert dependency._maintenance_task is not None
+    assert not dependency._maintenance_task.done()
+
+    await dependency.aclose()
+    assert dependency._maintenance_task is None
+
+
+def _request(method: str) -> Request:
+    return Request({"type": "http", "method": method, "headers": []})
+
+
+@pytest_asyncio.fixture(scope="function")
+async def routed(
+    test_settings: Settings, empty_database: None
+) -> AsyncGenerator[DatabaseSessionDependency, None]:
+    dependency = DatabaseSessionDependency()
+    await dependency.initialize(
+        test_settings.SQLALCHEMY_ASYNC_DATABASE_URI,
+        read_only_url=test_settings.SQLALCHEMY_ASYNC_READONLY_DATABASE_URI,
+        profile=SQLiteProfile.from_settings(test_settings),
+    )
+    yield dependency
+    await dependency.aclose()
+
+
+@pytest.mark.asyncio
+async def test_get_sessions_are_read_only(routed: DatabaseSessionDependency):
+    async with asynccontextmanager(routed)(_request("GET")) as session:
+        session.add(Campagne(trimestre=20251))
+        with pytest.raises(OperationalError, match="readonly"):
+            await session.commit()
+
+    async with asynccontextmanager(routed)(_request("POST")) as session:
+        session.add(Campagne(trimestre=20251))
+        await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_readers_do_not_wait_for_the_writer(routed: DatabaseSessionDependency):
+    async with asynccontextmanager(routed)(_request("POST")) as writer:
+        writer.add(Campagne(trimestre=20251))
+        await writer.flush()
+
+        # The write transaction is still open
+        async with asynccontextmanager(routed)(_request("GET")) as reader:
+            campagnes = await asyncio.wait_for(reader.exec(select(Campagne)), timeout=1)
+            assert campagnes.all() == []
+
+        await writer.commit()
+
+
+@pytest.mark.asyncio
+async def test_busy_writer_answers_503(test_settings: Settings, empty_database: None):
+    dependency = DatabaseSessionDependency()
+    await dependency.initialize(
+        test_settings.SQLALCHEMY_ASYNC_DATABASE_URI, pool_timeout=0.1
+    )
+    try:
+        async with asynccontextmanager(dependency)(_request("POST")) as writer:
+            writer.add(Campagne(trimestre=20251))
+            await writer.flush()
+
+            # The single writer connection is held by the first request
+            async with asynccontextmanager(dependency)(_request("POST")) as other:
+                with pytest.raises(PoolTimeoutError) as excinfo:
+                    await other.exec(select(Campagne))
+    finally:
+        await dependency.aclose()
+
+    request = Request({"type": "http", "method": "PUT", "path": "/", "headers": []})
+    response = await pool_timeout_handler(request, excinfo.value)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(POOL_BUSY_RETRY_AFTER)
+    assert create_app(test_settings).exception_handlers[PoolTimeoutError] is (
+        pool_timeout_handler
+    )
+
+
+@pytest.mark.asyncio
+async def test_slow_upload_doesnt_hold_writer(
+    test_settings: Settings, factory: Factory, monkeypatch: pytest.MonkeyPatch
+):
+    await seed_campagne(factory.session, nb_etudiants=0)
+    test_settings.SQLITE_POOL_TIMEOUT = 0.2
+
+    save_blob = LocalStorageProvider.save_blob
+
+    async def slow_save_blob(self, blob: Blob, upload: UploadFile) -> bool:
+        await asyncio.sleep(1)
+        return await save_blob(self, blob, upload)
+
+    monkeypatch.setattr(LocalStorageProvider, "save_blob", slow_save_blob)
+
+    def upload(client: TestClient):
+        return client.post(
+            "/v1/20251/candidature",
+            data={
+                "code_permanent": "SLOW00000001",
+                "nom": "Slow",
+                "prenom": "Upload",
+                "cycle": "1",
+                "campus": "gatineau",
+                "programme": "1234",
+                "email": "slow@uqo.ca",
+                "courses_json": "[]",
+            },
+            files={"resume": ("cv.pdf", b"%PDF-1.4\nslow", "application/pdf")},
+        )
+
+    with TestClient(create_app(test_settings)) as client:
+        with ThreadPoolExecutor() as executor:
+            uploading = executor.submit(upload, client)
+            time.sleep(0.3)
+            # Another write while the resume is being saved
+            response = client.put("/v1/campagne/20251", json={})
+            assert response.status_code == 200
+            assert not uploading.done()
+            assert uploading.result().status_code == 200
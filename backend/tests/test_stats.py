@@ -0,0 +1,53 @@
+import pytest
+from sqlmodel import col, delete, select
+
+from src.factory import Factory
+from src.schemas import CampagneStats
+
+from tests.scripts.seed_data import seed_campagne
+
+
+@pytest.mark.asyncio
+async def test_rebuild(factory: Factory):
+    campagne = await seed_campagne(factory.session)
+    await seed_campagne(factory.session, trimestre=20252)
+    expected = (
+        await factory.session.exec(
+            select(CampagneStats).where(CampagneStats.id_campagne == campagne.id)
+        )
+    ).one()
+    expected = expected.model_dump()
+
+    await factory.session.exec(delete(CampagneStats))
+    await factory.session.commit()
+    factory.session.expunge_all()
+
+    assert await factory.create_campagne_stats_service().rebuild() == 2
+
+    stats = await factory.session.get(CampagneStats, campagne.id)
+    assert stats is not None
+    assert stats.model_dump() == expected
+    assert stats.nb_cours == 3
+    assert stats.cout_total == 19152.72
+
+
+@pytest.mark.asyncio
+async def test_rebuild_missing(factory: Factory):
+    await seed_campagne(factory.session)
+    other = await seed_campagne(factory.session, trimestre=20252)
+    stats_service = factory.create_campagne_stats_service()
+    version = await stats_service.get_version(20251)
+
+    await factory.session.exec(
+        delete(CampagneStats).where(col(CampagneStats.id_campagne) == other.id)
+    )
+    await factory.session.commit()
+
+    assert await stats_service.rebuild(missing_only=True) == 1
+    assert await stats_service.rebuild(missing_only=True) == 0
+    # The campagne that had statistics keeps its data version
+    assert await stats_service.get_version(20251) == version
+    assert await stats_service.get_version(20252) is not None
+
+    assert await stats_service.rebuild() == 2
+    assert await stats_service.get_version(20251) != version
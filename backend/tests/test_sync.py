@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from src.factory import Factory
+from src.models.requests import CampagneCreateRequest, CampagneCoursRequestItem
+from src.models.uqo import ChangeType, CoursStatus
+
+
+async def _load_small_response():
+    with open("tests/files/small_response.json", "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.mark.asyncio
+async def test_sync_courses(factory: Factory):
+    await factory._context.uqo_horaire_cache.get_or_create(
+        "20251", _load_small_response
+    )
+    campagne = await factory.create_campagne_service().add_campagne(
+        CampagneCreateRequest(
+            trimestre=20251,
+            cours=[
+                CampagneCoursRequestItem(sigle="INF1563"),
+                CampagneCoursRequestItem(sigle="INF1573"),
+                CampagneCoursRequestItem(sigle="INF9999"),
+            ],
+        )
+    )
+
+    uqo_service = factory.create_uqo_horaire_service(20251)
+    campagne = await uqo_service.sync_courses(campagne)
+
+    cours = {c.sigle: c for c in campagne.cours}
+    assert cours["INF9999"].status == CoursStatus.non_confirmee
+    assert cours["INF1573"].status == CoursStatus.confirmee
+    assert len(cours["INF1573"].seance) == 2
+    assert all(
+        s.change["change_type"] == ChangeType.ADDED for s in cours["INF1573"].seance
+    )
+    assert all(s.activite for s in cours["INF1573"].seance)
+
+    # A second sync against the same horaire does not duplicate anything
+    nb_activites = sum(len(s.activite) for c in campagne.cours for s in c.seance)
+    campagne = await uqo_service.sync_courses(campagne)
+    seances = [s for c in campagne.cours for s in c.seance]
+    assert len(seances) == 3
+    assert sum(len(s.activite) for s in seances) == nb_activites
+
+
+@pytest.mark.asyncio
+async def test_sync_inserts_in_bulk(factory: Factory, statements: list[str]):
+    await factory._context.uqo_horaire_cache.get_or_create(
+        "20251", _load_small_response
+    )
+    campagne = await factory.create_campagne_service().add_campagne(
+        CampagneCreateRequest(
+            trimestre=20251,
+            cours=[
+                CampagneCoursRequestItem(sigle="INF1563"),
+                CampagneCoursRequestItem(sigle="INF1573"),
+                CampagneCoursRequestItem(sigle="INF1563"),
+            ],
+        )
+    )
+    assert [c.sigle for c in campagne.cours] == ["INF1563", "INF1573"]
+
+    statements.clear()
+    campagne = await factory.create_uqo_horaire_service(20251).sync_courses(campagne)
+
+    inserts = [s for s in statements if s.startswith("INSERT INTO")]
+    assert len([s for s in inserts if s.startswith("INSERT INTO seance")]) == 1
+    assert len([s for s in inserts if s.startswith("INSERT INTO activite")]) == 1
+    assert sum(len(s.activite) for c in campagne.cours for s in c.seance) > 1
@@ -67,6 +67,18 @@ export const CampagneService = {
                 return null;
             });
 
+        return response === null ? response : response.data;
+    },
+
+    async downloadAllCVs(trimestre) {
+        const response = await apiClient
+            .post(`/v1/campagne/${trimestre}/resumes`, null, {
+                responseType: 'blob'
+            })
+            .catch((error) => {
+                return null;
+            });
+
         return response === null ? response : response.data;
     }
 };